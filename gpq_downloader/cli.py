@@ -0,0 +1,144 @@
+"""
+Command line for batch downloads without QGIS, e.g.
+
+    python -m gpq_downloader --preset overture/buildings --bbox -122.5,37.7,-122.4,37.8 -o buildings.parquet
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+
+from . import logger
+from .duckdb_session import DuckDBSession
+from .engine import DownloadError, Extent, download_many, load_output_formats, resolve_preset
+from .query import DEFAULT_AOI_TOLERANCE
+
+
+def output_extensions():
+    return [output_format["extension"].lstrip(".") for output_format in load_output_formats().values()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m gpq_downloader",
+        description="Download the part of GeoParquet datasets inside a bbox or polygon.",
+    )
+    parser.add_argument("--preset", action="append", default=[], metavar="NAME",
+                        help="Preset dataset such as overture/buildings, overture/base/land or "
+                             "source_cooperative/vida_buildings; can be repeated")
+    parser.add_argument("--url", action="append", default=[],
+                        help="URL of any GeoParquet file or wildcard; can be repeated")
+    parser.add_argument("--release", help="Overture release for overture presets (default: the latest)")
+    area = parser.add_mutually_exclusive_group(required=True)
+    area.add_argument("--bbox", type=Extent.parse, metavar="XMIN,YMIN,XMAX,YMAX",
+                      help="Area in EPSG:4326")
+    area.add_argument("--aoi", metavar="WKT", help="Polygon in EPSG:4326, as WKT or a file holding WKT")
+    parser.add_argument("--aoi-tolerance", type=float, default=DEFAULT_AOI_TOLERANCE, metavar="DEGREES",
+                        help="Simplify a detailed AOI within this distance, keeping it a superset; 0 keeps it exact")
+    parser.add_argument("-o", "--output", required=True,
+                        help="Output file, or a directory when downloading several datasets")
+    parser.add_argument("--format", choices=output_extensions(),
+                        help="Output format in a directory (default: parquet)")
+    parser.add_argument("--columns", help="Comma separated columns to download (default: all)")
+    parser.add_argument("--filter", dest="attribute_filter", help="SQL condition rows have to match")
+    parser.add_argument("--jobs", type=int, help="Datasets to download at once")
+    parser.add_argument("--tile-jobs", type=int, default=2, help="Tiles of one dataset to download at once")
+    parser.add_argument("--threads", type=int, help="DuckDB threads")
+    parser.add_argument("--memory-limit", type=int, metavar="MB", help="DuckDB memory limit in MB")
+    parser.add_argument("--profile", action="store_true",
+                        help="Save DuckDB's query profiles next to each output and log the slowest operators")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write timed spans of each phase to FILE: JSON lines for .jsonl, Chrome trace format otherwise")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("-q", "--quiet", action="store_true", help="Only report warnings and errors")
+    verbosity.add_argument("-v", "--verbose", action="store_true", help="Also log the SQL of each query")
+    return parser
+
+
+def file_name(layer_name):
+    """e.g. "Overture Base - Land" -> "overture_base_land" """
+    return re.sub(r"[^a-z0-9]+", "_", layer_name.lower()).strip("_")
+
+
+def plan_jobs(args, parser):
+    """download() arguments of every dataset on the command line"""
+    datasets = []
+    for name in args.preset:
+        try:
+            datasets.append(resolve_preset(name, release=args.release))
+        except ValueError as e:
+            parser.error(str(e))
+    for url in args.url:
+        datasets.append((url, file_name(os.path.splitext(os.path.basename(url.rstrip("/*")))[0]) or "dataset"))
+    if not datasets:
+        parser.error("Give at least one --preset or --url")
+
+    aoi_wkt = args.aoi
+    if aoi_wkt and os.path.isfile(aoi_wkt):
+        with open(aoi_wkt, "r") as f:
+            aoi_wkt = f.read().strip()
+
+    if len(datasets) == 1 and not os.path.isdir(args.output):
+        outputs = [args.output]
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        extension = args.format or "parquet"
+        outputs = [os.path.join(args.output, f"{file_name(name)}.{extension}") for _, name in datasets]
+        if len(set(outputs)) != len(outputs):
+            parser.error("Several datasets would be written to the same file")
+
+    columns = [column.strip() for column in args.columns.split(",")] if args.columns else None
+    return [
+        {
+            "dataset_url": url,
+            "bbox": args.bbox,
+            "output_file": output,
+            "aoi_wkt": aoi_wkt,
+            "columns": columns,
+            "attribute_filter": args.attribute_filter,
+            "layer_name": name,
+            "tile_jobs": args.tile_jobs,
+            "profiling": args.profile,
+            "aoi_tolerance": args.aoi_tolerance,
+        }
+        for (url, name), output in zip(datasets, outputs)
+    ]
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO,
+        format="%(message)s",
+    )
+    logger.set_level(logger.WARNING if args.quiet else logger.DEBUG if args.verbose else logger.INFO)
+    jobs = plan_jobs(args, parser)
+
+    from .resource_profile import duckdb_settings, max_parallel_jobs
+    profile = {"threads": args.threads or 0, "memory_limit_mb": args.memory_limit or 0}
+    if args.trace:
+        logger.start_trace()
+    session = DuckDBSession(settings=duckdb_settings(profile))
+    try:
+        results = download_many(jobs, max_jobs=args.jobs or max_parallel_jobs(profile), session=session)
+    finally:
+        session.close()
+        if args.trace:
+            logger.stop_trace().write(args.trace)
+        # Log lines before the results
+        logger.flush()
+
+    failed = 0
+    for job, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            failed += 1
+            reason = str(result) if isinstance(result, DownloadError) else repr(result)
+            print(f"{job['layer_name']}: failed: {reason}", file=sys.stderr)
+        elif not result.rows_written:
+            print(f"{job['layer_name']}: no data in the area")
+        else:
+            print(f"{job['layer_name']}: {result.rows_written:,} rows -> {job['output_file']}")
+    return 1 if failed else 0
@@ -1,5 +1,6 @@
 import json
 
+import duckdb
 import requests
 
 from qgis.PyQt.QtWidgets import (
@@ -23,23 +24,49 @@ from qgis.PyQt.QtWidgets import (
     QTextEdit,
     QDoubleSpinBox,
     QGridLayout,
+    QSpinBox,
+    QFileDialog,
+    QListWidget,
+    QListWidgetItem,
 )
 from qgis.PyQt.QtCore import pyqtSignal, Qt, QThread, QPoint, QObject, QEvent
 from qgis.PyQt.QtGui import QIcon
 from qgis.core import QgsSettings, QgsRectangle, QgsGeometry, QgsApplication, QgsMapLayerType
 import os
-from .utils import ValidationWorker
+from .utils import EstimateWorker, SchemaWorker, ValidationWorker, find_preset, load_output_formats
+from .query import FILTER_OPERATORS, check_attribute_filter, filter_condition
+from .estimate import DEFAULT_BLOCK_MB, DEFAULT_WARN_MB, check_thresholds, format_estimate
+from .resource_profile import (
+    default_memory_limit_mb,
+    default_temp_directory,
+    default_threads,
+    duckdb_settings,
+    load_resource_profile,
+    max_parallel_jobs,
+    physical_memory_mb,
+    save_resource_profile,
+)
 from .map_tools import PolygonMapTool, AoiHighlighter, RectangleMapTool
 
 
 class DataSourceDialog(QDialog):
     validation_complete = pyqtSignal(bool, str, dict)
 
-    def __init__(self, parent=None, iface=None):
+    def __init__(self, parent=None, iface=None, session=None, metadata_cache=None):
         super().__init__(parent)
         self.iface = iface
+        self.session = session
+        self.metadata_cache = metadata_cache
         self.validation_thread = None
         self.validation_worker = None
+        self.estimate_thread = None
+        self.estimate_worker = None
+        self.schema_thread = None
+        self.schema_worker = None
+        # Threads of cancelled workers, kept until they end by themselves
+        self.stopping_threads = []
+        self.columns_url = None
+        self.loaded_columns = []
         self.progress_message = None
         self.requires_validation = True
         self.extent_group = None
@@ -288,6 +315,21 @@ class DataSourceDialog(QDialog):
         # Add Area of Interest group
         layout.addWidget(self.setup_area_of_interest())
 
+        # Add extra output formats
+        layout.addWidget(self.setup_output_formats())
+
+        # Add the column picker
+        layout.addWidget(self.setup_column_selection())
+
+        # Add the attribute filter
+        layout.addWidget(self.setup_attribute_filter())
+
+        # Add the pre-download estimate and its thresholds
+        layout.addWidget(self.setup_download_estimate())
+
+        # Add DuckDB resource settings
+        layout.addWidget(self.setup_resource_profile())
+
         # Buttons
         button_layout = QHBoxLayout()
         self.ok_button = QPushButton("OK")
@@ -324,6 +366,9 @@ class DataSourceDialog(QDialog):
 
         # Ensure to call save_checkbox_states when the dialog is accepted
         self.ok_button.clicked.connect(self.save_checkbox_states)
+        self.ok_button.clicked.connect(self.save_resource_settings)
+        self.ok_button.clicked.connect(self.save_output_formats)
+        self.ok_button.clicked.connect(self.save_estimate_thresholds)
 
     class _CanvasKeyFilter(QObject):
         def __init__(self, dialog):
@@ -449,6 +494,9 @@ class DataSourceDialog(QDialog):
                 self, "Validation Error", "Please select at least one dataset"
             )
             return
+
+        if not self.check_attribute_filter():
+            return
             
         # Check if the user selected an Area of Interest
         # Only warn if AOI checkbox is checked but no extent is selected
@@ -466,7 +514,7 @@ class DataSourceDialog(QDialog):
 
         # For Overture and OSM datasets, we know they're valid so we can skip validation
         if self.overture_radio.isChecked() or self.osm_radio.isChecked():
-            self.accept()
+            self.estimate_and_accept()
             return
 
         # For custom URLs, do validation
@@ -497,7 +545,9 @@ class DataSourceDialog(QDialog):
                 extent = self.current_extent if self.current_extent else self.iface.mapCanvas().extent()
 
                 # Create validation worker
-                self.validation_worker = ValidationWorker(url, self.iface, extent)
+                self.validation_worker = ValidationWorker(
+                    url, self.iface, extent, session=self.session, metadata_cache=self.metadata_cache
+                )
                 self.validation_thread = QThread()
                 self.validation_worker.moveToThread(self.validation_thread)
 
@@ -521,7 +571,7 @@ class DataSourceDialog(QDialog):
                 return
 
         # For other preset sources, we can skip validation
-        self.accept()
+        self.estimate_and_accept()
 
     def handle_validation_result(self, success, message, validation_results):
         """Handle validation result in the dialog"""
@@ -529,11 +579,109 @@ class DataSourceDialog(QDialog):
 
         if success:
             self.validation_complete.emit(True, message, validation_results)
-            self.accept()
+            self.estimate_and_accept(validation_results)
         else:
             QMessageBox.warning(self, "Validation Error", message)
             self.validation_complete.emit(False, message, validation_results)
 
+    def estimate_and_accept(self, validation_results=None):
+        """Estimate the download from the Parquet footers, then accept unless it's over the limits"""
+        extent = self.current_extent if self.current_extent else self.iface.mapCanvas().extent()
+        self.estimate_label.setText("Estimating...")
+
+        self.progress_dialog = QProgressDialog(
+            "Estimating download size...", "Cancel", 0, 0, self
+        )
+        self.progress_dialog.setWindowModality(Qt.WindowModality.NonModal)
+        self.progress_dialog.canceled.connect(self.cancel_estimate)
+
+        self.estimate_worker = EstimateWorker(
+            self.get_urls(), extent, self.iface.mapCanvas().mapSettings().destinationCrs(),
+            validation_results, session=self.session, metadata_cache=self.metadata_cache
+        )
+        self.estimate_thread = QThread()
+        self.estimate_worker.moveToThread(self.estimate_thread)
+        self.estimate_thread.started.connect(self.estimate_worker.run)
+        self.estimate_worker.progress.connect(self.progress_dialog.setLabelText)
+        self.estimate_worker.finished.connect(self.handle_estimate_result)
+
+        self.estimate_thread.start()
+        self.progress_dialog.show()
+
+    def handle_estimate_result(self, estimate):
+        """Show the estimate, then warn, block or accept according to the thresholds"""
+        self.cleanup_estimate()
+
+        if estimate is None or estimate["unknown"] == len(self.get_urls()):
+            # No statistics to go by; the download itself still works
+            self.estimate_label.setText("No size estimate available for this dataset")
+            self.accept()
+            return
+
+        text = format_estimate(estimate)
+        self.estimate_label.setText(text)
+        verdict = check_thresholds(estimate, self.warn_mb_spin.value(), self.block_mb_spin.value())
+        if verdict == "block":
+            QMessageBox.warning(
+                self,
+                "Download Too Large",
+                f"{text}.\n\nThis is over the {self.block_mb_spin.value()} MB limit. "
+                "Choose a smaller area of interest, or raise the limit under 'Download Estimate'.",
+            )
+            return
+        if verdict == "warn":
+            reply = QMessageBox.question(
+                self,
+                "Large Download",
+                f"{text}.\n\nThis is over {self.warn_mb_spin.value()} MB. Do you want to continue?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                QMessageBox.StandardButton.No,
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        self.accept()
+
+    def cancel_estimate(self):
+        if self.estimate_worker:
+            self.estimate_worker.kill()
+        self.estimate_label.setText("Estimate cancelled")
+        self.cleanup_estimate()
+
+    def cleanup_estimate(self):
+        if hasattr(self, "progress_dialog") and self.progress_dialog:
+            self.progress_dialog.close()
+            self.progress_dialog = None
+
+        if self.estimate_thread:
+            self.release_thread(self.estimate_worker, self.estimate_thread)
+        self.estimate_worker = None
+        self.estimate_thread = None
+
+    def release_thread(self, worker, thread):
+        """
+        Let a worker's thread end by itself instead of waiting for it.
+
+        Waiting would freeze the UI until a remote read returns. The worker's
+        signals are blocked so a late result doesn't reach the dialog, and the
+        thread is kept in stopping_threads until it has finished.
+        """
+        if worker is not None:
+            worker.blockSignals(True)
+        thread.quit()
+        if thread.isFinished():
+            if worker is not None:
+                worker.deleteLater()
+            thread.deleteLater()
+            return
+        stopping = (worker, thread)
+        self.stopping_threads.append(stopping)
+        if worker is not None:
+            thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(
+            lambda s=stopping: self.stopping_threads.remove(s) if s in self.stopping_threads else None
+        )
+
     def cancel_validation(self):
         """Handle validation cancellation"""
         if self.validation_worker:
@@ -564,6 +712,10 @@ class DataSourceDialog(QDialog):
         # Clean up validation if running
         if self.validation_thread and self.validation_thread.isRunning():
             self.cancel_validation()
+        if self.estimate_thread and self.estimate_thread.isRunning():
+            self.cancel_estimate()
+        if self.schema_thread and self.schema_thread.isRunning():
+            self.cancel_schema_worker()
 
         # Disconnect from layer changes
         if self.iface:
@@ -1018,6 +1170,376 @@ class DataSourceDialog(QDialog):
         self.aoi_container.setLayout(container_layout)
         return self.aoi_container
 
+    def setup_output_formats(self):
+        """Create the group of formats written alongside the chosen output file"""
+        self.output_formats_group = QGroupBox("Also Save As")
+        formats_layout = QHBoxLayout()
+
+        self.format_checkboxes = {}
+        for label, output_format in load_output_formats().items():
+            extension = output_format["extension"]
+            checkbox = QCheckBox(label.split(" (")[0])
+            checkbox.setToolTip(
+                f"Also write a {extension} file next to the chosen output, from the same download"
+            )
+            checkbox.setChecked(QgsSettings().value(
+                f"gpq_downloader/output_format_{extension.lstrip('.')}",
+                False,
+                type=bool,
+                section=QgsSettings.Plugins,
+            ))
+            self.format_checkboxes[extension] = checkbox
+            formats_layout.addWidget(checkbox)
+
+        self.output_formats_group.setLayout(formats_layout)
+        return self.output_formats_group
+
+    def get_extra_formats(self):
+        """Extensions of the additional formats to write"""
+        return [
+            extension for extension, checkbox in self.format_checkboxes.items()
+            if checkbox.isChecked()
+        ]
+
+    def save_output_formats(self):
+        for extension, checkbox in self.format_checkboxes.items():
+            QgsSettings().setValue(
+                f"gpq_downloader/output_format_{extension.lstrip('.')}",
+                checkbox.isChecked(),
+                section=QgsSettings.Plugins,
+            )
+
+    def setup_column_selection(self):
+        """Create the group for downloading only some of a dataset's columns"""
+        self.columns_group = QGroupBox("Columns")
+        self.columns_group.setCheckable(True)
+        self.columns_group.setChecked(False)
+        self.columns_group.setToolTip(
+            "Download only the checked columns. The geometry and bbox columns are always included."
+        )
+        columns_layout = QVBoxLayout()
+
+        controls_layout = QHBoxLayout()
+        self.load_columns_button = QPushButton("Load Columns")
+        self.load_columns_button.clicked.connect(self.load_columns)
+        controls_layout.addWidget(self.load_columns_button)
+        controls_layout.addWidget(QLabel("Preset:"))
+        self.column_preset_combo = QComboBox()
+        self.column_preset_combo.addItem("All columns")
+        self.column_preset_combo.currentTextChanged.connect(self.apply_column_preset)
+        controls_layout.addWidget(self.column_preset_combo)
+        columns_layout.addLayout(controls_layout)
+
+        self.column_list = QListWidget()
+        self.column_list.setMaximumHeight(150)
+        columns_layout.addWidget(self.column_list)
+
+        self.columns_group.setLayout(columns_layout)
+        return self.columns_group
+
+    def load_columns(self):
+        """Read the columns of the first selected dataset, from the metadata cache when it has them"""
+        urls = self.get_urls()
+        if not urls:
+            QMessageBox.warning(self, "Columns", "Please select a dataset first")
+            return
+        self.columns_url = urls[0]
+        self.load_columns_button.setEnabled(False)
+        self.load_columns_button.setText("Loading...")
+
+        self.schema_worker = SchemaWorker(
+            self.columns_url, session=self.session, metadata_cache=self.metadata_cache
+        )
+        self.schema_thread = QThread()
+        self.schema_worker.moveToThread(self.schema_thread)
+        self.schema_thread.started.connect(self.schema_worker.run)
+        self.schema_worker.finished.connect(self.populate_columns)
+        self.schema_worker.error.connect(self.handle_columns_error)
+        self.schema_thread.start()
+
+    def populate_columns(self, columns):
+        self.cleanup_schema_worker()
+        self.loaded_columns = columns
+        self.filter_column_combo.clear()
+        self.filter_column_combo.addItems([name for name, _ in columns])
+        self.column_list.clear()
+        for name, column_type in columns:
+            item = QListWidgetItem(name)
+            item.setToolTip(column_type)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked)
+            self.column_list.addItem(item)
+
+        self.column_preset_combo.blockSignals(True)
+        self.column_preset_combo.clear()
+        self.column_preset_combo.addItem("All columns")
+        self.column_preset_combo.addItems(list(self.get_column_presets()))
+        self.column_preset_combo.blockSignals(False)
+
+        dataset_name = self.columns_url.rstrip("/*").split("/")[-1]
+        self.columns_group.setTitle(f"Columns ({dataset_name})")
+        self.columns_group.setChecked(True)
+
+    def handle_columns_error(self, message):
+        self.cleanup_schema_worker()
+        QMessageBox.warning(self, "Columns", f"Could not read the dataset's columns: {message}")
+
+    def cancel_schema_worker(self):
+        if self.schema_worker:
+            self.schema_worker.kill()
+        self.cleanup_schema_worker()
+
+    def cleanup_schema_worker(self):
+        self.load_columns_button.setEnabled(True)
+        self.load_columns_button.setText("Load Columns")
+        if self.schema_thread:
+            self.release_thread(self.schema_worker, self.schema_thread)
+        self.schema_worker = None
+        self.schema_thread = None
+
+    def get_column_presets(self):
+        """Named column lists for the loaded dataset, from presets.json"""
+        dataset = find_preset(self.PRESET_DATASETS, self.columns_url) if self.columns_url else None
+        return (dataset or {}).get("column_presets", {})
+
+    def apply_column_preset(self, name):
+        wanted = self.get_column_presets().get(name)
+        for row in range(self.column_list.count()):
+            item = self.column_list.item(row)
+            checked = wanted is None or item.text() in wanted
+            item.setCheckState(Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked)
+
+    def get_selected_columns(self):
+        """Columns to download from columns_url, or None for all of them"""
+        if not self.columns_group.isChecked() or self.column_list.count() == 0:
+            return None
+        checked = [
+            self.column_list.item(row).text()
+            for row in range(self.column_list.count())
+            if self.column_list.item(row).checkState() == Qt.CheckState.Checked
+        ]
+        if len(checked) == self.column_list.count():
+            return None
+        return checked
+
+    def setup_attribute_filter(self):
+        """Create the group for filtering rows on their attributes"""
+        self.filter_group = QGroupBox("Attribute Filter")
+        self.filter_group.setCheckable(True)
+        self.filter_group.setChecked(False)
+        self.filter_group.setToolTip(
+            "Only download rows matching this SQL condition, e.g. \"class\" IN ('motorway', 'trunk')"
+        )
+        filter_layout = QVBoxLayout()
+
+        # Builder row: column, operator and value, added to the expression with AND
+        builder_layout = QHBoxLayout()
+        self.filter_column_combo = QComboBox()
+        self.filter_column_combo.setEditable(True)
+        self.filter_column_combo.setToolTip("Load Columns above to list the dataset's columns")
+        builder_layout.addWidget(self.filter_column_combo)
+        self.filter_operator_combo = QComboBox()
+        self.filter_operator_combo.addItems(FILTER_OPERATORS)
+        builder_layout.addWidget(self.filter_operator_combo)
+        self.filter_value_input = QLineEdit()
+        self.filter_value_input.setPlaceholderText("value, or a, b, c for IN")
+        builder_layout.addWidget(self.filter_value_input)
+        add_button = QPushButton("Add")
+        add_button.clicked.connect(self.add_filter_condition)
+        builder_layout.addWidget(add_button)
+        filter_layout.addLayout(builder_layout)
+
+        expression_layout = QHBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("\"height\" > 50 AND \"class\" = 'residential'")
+        expression_layout.addWidget(self.filter_input)
+        check_button = QPushButton("Check")
+        check_button.clicked.connect(lambda: self.check_attribute_filter(report_ok=True))
+        expression_layout.addWidget(check_button)
+        filter_layout.addLayout(expression_layout)
+
+        self.filter_group.setLayout(filter_layout)
+        return self.filter_group
+
+    def add_filter_condition(self):
+        column = self.filter_column_combo.currentText().strip()
+        if not column:
+            return
+        try:
+            condition = filter_condition(
+                column, self.filter_operator_combo.currentText(), self.filter_value_input.text()
+            )
+        except ValueError as e:
+            QMessageBox.warning(self, "Attribute Filter", str(e))
+            return
+        expression = self.filter_input.text().strip()
+        self.filter_input.setText(f"{expression} AND {condition}" if expression else condition)
+        self.filter_value_input.clear()
+
+    def get_attribute_filter(self):
+        """The attribute filter expression, or None"""
+        if not self.filter_group.isChecked():
+            return None
+        return self.filter_input.text().strip() or None
+
+    def check_attribute_filter(self, report_ok=False):
+        """
+        Validate the attribute filter, against the loaded columns when there are any.
+
+        Without loaded columns only the syntax is checked here; the download
+        checks the columns against each dataset's schema before reading.
+        """
+        expression = self.get_attribute_filter()
+        if not expression:
+            return True
+        conn = duckdb.connect()
+        try:
+            check_attribute_filter(conn, expression, self.loaded_columns)
+        except ValueError as e:
+            QMessageBox.warning(self, "Attribute Filter", f"Invalid attribute filter: {e}")
+            return False
+        finally:
+            conn.close()
+        if report_ok:
+            QMessageBox.information(self, "Attribute Filter", "The filter is valid")
+        return True
+
+    def setup_download_estimate(self):
+        """Create the group showing the pre-download estimate and its warn/block thresholds"""
+        self.estimate_group = QGroupBox("Download Estimate")
+        estimate_layout = QGridLayout()
+
+        self.estimate_label = QLabel("Estimated from the Parquet footers when you press OK")
+        self.estimate_label.setWordWrap(True)
+        estimate_layout.addWidget(self.estimate_label, 0, 0, 1, 2)
+
+        self.warn_mb_spin = QSpinBox()
+        self.warn_mb_spin.setRange(0, 10 * 1024 * 1024)
+        self.warn_mb_spin.setSingleStep(256)
+        self.warn_mb_spin.setSuffix(" MB")
+        self.warn_mb_spin.setSpecialValueText("Never")
+        self.warn_mb_spin.setToolTip("Ask before downloads that read more than this, in any format")
+        estimate_layout.addWidget(QLabel("Warn above:"), 1, 0)
+        estimate_layout.addWidget(self.warn_mb_spin, 1, 1)
+
+        self.block_mb_spin = QSpinBox()
+        self.block_mb_spin.setRange(0, 10 * 1024 * 1024)
+        self.block_mb_spin.setSingleStep(1024)
+        self.block_mb_spin.setSuffix(" MB")
+        self.block_mb_spin.setSpecialValueText("Never")
+        self.block_mb_spin.setToolTip("Refuse downloads that read more than this, in any format")
+        estimate_layout.addWidget(QLabel("Block above:"), 2, 0)
+        estimate_layout.addWidget(self.block_mb_spin, 2, 1)
+
+        settings = QgsSettings()
+        self.warn_mb_spin.setValue(settings.value(
+            "gpq_downloader/estimate_warn_mb", DEFAULT_WARN_MB, type=int, section=QgsSettings.Plugins
+        ))
+        self.block_mb_spin.setValue(settings.value(
+            "gpq_downloader/estimate_block_mb", DEFAULT_BLOCK_MB, type=int, section=QgsSettings.Plugins
+        ))
+
+        self.estimate_group.setLayout(estimate_layout)
+        return self.estimate_group
+
+    def save_estimate_thresholds(self):
+        settings = QgsSettings()
+        settings.setValue(
+            "gpq_downloader/estimate_warn_mb", self.warn_mb_spin.value(), section=QgsSettings.Plugins
+        )
+        settings.setValue(
+            "gpq_downloader/estimate_block_mb", self.block_mb_spin.value(), section=QgsSettings.Plugins
+        )
+
+    def setup_resource_profile(self):
+        """Create the group with DuckDB threads, memory limit and spill directory"""
+        self.resource_group = QGroupBox("DuckDB Resources")
+        resource_layout = QGridLayout()
+
+        self.threads_spin = QSpinBox()
+        self.threads_spin.setRange(0, os.cpu_count() or 64)
+        self.threads_spin.setSpecialValueText(f"Auto ({default_threads()})")
+        self.threads_spin.setToolTip("Threads DuckDB may use for downloads")
+        resource_layout.addWidget(QLabel("Threads:"), 0, 0)
+        resource_layout.addWidget(self.threads_spin, 0, 1)
+
+        self.memory_spin = QSpinBox()
+        self.memory_spin.setRange(0, physical_memory_mb() or 1024 * 1024)
+        self.memory_spin.setSingleStep(256)
+        self.memory_spin.setSuffix(" MB")
+        default_memory = default_memory_limit_mb()
+        self.memory_spin.setSpecialValueText(
+            f"Auto ({default_memory} MB)" if default_memory else "Auto"
+        )
+        self.memory_spin.setToolTip(
+            "Memory DuckDB may use before sorts and joins spill to the scratch directory"
+        )
+        resource_layout.addWidget(QLabel("Memory limit:"), 1, 0)
+        resource_layout.addWidget(self.memory_spin, 1, 1)
+
+        temp_layout = QHBoxLayout()
+        self.temp_dir_input = QLineEdit()
+        self.temp_dir_input.setPlaceholderText(default_temp_directory())
+        self.temp_dir_input.setToolTip("Scratch directory for data that doesn't fit in memory")
+        temp_browse = QToolButton()
+        temp_browse.setText("...")
+        temp_browse.clicked.connect(self.browse_temp_directory)
+        temp_layout.addWidget(self.temp_dir_input)
+        temp_layout.addWidget(temp_browse)
+        resource_layout.addWidget(QLabel("Scratch directory:"), 2, 0)
+        resource_layout.addLayout(temp_layout, 2, 1)
+
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setRange(0, 32)
+        self.parallel_spin.setSpecialValueText(f"Auto ({max_parallel_jobs()})")
+        self.parallel_spin.setToolTip(
+            "Datasets downloaded at once. Limited by the threads and memory above."
+        )
+        resource_layout.addWidget(QLabel("Parallel downloads:"), 3, 0)
+        resource_layout.addWidget(self.parallel_spin, 3, 1)
+
+        self.insertion_order_checkbox = QCheckBox("Preserve insertion order")
+        self.insertion_order_checkbox.setToolTip(
+            "Keep rows in source order. Uses more memory; outputs are Hilbert sorted anyway."
+        )
+        resource_layout.addWidget(self.insertion_order_checkbox, 4, 0, 1, 2)
+
+        self.resource_group.setLayout(resource_layout)
+        self.load_resource_settings()
+        return self.resource_group
+
+    def browse_temp_directory(self):
+        directory = QFileDialog.getExistingDirectory(
+            self, "Select Scratch Directory", self.temp_dir_input.text() or default_temp_directory()
+        )
+        if directory:
+            self.temp_dir_input.setText(directory)
+
+    def get_resource_profile(self):
+        """Resource profile as currently set in the dialog"""
+        return {
+            "threads": self.threads_spin.value(),
+            "memory_limit_mb": self.memory_spin.value(),
+            "temp_directory": self.temp_dir_input.text().strip(),
+            "preserve_insertion_order": self.insertion_order_checkbox.isChecked(),
+            "parallel_jobs": self.parallel_spin.value(),
+        }
+
+    def load_resource_settings(self):
+        profile = load_resource_profile(QgsSettings())
+        self.threads_spin.setValue(profile["threads"])
+        self.memory_spin.setValue(profile["memory_limit_mb"])
+        self.temp_dir_input.setText(profile["temp_directory"])
+        self.insertion_order_checkbox.setChecked(profile["preserve_insertion_order"])
+        self.parallel_spin.setValue(profile["parallel_jobs"])
+
+    def save_resource_settings(self):
+        """Store the resource profile and apply it to the running DuckDB session"""
+        profile = self.get_resource_profile()
+        save_resource_profile(profile, QgsSettings())
+        if self.session is not None:
+            self.session.update_settings(duckdb_settings(profile))
+
     def on_aoi_checkbox_toggled(self, checked):
         """Handle the Area of Interest checkbox being toggled"""
         if checked:
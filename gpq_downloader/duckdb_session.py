@@ -0,0 +1,253 @@
+import json
+import os
+import re
+import threading
+import time
+
+import duckdb
+
+from . import logger
+from .http_stats import enable_http_logging
+from .resource_profile import MIN_JOB_MEMORY_MB
+
+
+class DuckDBSession:
+    """
+    A shared, warm DuckDB database that hands out per-job cursors.
+
+    Creating a fresh connection for every download means installing and loading
+    httpfs and spatial each time. The session does that once, keeps any
+    httpfs/S3 settings applied at the database level and gives every worker
+    its own cursor on the same database. Cursors share loaded extensions and
+    settings but have their own temporary tables, so concurrent jobs don't
+    see each other's intermediate results.
+    """
+
+    EXTENSIONS = ("httpfs", "spatial")
+    BOOTSTRAP_MARKER = "gpq_downloader_extensions.json"
+
+    def __init__(self, database=":memory:", settings=None, extension_directory=None,
+                 extension_repository=None):
+        self.database = database
+        self.settings = dict(settings or {})
+        # Plugin-owned directory extensions are installed into, and an optional
+        # pre-seeded local repository to install from instead of the network
+        self.extension_directory = extension_directory
+        self.extension_repository = extension_repository
+        self._conn = None
+        self._lock = threading.Lock()
+        self.warmup_seconds = None
+        # Download jobs recorded with record_job(); validation, estimate and
+        # schema cursors aren't jobs and don't count
+        self.jobs_run = 0
+        self.job_seconds = 0.0
+        # Jobs reading DuckDB's HTTP log; the log is cleared once none is left
+        self._http_log_jobs = 0
+
+    @property
+    def is_warm(self):
+        return self._conn is not None
+
+    def _marker_path(self):
+        if not self.extension_directory:
+            return None
+        return os.path.join(self.extension_directory, self.BOOTSTRAP_MARKER)
+
+    def extensions_bootstrapped(self):
+        """True if the extension directory was bootstrapped for this DuckDB version"""
+        marker_path = self._marker_path()
+        if not marker_path or not os.path.exists(marker_path):
+            return False
+        try:
+            with open(marker_path, "r") as f:
+                marker = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (
+            marker.get("duckdb_version") == duckdb.__version__
+            and set(self.EXTENSIONS).issubset(marker.get("extensions", []))
+        )
+
+    def _write_marker(self):
+        marker_path = self._marker_path()
+        if not marker_path:
+            return
+        with open(marker_path, "w") as f:
+            json.dump(
+                {
+                    "duckdb_version": duckdb.__version__,
+                    "extensions": list(self.EXTENSIONS),
+                    "repository": self.extension_repository,
+                    "installed_at": time.time(),
+                },
+                f,
+            )
+
+    def install_extensions(self, conn):
+        """Install extensions, from the local repository if one is configured"""
+        for extension in self.EXTENSIONS:
+            if self.extension_repository:
+                repository = self.extension_repository.replace("'", "''")
+                conn.execute(f"INSTALL {extension} FROM '{repository}';")
+            else:
+                conn.execute(f"INSTALL {extension};")
+        self._write_marker()
+
+    def load_extensions(self, conn):
+        """
+        Load the extensions every job needs on the given connection.
+
+        Once the extension directory has been bootstrapped for the running DuckDB
+        version only LOAD is executed, so no extension metadata is fetched from
+        the network. If loading fails (e.g. the directory was cleared) the
+        extensions are installed again.
+        """
+        if self.extension_directory:
+            os.makedirs(self.extension_directory, exist_ok=True)
+            directory = self.extension_directory.replace("'", "''")
+            conn.execute(f"SET extension_directory = '{directory}';")
+        if self.extension_repository:
+            # Keep autoloaded dependencies off the network as well
+            repository = self.extension_repository.replace("'", "''")
+            conn.execute(f"SET autoinstall_extension_repository = '{repository}';")
+
+        if self.extensions_bootstrapped():
+            try:
+                for extension in self.EXTENSIONS:
+                    conn.execute(f"LOAD {extension};")
+            except Exception as e:
+                logger.log(f"Loading bootstrapped extensions failed, reinstalling: {e}", 1)
+                self.install_extensions(conn)
+                for extension in self.EXTENSIONS:
+                    conn.execute(f"LOAD {extension};")
+        else:
+            self.install_extensions(conn)
+            for extension in self.EXTENSIONS:
+                conn.execute(f"LOAD {extension};")
+
+        # Verify spatial extension is loaded by testing a spatial function
+        try:
+            conn.execute("SELECT ST_AsText(ST_GeomFromText('POINT(0 0)'))").fetchone()
+        except Exception as e:
+            logger.log(f"Failed to verify spatial extension: {e}")
+            # Force reload
+            conn.execute("LOAD spatial;")
+
+    def apply_settings(self, conn, scope="GLOBAL", settings=None):
+        """Apply the session's httpfs/S3 and resource settings to a connection"""
+        for name, value in (self.settings if settings is None else settings).items():
+            if isinstance(value, str):
+                value = "'" + value.replace("'", "''") + "'"
+            elif isinstance(value, bool):
+                value = "true" if value else "false"
+            conn.execute(f"SET {scope} {name} = {value};")
+
+    def update_settings(self, settings):
+        """Change settings, applying them right away if the database is already warm"""
+        with self._lock:
+            self.settings.update(settings)
+            if self._conn is not None:
+                self.apply_settings(self._conn, settings=settings)
+
+    def warm_up(self):
+        """Open the shared database and load extensions, if not already done"""
+        with self._lock:
+            self._ensure_connection()
+
+    def _ensure_connection(self):
+        if self._conn is not None:
+            return self._conn
+
+        start = time.perf_counter()
+        conn = duckdb.connect(self.database)
+        try:
+            with logger.span("load_extensions"):
+                self.load_extensions(conn)
+            self.apply_settings(conn)
+        except Exception:
+            conn.close()
+            raise
+        self._conn = conn
+        self.warmup_seconds = time.perf_counter() - start
+        logger.log(f"DuckDB session warmed up in {self.warmup_seconds:.2f}s")
+        return conn
+
+    def cursor(self):
+        """Return a new cursor on the shared database, warming it up on first use"""
+        with self._lock:
+            conn = self._ensure_connection()
+            return conn.cursor()
+
+    def connect_file(self, path):
+        """
+        Open a dedicated connection to an on-disk DuckDB database.
+
+        Used when the output itself is a DuckDB file. The extensions are already
+        installed by the shared session, so this only pays for loading them.
+        """
+        conn = duckdb.connect(path)
+        try:
+            with logger.span("load_extensions"):
+                self.load_extensions(conn)
+            self.apply_settings(conn, settings=self.file_database_settings())
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def file_database_settings(self):
+        """
+        Settings for a database opened by connect_file().
+
+        It runs next to the shared database, so instead of a second copy of
+        the session's memory_limit it gets what a single job can count on,
+        MIN_JOB_MEMORY_MB (or the session's limit if lower); larger sorts spill
+        to temp_directory like they do in the shared database.
+        """
+        settings = dict(self.settings)
+        limit = re.fullmatch(r"\s*(\d+)\s*MB\s*", str(settings.get("memory_limit", "")), re.IGNORECASE)
+        memory_mb = min(int(limit.group(1)), MIN_JOB_MEMORY_MB) if limit else MIN_JOB_MEMORY_MB
+        settings["memory_limit"] = f"{memory_mb}MB"
+        return settings
+
+    def start_http_log(self, conn):
+        """Turn on HTTP request logging for a job on conn; False if this DuckDB can't log requests"""
+        if not enable_http_logging(conn):
+            return False
+        with self._lock:
+            self._http_log_jobs += 1
+        return True
+
+    def finish_http_log(self, conn):
+        """Clear the in-memory HTTP log once no running job needs its entries"""
+        with self._lock:
+            self._http_log_jobs = max(0, self._http_log_jobs - 1)
+            if self._http_log_jobs:
+                return
+            try:
+                conn.execute("CALL truncate_duckdb_logs()")
+            except Exception as e:
+                logger.log(f"Could not clear the HTTP log: {e}", 1)
+
+    def record_job(self, seconds):
+        """Count a finished download job and its run time, so warm-up cost can be compared against them"""
+        with self._lock:
+            self.jobs_run += 1
+            self.job_seconds += seconds
+
+    def timing_summary(self):
+        """Describe how long warm-up took compared with the jobs run so far"""
+        if self.warmup_seconds is None:
+            return "DuckDB session not started"
+        return (
+            f"DuckDB warm-up {self.warmup_seconds:.2f}s (paid once), "
+            f"{self.jobs_run} job(s) totalling {self.job_seconds:.2f}s"
+        )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                finally:
+                    self._conn = None
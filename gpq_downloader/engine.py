@@ -0,0 +1,1500 @@
+"""
+Download engine shared by the QGIS plugin and the command line.
+
+Nothing here imports QGIS or Qt: DownloadEngine runs one download and reports
+through overridable hooks, download() and download_many() wrap it for
+scripts. See cli.py for the `python -m gpq_downloader` entry point.
+"""
+
+import contextlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from . import logger
+from .duckdb_session import DuckDBSession
+from .estimate import find_bbox_covering
+from .http_stats import connection_id, format_http_stats, job_requests, summarize_requests, write_http_record
+from .manifest import build_manifest, intersecting_files, manifest_row_groups, manifest_source
+from .metadata_cache import get_column_sizes, get_geo_metadata, get_row_group_bounds, get_schema
+from .partitions import (
+    build_partition_index,
+    dataset_source,
+    partition_layout,
+    partition_source,
+    prune_partitions,
+)
+from .profiling import format_profile, profile_path, profiled, summarize_profile
+from .progress import ProgressMonitor
+from .query import (
+    AOI_PARAMETER,
+    DEFAULT_AOI_TOLERANCE,
+    aoi_predicate,
+    bbox_overlap_predicate,
+    check_attribute_filter,
+    default_bbox_covering,
+    filter_columns,
+    parse_bbox_covering,
+    prepare_aoi,
+)
+from .tile_cache import MAX_TILES_PER_JOB, cached_source, tiles_for_extent
+from .tiling import (
+    TARGET_ROWS_PER_TILE,
+    plan_tiles,
+    run_tiles,
+    summarize_scan,
+    tile_level,
+    tile_ownership_predicate,
+)
+
+FORMATS_FILE = os.path.join(os.path.dirname(__file__), "data", "formats.json")
+PRESETS_FILE = os.path.join(os.path.dirname(__file__), "data", "presets.json")
+OVERTURE_RELEASES_URL = "https://labs.overturemaps.org/data/releases.json"
+# Overture themes whose type= directory isn't the theme name without the plural s
+OVERTURE_TYPES = {"transportation": "segment", "addresses": "*"}
+
+
+def load_output_formats():
+    """Output formats offered for export, as label -> extension and COPY options"""
+    with open(FORMATS_FILE, "r") as f:
+        return json.load(f)
+
+
+def load_presets():
+    with open(PRESETS_FILE, "r") as f:
+        return json.load(f)
+
+
+def find_preset(presets, url):
+    """The preset dataset a URL was made from, or None"""
+    for source in presets.values():
+        for dataset in source.values():
+            if dataset.get("url") == url:
+                return dataset
+            template = dataset.get("url_template")
+            if template:
+                # {release}, {subtype} and the like stand for one path segment
+                pattern = re.sub(r"\\\{\w+\\\}", "[^/]+", re.escape(template))
+                if re.fullmatch(pattern, url):
+                    return dataset
+    return None
+
+
+def latest_overture_release(timeout=10):
+    with urllib.request.urlopen(OVERTURE_RELEASES_URL, timeout=timeout) as response:
+        return json.load(response)["latest"]
+
+
+def resolve_preset(name, presets=None, release=None):
+    """
+    (url, layer name) of a preset named "source/dataset", or "source/dataset/subtype".
+
+    e.g. "overture/buildings", "overture/base/land" or
+    "source_cooperative/vida_buildings". Overture URLs use release, or the
+    latest release if it is None. Raises ValueError for unknown names.
+    """
+    presets = presets or load_presets()
+    parts = name.split("/")
+    if len(parts) not in (2, 3) or parts[0] not in presets or parts[1] not in presets[parts[0]]:
+        raise ValueError(f"Unknown preset {name!r}")
+    source, key = parts[:2]
+    dataset = presets[source][key]
+
+    if "url_template" not in dataset:
+        if len(parts) == 3:
+            raise ValueError(f"Preset {source}/{key} has no subtypes")
+        return dataset["url"], dataset.get("display_name") or key
+
+    subtypes = dataset.get("subtypes")
+    if subtypes:
+        if len(parts) != 3 or parts[2] not in subtypes:
+            raise ValueError(f"Preset {source}/{key} needs one of the subtypes {', '.join(subtypes)}")
+        subtype = parts[2]
+        layer_name = f"Overture {key.title()} - {subtype.title()}"
+    else:
+        if len(parts) == 3:
+            raise ValueError(f"Preset {source}/{key} has no subtypes")
+        subtype = OVERTURE_TYPES.get(key, key.rstrip("s"))
+        layer_name = f"Overture {key.title()}"
+    url = dataset["url_template"].format(release=release or latest_overture_release(), subtype=subtype)
+    return url, layer_name
+
+
+def validate_dataset(conn, url, metadata_cache=None):
+    """
+    validation_results for a download of url, as ValidationWorker makes them.
+
+    Presets that need no validation are taken to have a bbox column; other
+    datasets are checked for a covering, and their geometry column is left
+    for DownloadEngine.run to detect from the schema.
+    """
+    preset = find_preset(load_presets(), url)
+    if preset is not None and not preset.get("needs_validation", True):
+        return {"has_bbox": True, "bbox_column": "bbox", "geometry_column": "geometry"}
+    covering = find_bbox_covering(conn, url, metadata_cache)
+    if covering is None:
+        return {"has_bbox": False, "bbox_column": None}
+    return {"has_bbox": True, "bbox_column": covering["xmin"][0], "bbox_covering": covering}
+
+
+def wkt_extent(conn, wkt):
+    """Extent of a WKT geometry; conn needs the spatial extension loaded"""
+    return Extent(*conn.execute(
+        "SELECT ST_XMin(g), ST_YMin(g), ST_XMax(g), ST_YMax(g) FROM (SELECT ST_GeomFromText(?) AS g)",
+        [wkt],
+    ).fetchone())
+
+
+class Extent:
+    """A lon/lat bbox with the accessors of a QgsRectangle that the engine reads"""
+
+    def __init__(self, xmin, ymin, xmax, ymax):
+        self.xmin, self.ymin, self.xmax, self.ymax = float(xmin), float(ymin), float(xmax), float(ymax)
+
+    @classmethod
+    def parse(cls, text):
+        """Extent from "xmin,ymin,xmax,ymax" """
+        values = text.split(",")
+        if len(values) != 4:
+            raise ValueError(f"Expected xmin,ymin,xmax,ymax, got {text!r}")
+        return cls(*values)
+
+    def xMinimum(self):
+        return self.xmin
+
+    def yMinimum(self):
+        return self.ymin
+
+    def xMaximum(self):
+        return self.xmax
+
+    def yMaximum(self):
+        return self.ymax
+
+    def __repr__(self):
+        return f"Extent({self.xmin}, {self.ymin}, {self.xmax}, {self.ymax})"
+
+
+class DownloadError(Exception):
+    """A download that failed; the message is the engine's error"""
+
+
+class DownloadEngine:
+    """
+    Downloads the rows of a dataset inside a bbox into one or more output files.
+
+    The engine holds everything a download does and reports through the
+    report_* hooks, which log by default. utils.Worker overrides them to emit
+    Qt signals; headless callers use download() or download_many().
+
+    bbox is in EPSG:4326 and only needs xMinimum()/yMinimum()/xMaximum()/yMaximum(),
+    like an Extent or a QgsRectangle. aoi_wkt, also in EPSG:4326, narrows the
+    bbox to a polygon.
+    """
+
+    def __init__(self, dataset_url, bbox, output_file, validation_results, layer_name=None, aoi_wkt=None, session=None, metadata_cache=None, extra_outputs=None):
+        self.dataset_url = dataset_url
+        self.bbox = bbox
+        self.output_file = output_file
+        # Further files (other formats) written from the same remote read
+        self.extra_outputs = list(extra_outputs or [])
+        self.validation_results = validation_results
+        self.killed = False
+        self.layer_name = layer_name
+        self.size_warning_accepted = False
+        self.aoi_wkt = aoi_wkt
+        # Degrees a large AOI may be simplified by (it's buffered back to cover the original); 0 keeps it exact
+        self.aoi_tolerance = DEFAULT_AOI_TOLERANCE
+        # Parameters bound to the download queries: the AOI as WKB
+        self.query_parameters = None
+        # Shared DuckDBSession; without one the worker warms up its own database
+        self.session = session
+        # Optional MetadataCache so repeat downloads skip remote footer reads
+        self.metadata_cache = metadata_cache
+        # Stream the filtered read straight into the output file instead of
+        # materializing it in a table first
+        self.streaming = True
+        # Split large extents into tiles that are downloaded, and retried, separately
+        self.tiling = True
+        self.tile_jobs = 2
+        self.tile_target_rows = TARGET_ROWS_PER_TILE
+        # Optional JobJournal recording finished tiles so the job can be resumed
+        self.journal = None
+        # Files, row groups, rows and bytes the read touches, from footer statistics
+        self.scan_summary = None
+        # Columns to download, None for all; geometry and bbox columns are always kept
+        self.columns = None
+        # Columns read and bytes not read because of the column selection
+        self.column_report = None
+        # SQL condition on the dataset's columns, ANDed with the spatial filter
+        self.attribute_filter = None
+        # Optional TileCache serving tiles of earlier downloads from disk
+        self.tile_cache = None
+        # Cache tiles used, hits and misses of the last run
+        self.cache_report = None
+        # Partitions and files read and skipped by partition pruning
+        self.partition_report = None
+        # Optional ManifestStore listing the files of wildcard datasets with their bboxes
+        self.manifest_store = None
+        # Manifest of the dataset for this run, and files read and skipped through it
+        self.manifest = None
+        self.manifest_report = None
+        # Rows written by the last run, None until the read finished
+        self.rows_written = None
+        # Count the job's HTTP requests, bytes and latencies from DuckDB's HTTP log
+        self.http_logging = True
+        # Summary of those requests in the last run, None if it made none
+        self.http_stats = None
+        self._http_connection_ids = None
+        # Save DuckDB's JSON profile of each main query next to the output and log its slowest operators
+        self.profiling = False
+        # Stage name -> profile file written by the last run
+        self.profiles = {}
+        # Message of the error that stopped the last run
+        self.error_message = None
+        # Connections running this job's queries, interrupted by kill()
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+
+    @property
+    def output_files(self):
+        return [self.output_file] + self.extra_outputs
+
+    def report_progress(self, message):
+        logger.log(message)
+
+    def report_percent(self, percent):
+        pass
+
+    def report_info(self, message):
+        logger.log(message)
+
+    def report_error(self, message):
+        self.error_message = message
+        logger.log(message, 2)
+
+    def report_finished(self):
+        pass
+
+    def report_output(self, path):
+        """A finished output file that can be opened as a layer"""
+        logger.log(f"Wrote {path}")
+
+    def report_size_warning(self, estimated_size):
+        """The GeoJSON output would be estimated_size MB; the job stopped without writing it"""
+        self.error_message = (
+            f"The GeoJSON output would be about {estimated_size:,.0f} MB; "
+            "set size_warning_accepted to write it anyway"
+        )
+        logger.log(self.error_message, 1)
+
+    def get_bbox_info_from_metadata(self, conn):
+        """Read GeoParquet metadata to find bbox column info"""
+        self.report_progress("Checking for bbox metadata...")
+        try:
+            return parse_bbox_covering(
+                get_geo_metadata(conn, self.dataset_url, self.metadata_cache)
+            )
+        except Exception as e:
+            logger.log(f"\nError parsing geo metadata: {str(e)}", 2)
+            logger.log(f"Exception type: {type(e)}", 2)
+            import traceback
+
+            logger.log(traceback.format_exc(), 2)
+        return None
+
+    def run(self):
+        with logger.span("job", url=self.dataset_url, output=self.output_file, layer=self.layer_name) as job_span:
+            self.run_job()
+            job_span.set(rows=self.rows_written, error=self.error_message)
+
+    def run_job(self):
+        try:
+            layer_info = f" for {self.layer_name}" if self.layer_name else ""
+            self.report_progress(f"Connecting to database{layer_info}...")
+            bbox = self.bbox
+
+            # Log the dataset URL and AOI for debugging
+            logger.log(f"Processing dataset: {self.dataset_url}")
+            if self.aoi_wkt:
+                logger.log(lambda: f"Using AOI geometry: {self.aoi_wkt}", logger.DEBUG)
+            else:
+                logger.log("No AOI geometry provided.")
+
+            #logger.log(f"Full validation_results at start of run: {self.validation_results}")
+
+            conn = None
+            owns_session = self.session is None
+            session = self.session or DuckDBSession()
+            job_start = time.perf_counter()
+            multi_output = bool(self.extra_outputs)
+            staging_file = None
+            job_done = False
+            job_error = ""
+            monitor = None
+            # Outputs already there before the job, with their modification times
+            existing_outputs = {
+                path: os.path.getmtime(path) for path in self.output_files if os.path.exists(path)
+            }
+            try:
+                # Get a connection with httpfs and spatial loaded
+                self.report_progress(f"Loading spatial extension{layer_info}...")
+
+                with logger.span("connect", warm=session.is_warm):
+                    if self.output_file.lower().endswith('.duckdb') and not multi_output:
+                        conn = session.connect_file(self.output_file)  # Connect directly to output file
+                        create_table = "CREATE TABLE"
+                    else:
+                        # Temp tables are private to this cursor in the shared database
+                        conn = session.cursor()
+                        create_table = "CREATE TEMP TABLE"
+                if self.http_logging and session.start_http_log(conn):
+                    self._http_connection_ids = set()
+                self.use_connection(conn)
+                if self.killed:
+                    return
+
+                # Get schema early as we need it for both column names and bbox check
+                with logger.span("schema") as schema_span:
+                    schema_result = get_schema(conn, self.dataset_url, self.metadata_cache)
+                    schema_span.set(columns=len(schema_result))
+                self.validation_results['schema'] = schema_result
+                
+                # Log the schema for debugging
+                #logger.log("Schema in Worker:")
+                #for row in schema_result:
+                    #logger.log(f"Column: {row[0]}, Type: {row[1]}")
+
+                # If geometry_column is not in validation_results, detect it now
+                if 'geometry_column' not in self.validation_results:
+                    #logger.log("No geometry_column in validation_results, detecting now")
+                    self.validation_results['geometry_column'] = 'geometry'  # Default
+                    geometry_found = False
+                    
+                    for row in schema_result:
+                        col_name = row[0]
+                        col_type = row[1].upper()
+                        #logger.log(f"Checking column {col_name} with type {col_type} for geometry")
+                        if 'GEOMETRY' in col_type or 'GEOGRAPHY' in col_type:
+                            self.validation_results['geometry_column'] = col_name
+                            logger.log(f"Found geometry column by type: {col_name}")
+                            geometry_found = True
+                            break
+                    
+                    if not geometry_found:
+                        # Try a different approach - look for columns
+                        #logger.log("No standard geometry column found, trying alternative detection")
+                        for row in schema_result:
+                            col_name = row[0].lower()
+                            col_name_orig = row[0]  # Keep original case
+                            col_type = row[1].upper()
+                            
+                            # Check for common geometry column names
+                            if col_name in ['geometry', 'geom', 'the_geom', 'wkb_geometry']:
+                                self.validation_results['geometry_column'] = col_name_orig
+                                #logger.log(f"Found likely geometry column by name: {col_name_orig}")
+                                geometry_found = True
+                                break
+                            # Also check for BLOB columns with geometry-like names
+                            elif 'BLOB' in col_type and col_name in ['geometry', 'geom', 'the_geom', 'wkb_geometry']:
+                                self.validation_results['geometry_column'] = col_name_orig
+                                logger.log(f"Found WKB BLOB geometry column: {col_name_orig}")
+                                geometry_found = True
+                                break
+                
+               #logger.log(f"Final geometry column detection result: {self.validation_results['geometry_column']}")
+
+                table_name = "download_data"
+
+                file_extension = self.output_file.lower().split('.')[-1]
+                format_options = self.get_format_options(file_extension)
+                if file_extension != 'duckdb' and format_options is None:
+                    self.report_error("Unsupported file format.")
+                    return
+                # Several outputs always stream once into a local Parquet stage
+                streaming = multi_output or self.use_streaming(file_extension)
+
+                # First check: Does the schema actually have a bbox column?
+                has_bbox_in_schema = False
+                expected_bbox_column = (self.validation_results.get('bbox_column') or 'bbox').lower()
+                if 'schema' in self.validation_results and self.validation_results['schema']:
+                    for row in self.validation_results['schema']:
+                        if row[0].lower() == expected_bbox_column and 'struct' in row[1].lower():
+                            has_bbox_in_schema = True
+                            #logger.log("Found actual bbox column in schema")
+                            break
+                    
+                    if not has_bbox_in_schema:
+                        #logger.log("No bbox column found in schema, overriding validation_results")
+                        # Force override incorrect bbox settings if schema doesn't have bbox
+                        self.validation_results['has_bbox'] = False
+                        self.validation_results['bbox_column'] = None
+                        self.validation_results['bbox_covering'] = None
+
+                # Now use the corrected validation_results
+                bbox_column = self.validation_results.get('bbox_column')
+                geometry_column = self.validation_results.get('geometry_column', 'geometry')
+                #logger.log(f"Final bbox_column value: {bbox_column}")
+                #logger.log(f"Using geometry column: {geometry_column}")
+
+                # Check if geometry column is a BLOB that needs conversion
+                geometry_col_type = None
+                for row in schema_result:
+                    if row[0] == geometry_column:
+                        geometry_col_type = row[1].upper()
+                        break
+                is_blob_geometry = bool(geometry_col_type and 'BLOB' in geometry_col_type)
+
+                # Geometry as read from the source; WKB BLOBs are converted on the fly
+                quoted_geometry = f'"{geometry_column}"'
+                geometry_expr = f"ST_GeomFromWKB({quoted_geometry})" if is_blob_geometry else quoted_geometry
+                # When streaming there is no intermediate table to convert afterwards,
+                # so BLOB geometries are converted in the same pass as the read
+                convert_in_query = streaming and is_blob_geometry
+
+                # Only the chosen columns are read; DuckDB pushes the projection into the Parquet scan
+                bbox_root = None
+                if bbox_column is not None:
+                    bbox_root = (self.validation_results.get('bbox_covering') or default_bbox_covering(bbox_column))['xmin'][0]
+                output_schema = self.selected_schema(schema_result, [geometry_column, bbox_root])
+
+                self.report_progress(f"Preparing query{layer_info}...")
+                select_query = self.build_select_query(
+                    output_schema,
+                    geometry_column,
+                    self.output_file.endswith(".parquet"),
+                    geometry_expr if convert_in_query else None,
+                )
+
+                bbox_covering = None
+                if bbox_column is not None:
+                    #logger.log(f"Using bbox column for query: {bbox_column}")
+                    # Overlap test on all four covering fields (GeoParquet 1.1 covering.bbox)
+                    bbox_covering = (
+                        self.validation_results.get('bbox_covering')
+                        or default_bbox_covering(bbox_column)
+                    )
+                    where_clause = f"""
+                    WHERE {bbox_overlap_predicate(bbox_covering, bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum())}
+                    """
+                else:
+                    #logger.log("Using spatial filter instead of bbox")
+                    # If it's a BLOB column in a materialized export, we can't use spatial
+                    # functions in the initial query. We'll apply the filter after converting
+                    if is_blob_geometry and not streaming:
+                        where_clause = ""  # No spatial filter initially for BLOB columns
+                    else:
+                        # For proper geometry columns, we can use spatial filter directly
+                        where_clause = f"""
+                        WHERE ST_Intersects(
+                            {geometry_expr},
+                            ST_GeomFromText('POLYGON(({bbox.xMinimum()} {bbox.yMinimum()},
+                                                {bbox.xMaximum()} {bbox.yMinimum()},
+                                                {bbox.xMaximum()} {bbox.yMaximum()},
+                                                {bbox.xMinimum()} {bbox.yMaximum()},
+                                                {bbox.xMinimum()} {bbox.yMinimum()}))')
+                        )
+                        """
+
+                # The attribute filter goes into the same WHERE, so DuckDB can also skip
+                # row groups on the statistics of the filtered columns
+                if self.attribute_filter:
+                    try:
+                        check_attribute_filter(conn, self.attribute_filter, schema_result)
+                    except ValueError as e:
+                        self.report_error(f"Invalid attribute filter{layer_info}: {e}")
+                        return
+                    connector = "AND" if where_clause.strip() else "WHERE"
+                    where_clause += f" {connector} ({self.attribute_filter})"
+                    logger.log(f"Applying attribute filter: {self.attribute_filter}")
+
+                # Additional filtering with the AOI polygon if available. It is bound as
+                # WKB rather than inlined, so a detailed AOI doesn't bloat the SQL text
+                aoi_wkt = self.aoi_wkt
+                self.query_parameters = None
+                if aoi_wkt:
+                    with logger.span("prepare_aoi") as aoi_span:
+                        aoi = prepare_aoi(conn, aoi_wkt, self.aoi_tolerance)
+                        aoi_span.set(vertices=aoi["vertices"], simplified_vertices=aoi["simplified_vertices"])
+                    self.query_parameters = {AOI_PARAMETER: aoi["wkb"]}
+                    connector = "AND" if where_clause.strip() else "WHERE"
+                    where_clause += f" {connector} {aoi_predicate(geometry_expr, bbox_covering, aoi['extent'])}"
+
+                    logger.log(lambda: f"Applying AOI geometry filter: {aoi_wkt}", logger.DEBUG)
+                    if aoi["simplified_vertices"] != aoi["vertices"]:
+                        logger.log(
+                            f"AOI simplified from {aoi['vertices']:,} to {aoi['simplified_vertices']:,} vertices "
+                            f"within {self.aoi_tolerance} degrees"
+                        )
+
+                if self.journal is not None:
+                    # Everything needed to run the job again without the map canvas
+                    self.journal.start({
+                        "url": self.dataset_url,
+                        "output_file": self.output_file,
+                        "extra_outputs": self.extra_outputs,
+                        "columns": self.columns,
+                        "attribute_filter": self.attribute_filter,
+                        "bbox": [bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum()],
+                        "aoi_wkt": aoi_wkt,
+                        "format": file_extension,
+                        "layer_name": self.layer_name,
+                        "validation_results": self.validation_results,
+                    })
+
+                if bbox_covering is not None:
+                    self.scan_summary = self.get_scan_summary(conn, bbox_covering, bbox)
+                if self.columns:
+                    self.report_column_savings(conn, output_schema, layer_info)
+
+                # Only partitions overlapping the extent are listed and opened
+                source = self.get_source(conn, bbox_covering, bbox, layer_info)
+                remote_source = source
+
+                # Read from cached tiles where earlier downloads already fetched them
+                cached = False
+                if self.tile_cache is not None and bbox_covering is not None:
+                    tile_source = self.fill_tile_cache(
+                        conn, bbox_covering, bbox, layer_info, self.cache_columns(output_schema, schema_result),
+                        remote_source,
+                    )
+                    if self.killed:
+                        return
+                    if tile_source is not None:
+                        source, cached = tile_source, True
+
+                if streaming:
+                    # Single pass: the filtered remote read feeds the COPY writer directly.
+                    # Hilbert bounds come from the requested extent rather than a
+                    # separate aggregate over the result, so nothing is materialized.
+                    hilbert_bounds = (
+                        f"ST_Extent(ST_MakeEnvelope({bbox.xMinimum()}, {bbox.yMinimum()}, "
+                        f"{bbox.xMaximum()}, {bbox.yMaximum()}))"
+                    )
+                    tiles = []
+                    if self.scan_summary is not None and self.tiling and not cached:
+                        tiles = self.plan_download_tiles(self.scan_summary["rows"], bbox)
+                    tiled = len(tiles) > 1
+
+                    stream_target, stream_select, stream_options = self.output_file, select_query, format_options
+                    if multi_output or tiled:
+                        # The remote scan happens once, into a Hilbert-sorted Parquet
+                        # stage; every requested format is then written from that file
+                        staging_file = self.get_staging_file()
+                        stream_target = staging_file
+                        stream_select = self.build_select_query(
+                            output_schema,
+                            geometry_column,
+                            True,
+                            geometry_expr if is_blob_geometry else None,
+                        )
+                        stream_options = self.get_format_options('parquet')
+
+                    if tiled:
+                        rows_written = self.download_tiles(
+                            conn, tiles, stream_select, where_clause, bbox_covering, bbox,
+                            geometry_expr, quoted_geometry, hilbert_bounds, stream_target, stream_options,
+                            layer_info, remote_source,
+                        )
+                        if self.killed:
+                            return
+                    else:
+                        copy_query = f"""
+                        COPY (
+                            {stream_select} FROM {source}
+                            {where_clause}
+                            ORDER BY ST_Hilbert({geometry_expr}, {hilbert_bounds})
+                        ) TO '{stream_target}' 
+                        """
+                        self.report_progress(f"Downloading{layer_info} data...")
+                        logger.log(lambda: f"Executing SQL query:\n{copy_query}{stream_options}", logger.DEBUG)
+
+                        with self.create_progress_monitor(layer_info) as monitor:
+                            monitor.track(conn)
+                            # Read, Hilbert sort and write run as one query
+                            with logger.span("read_sort_write", source=source) as copy_span, \
+                                    self.profile(conn, "copy"):
+                                result = self.execute_download_query(conn, copy_query + stream_options).fetchone()
+                                copy_span.set(rows=result[0] if result else None)
+                            monitor.unit_done(conn)
+                        rows_written = result[0] if result else None
+                    logger.log(f"Rows written{layer_info}: {rows_written}")
+                    self.rows_written = rows_written
+
+                    # Empty-result check from the COPY row count, no extra COUNT(*) scan
+                    if rows_written == 0:
+                        self.remove_output_file()
+                        self.report_info(f"No data found{layer_info} in the requested area. Check that your map extent overlaps with the data and/or expand your map extent. Skipping to next dataset if available.")
+                        job_done = True
+                        self.report_finished()
+                        return
+
+                    if staging_file:
+                        self.report_progress(f"Processing{layer_info} data to requested formats...")
+                        if not self.write_outputs(
+                            conn, session, f"read_parquet('{staging_file}')", output_schema,
+                            geometry_column, skip=staging_file
+                        ):
+                            return
+                else:
+                    # Base query
+                    base_query = f"""
+                    {create_table} {table_name} AS (
+                        {select_query} FROM {source}
+                        {where_clause}
+                    ) 
+                    """
+                    self.report_progress(f"Downloading{layer_info} data...")
+                    logger.log(lambda: f"Executing SQL query:\n{base_query}", logger.DEBUG)
+
+                    # Two units: the remote read, then the export
+                    monitor = self.create_progress_monitor(layer_info, units=2)
+                    monitor.start()
+                    monitor.track(conn)
+                    with logger.span("read", source=source), self.profile(conn, "create"):
+                        self.execute_download_query(conn, base_query)
+                    monitor.unit_done(conn)
+                
+                    # If we have a BLOB geometry column, we need to convert it after table creation
+                    # and apply spatial filter if needed
+                    if is_blob_geometry:
+                        # Create a new table with converted geometry
+                        temp_table = f"{table_name}_converted"
+                    
+                        # Build column list for conversion
+                        convert_columns = []
+                        for col_name, col_type, _, _, _, _ in schema_result:
+                            quoted_col_name = f'"{col_name}"'
+                            if col_name == geometry_column:
+                                convert_columns.append(f"ST_GeomFromWKB({quoted_col_name}) AS {quoted_col_name}")
+                            else:
+                                convert_columns.append(quoted_col_name)
+                    
+                        # Add spatial filter if bbox is available and we didn't filter earlier
+                        spatial_filter = ""
+                        if bbox and not bbox_column:  # Only if we didn't filter with bbox column
+                            spatial_filter = f"""
+                            WHERE ST_Intersects(
+                                ST_GeomFromWKB("{geometry_column}"),
+                                ST_GeomFromText('POLYGON(({bbox.xMinimum()} {bbox.yMinimum()},
+                                                    {bbox.xMaximum()} {bbox.yMinimum()},
+                                                    {bbox.xMaximum()} {bbox.yMaximum()},
+                                                    {bbox.xMinimum()} {bbox.yMaximum()},
+                                                    {bbox.xMinimum()} {bbox.yMinimum()}))')
+                            )
+                            """
+                    
+                        convert_query = f"""
+                        {create_table} {temp_table} AS
+                        SELECT {', '.join(convert_columns)}
+                        FROM {table_name}
+                        {spatial_filter}
+                        """
+                    
+                        with logger.span("convert_geometry"), self.profile(conn, "convert"):
+                            conn.execute(convert_query)
+                    
+                        # Drop original and rename
+                        conn.execute(f"DROP TABLE {table_name}")
+                        conn.execute(f"ALTER TABLE {temp_table} RENAME TO {table_name}")
+                
+                    # Add check for empty results
+                    row_count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+                    self.rows_written = row_count
+                    if row_count == 0:
+                        self.report_info(f"No data found{layer_info} in the requested area. Check that your map extent overlaps with the data and/or expand your map extent. Skipping to next dataset if available.")
+                        job_done = True
+                        self.report_finished()
+                        return
+
+                    self.report_progress(f"Processing{layer_info} data to requested format...")
+
+                    if file_extension == 'duckdb':
+                        # Commit the transaction to ensure the data is saved
+                        conn.commit()
+                        if not self.killed:
+                            self.report_info(
+                                "Data has been successfully saved to DuckDB database.\n\n"
+                                "Note: QGIS does not currently support loading DuckDB files directly."
+                            )
+                    else:
+                        # Check size if exporting to GeoJSON
+                        if self.output_file.lower().endswith('.geojson'):
+                            estimated_size = self.estimate_file_size(conn, table_name)
+                            if estimated_size > 4096 and not self.size_warning_accepted:  # 4GB warning threshold
+                                self.report_size_warning(estimated_size)
+                                return
+
+                        # At this point, if we converted BLOB to geometry, it's already a GEOMETRY type
+                        # So we don't need ST_GeomFromWKB anymore
+                        geometry_expr = quoted_geometry
+                        extent_expr = quoted_geometry
+                    
+                        copy_query = f"""
+                        COPY (
+                            WITH bbox AS (
+                                SELECT ST_Extent(ST_Extent_Agg({extent_expr}))::BOX_2D AS b
+                                FROM   {table_name}
+                            )
+                            SELECT   t.*
+                            FROM     {table_name} AS t
+                                    CROSS JOIN bbox
+                            ORDER BY ST_Hilbert(t.{geometry_expr}, bbox.b)
+                        ) TO '{self.output_file}' 
+                        """
+
+                        logger.log(lambda: f"Executing SQL query:\n{copy_query}{format_options}", logger.DEBUG)
+                        monitor.track(conn)
+                        with logger.span("sort_write", rows=row_count, format=file_extension) as write_span, \
+                                self.profile(conn, "copy"):
+                            conn.execute(copy_query + format_options)
+                            if os.path.exists(self.output_file):
+                                write_span.set(bytes=os.path.getsize(self.output_file))
+                        monitor.unit_done(conn)
+
+                if self.killed:
+                    return
+
+                if not self.killed:
+                    if self.output_file.lower().endswith('.duckdb'):
+                        self.report_info(
+                            "Data has been successfully saved to DuckDB database.\n\n"
+                            "Note: QGIS does not currently support loading DuckDB files directly."
+                        )
+                    else:
+                        self.report_output(self.output_file)
+                    job_done = True
+                    self.report_percent(100)
+                    self.report_finished()
+
+            except Exception as e:
+                if not self.killed:
+                    # Change error to info if it's a "no data" error
+                    error_str = str(e)
+                    if "No data found" in error_str:
+                        self.report_info(f"No data found{layer_info} in the requested area for {self.dataset_url}. Skipping to next dataset if available.")
+                        job_done = True
+                        self.report_finished()
+                    else:
+                        job_error = error_str
+                        self.report_error(error_str)
+            finally:
+                if monitor is not None:
+                    monitor.stop()
+                if self.journal is not None:
+                    if job_done:
+                        self.journal.remove()
+                    elif self.killed:
+                        self.journal.mark_stopped("cancelled")
+                    else:
+                        self.journal.mark_stopped("failed", job_error)
+                if staging_file and staging_file not in self.output_files:
+                    self.remove_file(staging_file)
+                if conn and self._http_connection_ids is not None:
+                    self.collect_http_stats(conn, job_done)
+                    session.finish_http_log(conn)
+                    self._http_connection_ids = None
+                if conn:
+                    self.release_connection(conn)
+                    if not self.output_file.lower().endswith('.duckdb'): # Clean up temporary table
+                        try:
+                            conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+                        except:
+                            pass
+                    conn.close()
+                if not job_done and (self.killed or job_error):
+                    self.remove_partial_outputs(existing_outputs)
+                job_seconds = time.perf_counter() - job_start
+                session.record_job(job_seconds)
+                details = ""
+                if self.column_report:
+                    details += f"; column selection saved about {self.column_report['bytes_saved'] / (1024 * 1024):.1f} MB"
+                if self.http_stats:
+                    details += f"; {format_http_stats(self.http_stats)}"
+                logger.log(f"Job{layer_info} took {job_seconds:.2f}s; {session.timing_summary()}{details}")
+                if owns_session:
+                    session.close()
+
+        except Exception as e:
+            if not self.killed:
+                self.report_error(str(e))
+
+    def kill(self):
+        """Stop the job, interrupting the running queries so the thread ends promptly"""
+        self.killed = True
+        with self._connections_lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                # Also abandons the HTTP range reads the query is waiting on
+                connection.interrupt()
+            except Exception as e:
+                logger.log(f"Could not interrupt query: {e}", 1)
+
+    def use_connection(self, connection, log_http=True):
+        """
+        Register a connection whose queries kill() should interrupt.
+
+        With HTTP logging on, its requests count towards the job's HTTP
+        statistics unless log_http is False (connections to other databases,
+        whose ids could clash with the job's database).
+        """
+        if log_http and self._http_connection_ids is not None:
+            connection_key = connection_id(connection)
+        with self._connections_lock:
+            self._connections.add(connection)
+            if log_http and self._http_connection_ids is not None:
+                self._http_connection_ids.add(connection_key)
+        return connection
+
+    def execute_download_query(self, conn, query):
+        """Run a query built on the job's WHERE clause, binding query_parameters when there are any"""
+        if self.query_parameters:
+            return conn.execute(query, self.query_parameters)
+        return conn.execute(query)
+
+    @contextlib.contextmanager
+    def profile(self, conn, stage):
+        """With profiling on, save the profile of the query run in the block and log its slowest operators"""
+        if not self.profiling:
+            yield
+            return
+        path = profile_path(self.output_file, stage)
+        with profiled(conn, path):
+            yield
+        summary = summarize_profile(path)
+        if summary is not None:
+            self.profiles[stage] = path
+            logger.log(format_profile(stage, summary))
+
+    def collect_http_stats(self, conn, write_record):
+        """Summarize the job's HTTP requests from DuckDB's log, and write them next to the output"""
+        with self._connections_lock:
+            connection_ids = list(self._http_connection_ids)
+        try:
+            requests = job_requests(conn, connection_ids)
+        except Exception as e:
+            logger.log(f"Could not read the HTTP log: {e}", 1)
+            return
+        if not requests:
+            # Local files, or everything came from the tile cache
+            return
+        self.http_stats = summarize_requests(requests)
+        if write_record and os.path.exists(self.output_file):
+            write_http_record(
+                self.output_file, self.http_stats, requests,
+                url=self.dataset_url, layer_name=self.layer_name,
+            )
+
+    def release_connection(self, connection):
+        with self._connections_lock:
+            self._connections.discard(connection)
+
+    def remove_partial_outputs(self, existing_outputs):
+        """
+        Remove outputs a cancelled or failed job left half written.
+
+        Files that were already there and haven't been touched stay, and so
+        do DuckDB databases that existed before, as they may hold other tables.
+        """
+        for path in self.output_files:
+            if path in existing_outputs:
+                if path.lower().endswith('.duckdb'):
+                    continue
+                if os.path.exists(path) and os.path.getmtime(path) == existing_outputs[path]:
+                    continue
+            self.remove_file(path)
+            if path.lower().endswith('.duckdb'):
+                self.remove_file(path + ".wal")
+
+    def get_format_options(self, file_extension):
+        """COPY options for the output format, or None if it isn't supported"""
+        for output_format in load_output_formats().values():
+            if output_format["extension"] == f".{file_extension}" and output_format["format_options"]:
+                return output_format["format_options"] + ";"
+        return None
+
+    def use_streaming(self, file_extension):
+        """Whether the export can run as a single read-and-write pipeline"""
+        if not self.streaming or file_extension == 'duckdb':
+            # A DuckDB output is the table itself
+            return False
+        # The GeoJSON size estimate samples a materialized table, so only stream
+        # once the user has accepted the size warning
+        return file_extension != 'geojson' or self.size_warning_accepted
+
+    def remove_output_file(self):
+        """Remove output files that should not be loaded (e.g. an empty result)"""
+        for path in self.output_files:
+            self.remove_file(path)
+
+    def remove_file(self, path):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.log(f"Could not remove {path}: {e}", 1)
+
+    def get_staging_file(self):
+        """Local Parquet file the remote read is written to when there are several outputs"""
+        for path in self.output_files:
+            if path.lower().endswith('.parquet'):
+                # A requested GeoParquet output doubles as the stage
+                return path
+        return os.path.splitext(self.output_file)[0] + ".staging.parquet"
+
+    def write_outputs(self, conn, session, source, schema_result, geometry_column, skip=None):
+        """
+        Write every requested output, except skip, from a local source.
+
+        Returns False if the job stopped, either killed or waiting on the
+        GeoJSON size warning.
+        """
+        for output in self.output_files:
+            if output == skip:
+                continue
+            if self.killed:
+                return False
+            extension = output.lower().split('.')[-1]
+            select_query = self.build_select_query(schema_result, geometry_column, extension == 'parquet')
+            self.report_progress(f"Writing {os.path.basename(output)}...")
+
+            if extension == 'duckdb':
+                out_conn = self.use_connection(session.connect_file(output), log_http=False)
+                try:
+                    if self.killed:
+                        return False
+                    with logger.span("write", format=extension):
+                        out_conn.execute(
+                            f"CREATE OR REPLACE TABLE download_data AS {select_query} FROM {source}"
+                        )
+                        out_conn.commit()
+                finally:
+                    self.release_connection(out_conn)
+                    out_conn.close()
+                continue
+
+            if extension == 'geojson' and not self.size_warning_accepted:
+                conn.execute(f"CREATE OR REPLACE TEMP VIEW download_data AS SELECT * FROM {source}")
+                estimated_size = self.estimate_file_size(conn, "download_data")
+                conn.execute("DROP VIEW IF EXISTS download_data")
+                if estimated_size > 4096:  # 4GB warning threshold
+                    self.report_size_warning(estimated_size)
+                    return False
+
+            copy_query = f"COPY ({select_query} FROM {source}) TO '{output}' "
+            logger.log(lambda: f"Executing SQL query:\n{copy_query}{self.get_format_options(extension)}", logger.DEBUG)
+            with logger.span("write", format=extension) as write_span, self.profile(conn, f"write-{extension}"):
+                conn.execute(copy_query + self.get_format_options(extension))
+                if os.path.exists(output):
+                    write_span.set(bytes=os.path.getsize(output))
+        return True
+
+    def fill_tile_cache(self, conn, covering, bbox, layer_info, columns=None, source=None):
+        """
+        Make sure every cache tile of the extent is on disk, fetching only the missing ones.
+
+        With columns, the tiles hold only those columns and are cached apart
+        from tiles of other column selections. Returns the SQL source reading
+        the extent from the cached tiles, or None when the cache can't serve
+        this job (unknown release, extent too large).
+        """
+        cache = self.tile_cache
+        if cache.dataset_dir(self.dataset_url, columns) is None:
+            logger.log(f"Not caching {self.dataset_url}: no release or version to key tiles by")
+            return None
+        tiles = tiles_for_extent(
+            bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum(), cache.tile_degrees
+        )
+        if len(tiles) > MAX_TILES_PER_JOB:
+            logger.log(f"Not caching{layer_info}: the extent covers {len(tiles)} cache tiles")
+            return None
+
+        missing = [tile for tile in tiles if not cache.has(self.dataset_url, tile, columns)]
+        hits = len(tiles) - len(missing)
+        self.cache_report = {"tiles": len(tiles), "hits": hits, "misses": len(missing)}
+        report = f"{hits} of {len(tiles)} tiles from the local cache ({hits / len(tiles):.0%} hit ratio)"
+        logger.log(f"Tile cache{layer_info}: {report}")
+        self.report_progress(f"Downloading{layer_info}: {report}")
+
+        if missing:
+            # One remote read fetches every missing tile into a local fill,
+            # which is then split into tiles without going back to the source
+            fill_file = cache.temp_path(self.dataset_url, {"key": "fill"}, columns)
+            try:
+                with self.create_progress_monitor(layer_info) as monitor, logger.span("fill_tile_cache", tiles=len(missing)):
+                    monitor.track(conn)
+                    conn.execute(cache.fill_query(self.dataset_url, covering, missing, fill_file, columns, source))
+                    monitor.unit_done(conn)
+                if self.killed:
+                    return None
+                cache.split(conn, covering, missing, fill_file, self.dataset_url, columns)
+            finally:
+                self.remove_file(fill_file)
+
+        tile_files = [cache.tile_path(self.dataset_url, tile, columns) for tile in tiles]
+        cache.evict(keep=tile_files)
+        return cached_source(
+            tile_files, covering, bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum(),
+            cache.tile_degrees,
+        )
+
+    def get_scan_summary(self, conn, covering, bbox):
+        """Files, row groups, rows and bytes the read of the extent touches, or None"""
+        with logger.span("bbox_metadata") as metadata_span:
+            try:
+                row_groups = self.get_row_groups(conn, covering)
+            except Exception as e:
+                logger.log(f"Could not read row group statistics: {e}", 1)
+                return None
+            summary = summarize_scan(
+                row_groups, bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum()
+            )
+            metadata_span.set(**summary)
+        logger.log(
+            f"Read touches {summary['files']} file(s), {summary['row_groups']} row group(s), "
+            f"about {summary['rows']} rows and {summary['bytes'] / (1024 * 1024):.1f} MB"
+        )
+        return summary
+
+    def create_progress_monitor(self, layer_info, units=1, done_units=0):
+        """ProgressMonitor reporting through the percent and progress hooks"""
+        def report(percent, message):
+            self.report_percent(percent)
+            self.report_progress(f"Downloading{layer_info}: {message}")
+
+        summary = self.scan_summary or {}
+        return ProgressMonitor(
+            report, units=units, done_units=done_units,
+            total_rows=summary.get("rows"), total_bytes=summary.get("bytes"),
+        )
+
+    def get_row_groups(self, conn, covering):
+        """Row group statistics, from the dataset's manifest when there is one"""
+        manifest = self.get_manifest(conn, covering)
+        if manifest is not None:
+            return manifest_row_groups(manifest)
+        return get_row_group_bounds(conn, self.dataset_url, covering, self.metadata_cache)
+
+    def get_manifest(self, conn, covering):
+        """
+        Manifest of a wildcard dataset: loaded from the store, or built and stored.
+
+        Building reads every footer once with parquet_metadata(); later jobs on
+        the same release skip listing the prefix and reading footers.
+        """
+        if self.manifest is not None or self.manifest_store is None or "*" not in self.dataset_url:
+            return self.manifest
+        self.manifest = self.manifest_store.load(self.dataset_url, covering)
+        if self.manifest is None:
+            try:
+                row_groups = get_row_group_bounds(conn, self.dataset_url, covering, self.metadata_cache)
+            except Exception as e:
+                logger.log(f"Could not build the file manifest: {e}", 1)
+                return None
+            self.manifest = build_manifest(self.dataset_url, covering, row_groups)
+            if self.manifest is not None:
+                self.manifest_store.save(self.manifest)
+                logger.log(f"Built the file manifest of {self.dataset_url}: {len(self.manifest['files'])} files")
+        return self.manifest
+
+    def manifest_files_source(self, bbox, layer_info):
+        """SQL source reading only the manifest's files that overlap the extent"""
+        files = self.manifest["files"]
+        paths = intersecting_files(self.manifest, bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum())
+        self.manifest_report = {"files": len(files), "files_read": len(paths), "files_skipped": len(files) - len(paths)}
+        logger.log(
+            f"File manifest{layer_info}: reading {len(paths)} of {len(files)} files, "
+            f"{len(files) - len(paths)} skipped"
+        )
+        if not paths and files:
+            # Nothing overlaps; one file still gives the query its schema
+            paths = [files[0]["path"]]
+        return manifest_source(self.dataset_url, paths)
+
+    def get_source(self, conn, covering, bbox, layer_info):
+        """
+        SQL source for the remote read.
+
+        With a manifest of a wildcard dataset only the files overlapping the
+        extent are passed to read_parquet. Without one, URLs globbing partition
+        directories (like by_country/*/*.parquet) are pruned by partition,
+        using bounds from the footer statistics.
+        """
+        if covering is not None and self.get_manifest(conn, covering) is not None:
+            return self.manifest_files_source(bbox, layer_info)
+
+        layout = partition_layout(self.dataset_url)
+        if layout is None or covering is None:
+            return dataset_source(self.dataset_url)
+        try:
+            row_groups = self.get_row_groups(conn, covering)
+        except Exception as e:
+            logger.log(f"Could not read partition statistics: {e}", 1)
+            return dataset_source(self.dataset_url)
+        prefix, pattern = layout
+        index = build_partition_index(row_groups, prefix)
+        if not index:
+            return dataset_source(self.dataset_url)
+
+        kept = prune_partitions(index, bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum())
+        total_files = sum(entry[0] for entry in index.values())
+        kept_files = sum(index[partition][0] for partition in kept)
+        self.partition_report = {
+            "partitions": len(index),
+            "partitions_read": len(kept),
+            "files": total_files,
+            "files_skipped": total_files - kept_files,
+        }
+        logger.log(
+            f"Partition pruning{layer_info}: reading {len(kept)} of {len(index)} partitions, "
+            f"{total_files - kept_files} of {total_files} files skipped"
+        )
+        if not kept:
+            # Nothing overlaps; one partition still gives the query its schema
+            kept = [min(index)]
+        return partition_source(prefix, pattern, kept)
+
+    def plan_download_tiles(self, estimated_rows, bbox):
+        """Tiles for the download extent, sized from the row estimate"""
+        if self.journal is not None and self.journal.tile_level is not None:
+            # A resumed job keeps the tiling its finished tiles were made with
+            level = self.journal.tile_level
+        else:
+            level = tile_level(estimated_rows, self.tile_target_rows)
+            logger.log(f"Estimated {estimated_rows} rows in the extent, downloading as {4 ** level} tile(s)")
+            if self.journal is not None:
+                self.journal.set_tile_level(level)
+        return plan_tiles(bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum(), level)
+
+    def download_tiles(self, conn, tiles, select_query, where_clause, covering, bbox,
+                       geometry_expr, quoted_geometry, hilbert_bounds, target, format_options, layer_info,
+                       source=None):
+        """
+        Download the extent tile by tile into part files, then merge them into target.
+
+        Each tile reads only the rows it owns, on its own cursor, so tiles run
+        in parallel and a failed tile is retried without touching the others.
+        With a journal, finished tiles are recorded and their parts kept until
+        the merge, so an interrupted job only downloads the missing tiles.
+        Returns the number of rows written.
+        """
+        parts_dir = os.path.splitext(target)[0] + "_tiles"
+        os.makedirs(parts_dir, exist_ok=True)
+        merged = False
+
+        done = self.journal.completed_tiles() if self.journal is not None else {}
+        if done:
+            logger.log(f"Resuming{layer_info}: {len(done)} of {len(tiles)} tiles already downloaded")
+        monitor = self.create_progress_monitor(layer_info, units=len(tiles), done_units=len(done))
+
+        def run_tile(tile):
+            part_file = os.path.join(parts_dir, f"part-{tile['index']:05d}.parquet")
+            ownership = tile_ownership_predicate(covering, tile, bbox.xMinimum(), bbox.yMinimum())
+            tile_query = f"""
+            COPY (
+                {select_query} FROM {source or dataset_source(self.dataset_url)}
+                {where_clause}
+                AND {ownership}
+                ORDER BY ST_Hilbert({geometry_expr}, {hilbert_bounds})
+            ) TO '{part_file}' {format_options}"""
+            # Each tile gets its own cursor on the job's database
+            cursor = self.use_connection(conn.cursor())
+            if self.killed:
+                self.release_connection(cursor)
+                cursor.close()
+                return None
+            monitor.track(cursor)
+            try:
+                with logger.span("tile", index=tile["index"]) as tile_span, \
+                        self.profile(cursor, f"tile-{tile['index']:05d}"):
+                    result = self.execute_download_query(cursor, tile_query).fetchone()
+                    tile_span.set(rows=result[0] if result else 0)
+            except Exception:
+                monitor.untrack(cursor)
+                self.remove_file(part_file)
+                raise
+            finally:
+                self.release_connection(cursor)
+                cursor.close()
+            monitor.unit_done(cursor)
+            rows = result[0] if result else 0
+            if self.journal is not None:
+                self.journal.mark_tile_done(tile["index"], part_file, rows)
+            return part_file, rows
+
+        try:
+            self.report_progress(f"Downloading{layer_info} data in {len(tiles)} tiles...")
+            with monitor:
+                results = run_tiles(
+                    [tile for tile in tiles if tile["index"] not in done],
+                    run_tile,
+                    max_workers=self.tile_jobs,
+                    should_stop=lambda: self.killed,
+                )
+            if self.killed:
+                return 0
+            results.update(done)
+            parts = [result for result in results.values() if result and result[1]]
+            rows_written = sum(rows for _, rows in parts)
+            if rows_written == 0:
+                merged = True
+                return 0
+
+            # Tiles own disjoint rows, so the merge is a plain union
+            part_list = ", ".join(f"'{part_file}'" for part_file, _ in sorted(parts))
+            merge_query = f"""
+            COPY (
+                SELECT * FROM read_parquet([{part_list}])
+                ORDER BY ST_Hilbert({quoted_geometry}, {hilbert_bounds})
+            ) TO '{target}' {format_options}"""
+            self.report_progress(f"Merging {len(parts)} tiles{layer_info}...")
+            logger.log(lambda: merge_query, logger.DEBUG)
+            with logger.span("merge", tiles=len(parts), rows=rows_written), self.profile(conn, "merge"):
+                conn.execute(merge_query)
+            merged = True
+            return rows_written
+        finally:
+            if merged or self.journal is None:
+                shutil.rmtree(parts_dir, ignore_errors=True)
+
+    def selected_schema(self, schema_result, keep=()):
+        """Schema rows of the columns to download: the chosen ones plus keep (geometry, bbox)"""
+        if not self.columns:
+            return schema_result
+        wanted = set(self.columns) | {column for column in keep if column}
+        return [row for row in schema_result if row[0] in wanted]
+
+    def cache_columns(self, output_schema, schema_result):
+        """Columns cache tiles need: the selection plus whatever the attribute filter reads"""
+        if not self.columns:
+            return None
+        columns = [row[0] for row in output_schema]
+        if self.attribute_filter:
+            columns += [
+                name for name in filter_columns(self.attribute_filter, schema_result) if name not in columns
+            ]
+        return columns
+
+    def report_column_savings(self, conn, output_schema, layer_info):
+        """Log how much less is read because of the column selection, from the footer sizes"""
+        try:
+            sizes = get_column_sizes(conn, self.dataset_url, self.metadata_cache)
+        except Exception as e:
+            logger.log(f"Could not read column sizes: {e}", 1)
+            return
+        total = sum(sizes.values())
+        if not total:
+            return
+        selected = sum(sizes.get(row[0], 0) for row in output_schema)
+        share_skipped = 1 - selected / total
+        if self.scan_summary is not None:
+            # The scan only fetches the chosen column chunks of the candidate row groups
+            bytes_saved = int(self.scan_summary["bytes"] * share_skipped)
+            self.scan_summary["bytes"] -= bytes_saved
+        else:
+            bytes_saved = total - selected
+        self.column_report = {
+            "columns": len(output_schema),
+            "total_columns": len(sizes),
+            "bytes_saved": bytes_saved,
+        }
+        logger.log(
+            f"Column selection{layer_info}: reading {len(output_schema)} of {len(sizes)} columns, "
+            f"about {bytes_saved / (1024 * 1024):.1f} MB ({share_skipped:.0%}) less to read"
+        )
+
+    def build_select_query(self, schema_result, geometry_column, for_parquet, geometry_expr=None):
+        """
+        SELECT clause for one output format.
+
+        Parquet keeps the columns as they are; other formats get nested and
+        array columns flattened. geometry_expr, if given, converts a WKB
+        geometry column while reading. With a column selection only the
+        columns in schema_result are listed.
+        """
+        quoted_geometry = f'"{geometry_column}"'
+        if for_parquet:
+            if self.columns:
+                columns = [
+                    f"{geometry_expr} AS {quoted_geometry}" if geometry_expr and row[0] == geometry_column
+                    else f'"{row[0]}"'
+                    for row in schema_result
+                ]
+                return f'SELECT {", ".join(columns)}'
+            if geometry_expr:
+                return f"SELECT * REPLACE ({geometry_expr} AS {quoted_geometry})"
+            return "SELECT *"
+
+        # Construct the SELECT clause with array conversion to strings
+        columns = self.process_schema_columns(schema_result)
+        if geometry_expr:
+            columns = [
+                f"{geometry_expr} AS {quoted_geometry}" if column == quoted_geometry else column
+                for column in columns
+            ]
+
+        # Check if this is Overture data and has a names column
+        has_names_column = any('names' in row[0] for row in schema_result)
+        if 'overture' in self.dataset_url and has_names_column:
+            return f'SELECT "names"."primary" as name,{", ".join(columns)}'
+        return f'SELECT {", ".join(columns)}'
+
+    def estimate_file_size(self, conn, table_name):
+        """Estimate the output file size in MB using GeoJSON feature collection structure"""
+        try:
+            # Get total row count
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+
+            # Use a smaller sample size for large datasets
+            sample_size = min(100, row_count)
+
+            if sample_size > 0:
+                # Create a proper GeoJSON FeatureCollection sample with all properties
+                sample_query = f"""
+                    WITH sample AS (
+                        SELECT * FROM {table_name} LIMIT {sample_size}
+                    )
+                    SELECT AVG(LENGTH(
+                        json_object(
+                            'type', 'Feature',
+                            'geometry', ST_AsGeoJSON(geometry),
+                            'properties', json_object(
+                                {', '.join([
+                    f"'{col[0]}', COALESCE(CAST({col[0]} AS VARCHAR), 'null')"
+                    for col in conn.execute(f"DESCRIBE {table_name}").fetchall()
+                    if col[0] != 'geometry'
+                ])}
+                            )
+                        )::VARCHAR
+                    )) as avg_feature_size
+                    FROM sample;
+                """
+
+                # Get average feature size
+                avg_feature_size = conn.execute(sample_query).fetchone()[0]
+
+                if avg_feature_size:
+                    # Account for GeoJSON overhead
+                    collection_overhead = (
+                        50  # {"type":"FeatureCollection","features":[]}
+                    )
+                    comma_overhead = row_count - 1  # Commas between features
+
+                    total_estimated_bytes = (
+                        (row_count * avg_feature_size)
+                        + collection_overhead
+                        + comma_overhead
+                    )
+                    return total_estimated_bytes / (1024 * 1024)  # Convert to MB
+            return 0
+
+        except Exception as e:
+            logger.log(f"Error estimating file size: {str(e)}", 2)
+            return 0
+
+    def process_schema_columns(self, schema_result):
+        """Process schema columns and return formatted SELECT clause"""
+        columns = []
+        for row in schema_result:
+            col_name = row[0]
+            col_type = row[1]
+            quoted_col_name = f'"{col_name}"'
+
+            if "STRUCT" in col_type.upper() or "MAP" in col_type.upper():
+                columns.append(f"TO_JSON({quoted_col_name}) AS {quoted_col_name}")
+            elif "[]" in col_type:
+                columns.append(
+                    f"array_to_string({quoted_col_name}, ', ') AS {quoted_col_name}"
+                )
+            elif col_type.upper() == "UTINYINT":
+                columns.append(
+                    f"CAST({quoted_col_name} AS INTEGER) AS {quoted_col_name}"
+                )
+            else:
+                columns.append(quoted_col_name)
+        return columns
+
+
+def download(dataset_url, bbox, output_file, aoi_wkt=None, extra_outputs=None, columns=None,
+             attribute_filter=None, layer_name=None, session=None, metadata_cache=None,
+             manifest_store=None, tile_cache=None, tile_jobs=2, size_warning_accepted=True, profiling=False,
+             aoi_tolerance=DEFAULT_AOI_TOLERANCE):
+    """
+    Download the rows of a dataset inside bbox (or the AOI) into output_file.
+
+    bbox is an Extent or an (xmin, ymin, xmax, ymax) tuple in EPSG:4326; it
+    may be None when aoi_wkt is given; a detailed AOI is simplified within
+    aoi_tolerance degrees. The format follows the extension of
+    output_file, and extra_outputs are written from the same read. Returns
+    the finished DownloadEngine, whose rows_written is 0 if nothing was in the
+    area, or raises DownloadError. With profiling, DuckDB's query profiles are
+    saved next to the output (see DownloadEngine.profiles).
+    """
+    owns_session = session is None
+    session = session or DuckDBSession()
+    try:
+        conn = session.cursor()
+        try:
+            validation_results = validate_dataset(conn, dataset_url, metadata_cache)
+            if bbox is None:
+                if not aoi_wkt:
+                    raise ValueError("Either bbox or aoi_wkt is needed")
+                bbox = wkt_extent(conn, aoi_wkt)
+        finally:
+            conn.close()
+        if isinstance(bbox, (tuple, list)):
+            bbox = Extent(*bbox)
+
+        engine = DownloadEngine(
+            dataset_url, bbox, output_file, validation_results, layer_name, aoi_wkt,
+            session=session, metadata_cache=metadata_cache, extra_outputs=extra_outputs,
+        )
+        engine.columns = list(columns) if columns else None
+        engine.attribute_filter = attribute_filter or None
+        engine.manifest_store = manifest_store
+        engine.tile_cache = tile_cache
+        engine.tile_jobs = tile_jobs
+        engine.size_warning_accepted = size_warning_accepted
+        engine.profiling = profiling
+        engine.aoi_tolerance = aoi_tolerance
+        engine.run()
+        if engine.error_message:
+            raise DownloadError(engine.error_message)
+        return engine
+    finally:
+        if owns_session:
+            session.close()
+
+
+def download_many(jobs, max_jobs=None, session=None, **options):
+    """
+    Run several downloads at once on one shared DuckDB database.
+
+    jobs are dicts of download() arguments; options apply to every job.
+    Returns one result per job, in order: the DownloadEngine, or the
+    exception that stopped the job.
+    """
+    if max_jobs is None:
+        from .resource_profile import max_parallel_jobs
+        max_jobs = max_parallel_jobs()
+    owns_session = session is None
+    session = session or DuckDBSession()
+
+    def run_job(job):
+        try:
+            return download(session=session, **dict(options, **job))
+        except Exception as e:
+            return e
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_jobs)) as executor:
+            return list(executor.map(run_job, jobs))
+    finally:
+        if owns_session:
+            session.close()
@@ -0,0 +1,73 @@
+from . import logger
+from .metadata_cache import get_geo_metadata, get_row_group_bounds, get_schema
+from .query import default_bbox_covering, parse_bbox_covering
+from .tiling import summarize_scan
+
+
+# Compressed MB to read above which the dialog asks before downloading
+DEFAULT_WARN_MB = 1024
+# Compressed MB to read above which the dialog refuses to download; 0 never blocks
+DEFAULT_BLOCK_MB = 0
+
+
+def find_bbox_covering(conn, dataset_url, cache=None):
+    """Covering columns with row group statistics, from the geo metadata or a bbox struct column"""
+    try:
+        covering = parse_bbox_covering(get_geo_metadata(conn, dataset_url, cache))
+    except Exception as e:
+        logger.log(f"Could not read geo metadata for the estimate: {e}", 1)
+        covering = None
+    if covering:
+        return covering
+    for row in get_schema(conn, dataset_url, cache):
+        if row[0].lower() == "bbox" and "struct" in row[1].lower():
+            return default_bbox_covering(row[0])
+    return None
+
+
+def estimate_download(conn, dataset_url, covering, xmin, ymin, xmax, ymax, cache=None):
+    """
+    Estimate what downloading an extent reads, before any data page is fetched.
+
+    Only the Parquet footers are read: row groups whose covering statistics
+    overlap the extent are counted, with their rows and compressed bytes.
+    """
+    row_groups = get_row_group_bounds(conn, dataset_url, covering, cache)
+    return summarize_scan(row_groups, xmin, ymin, xmax, ymax)
+
+
+def combine_estimates(estimates):
+    """Add up the estimates of several datasets; None marks one without statistics"""
+    total = {"files": 0, "row_groups": 0, "rows": 0, "bytes": 0, "unknown": 0}
+    for estimate in estimates:
+        if estimate is None:
+            total["unknown"] += 1
+            continue
+        for key in ("files", "row_groups", "rows", "bytes"):
+            total[key] += estimate[key]
+    return total
+
+
+def estimate_mb(estimate):
+    return estimate["bytes"] / (1024 * 1024)
+
+
+def format_estimate(estimate):
+    """e.g. "About 1,200,000 rows in 12 row groups of 3 files, 45.6 MB to read" """
+    text = (
+        f"About {estimate['rows']:,} rows in {estimate['row_groups']:,} row groups "
+        f"of {estimate['files']:,} files, {estimate_mb(estimate):,.1f} MB to read"
+    )
+    if estimate.get("unknown"):
+        text += f" ({estimate['unknown']} dataset(s) without statistics not included)"
+    return text
+
+
+def check_thresholds(estimate, warn_mb=DEFAULT_WARN_MB, block_mb=DEFAULT_BLOCK_MB):
+    """Verdict for an estimate: "block", "warn" or "ok"; a threshold of 0 is off"""
+    size = estimate_mb(estimate)
+    if block_mb and size > block_mb:
+        return "block"
+    if warn_mb and size > warn_mb:
+        return "warn"
+    return "ok"
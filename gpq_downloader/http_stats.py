@@ -0,0 +1,174 @@
+import json
+import os
+import re
+
+from . import logger
+
+
+# Upper bounds of the latency histogram buckets in milliseconds; slower requests go in the last bucket
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+RANGE_HEADER = re.compile(r"bytes=(\d+)-(\d+)")
+
+
+def enable_http_logging(conn):
+    """
+    Turn on DuckDB's HTTP logger for the connection's database.
+
+    Every httpfs request (HEAD, ranged GET, S3 listing) is then recorded with
+    its duration and response. Returns False for DuckDB versions without the
+    logger (before 1.3), which can't be instrumented.
+    """
+    try:
+        conn.execute("CALL enable_logging('HTTP')")
+        return True
+    except Exception as e:
+        logger.log(f"HTTP request logging not available: {e}", 1)
+        return False
+
+
+def connection_id(conn):
+    """DuckDB's id of a connection, which its log entries carry; None if it can't be read"""
+    try:
+        return conn.execute("SELECT current_connection_id()").fetchone()[0]
+    except Exception:
+        return None
+
+
+def header(headers, name):
+    """Case-insensitive header lookup in a logged headers map"""
+    if not headers:
+        return None
+    if "key" in headers and "value" in headers and isinstance(headers["key"], list):
+        # Older DuckDB versions return a MAP as key and value lists
+        headers = dict(zip(headers["key"], headers["value"]))
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def job_requests(conn, connection_ids):
+    """
+    HTTP requests made on the given connections, oldest first.
+
+    Each is a dict of method, url, status (the HTTP code or None), duration_ms,
+    bytes and range (the requested "bytes=a-b" or None).
+    """
+    ids = [str(int(connection)) for connection in connection_ids if connection is not None]
+    if not ids:
+        return []
+    rows = conn.execute(f"""
+        SELECT request.type, request.url, request.duration_ms, request.headers,
+               response.status, response.headers
+        FROM duckdb_logs_parsed('HTTP')
+        WHERE connection_id IN ({", ".join(ids)})
+        ORDER BY request.start_time
+    """).fetchall()
+
+    requests = []
+    for method, url, duration_ms, request_headers, status, response_headers in rows:
+        code = re.search(r"\d{3}", status or "")
+        requested_range = header(request_headers, "Range")
+        size = header(response_headers, "Content-Length")
+        if size is None and requested_range:
+            match = RANGE_HEADER.search(requested_range)
+            size = int(match.group(2)) - int(match.group(1)) + 1 if match else None
+        requests.append({
+            "method": method,
+            "url": url,
+            "status": int(code.group(0)) if code else None,
+            "duration_ms": duration_ms or 0,
+            # A HEAD response's Content-Length is the object size, not bytes sent
+            "bytes": int(size) if size is not None and method != "HEAD" else 0,
+            "range": requested_range,
+        })
+    return requests
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, int(round(share * len(values))) - 1))]
+
+
+def summarize_requests(requests):
+    """
+    Counts, bytes, retries and latency of a job's HTTP requests.
+
+    A request repeating an earlier one (same method, URL and range) counts as
+    a retry; a status outside 2xx counts as an error.
+    """
+    seen = set()
+    retries = errors = 0
+    methods = {}
+    histogram = {f"<={bound}ms": 0 for bound in LATENCY_BUCKETS_MS}
+    histogram[f">{LATENCY_BUCKETS_MS[-1]}ms"] = 0
+    for request in requests:
+        methods[request["method"]] = methods.get(request["method"], 0) + 1
+        key = (request["method"], request["url"], request["range"])
+        if key in seen:
+            retries += 1
+        seen.add(key)
+        if request["status"] is not None and not 200 <= request["status"] < 300:
+            errors += 1
+        bucket = next(
+            (f"<={bound}ms" for bound in LATENCY_BUCKETS_MS if request["duration_ms"] <= bound),
+            f">{LATENCY_BUCKETS_MS[-1]}ms",
+        )
+        histogram[bucket] += 1
+
+    latencies = sorted(request["duration_ms"] for request in requests)
+    total_bytes = sum(request["bytes"] for request in requests)
+    gets = methods.get("GET", 0)
+    return {
+        "requests": len(requests),
+        "methods": methods,
+        "bytes": total_bytes,
+        "mean_get_bytes": total_bytes // gets if gets else 0,
+        "retries": retries,
+        "errors": errors,
+        "files": len({request["url"] for request in requests}),
+        "latency_ms": {
+            "total": sum(latencies),
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "max": latencies[-1] if latencies else None,
+        },
+        "latency_histogram": histogram,
+    }
+
+
+def format_http_stats(stats):
+    """e.g. "120 HTTP requests (118 GET, 2 HEAD), 45.6 MB, p50 35 ms, p95 180 ms, 1 retry" """
+    methods = ", ".join(f"{count} {method}" for method, count in sorted(stats["methods"].items(), key=lambda m: -m[1]))
+    text = f"{stats['requests']} HTTP requests ({methods}), {stats['bytes'] / (1024 * 1024):.1f} MB"
+    latency = stats["latency_ms"]
+    if latency["p50"] is not None:
+        text += f", p50 {latency['p50']} ms, p95 {latency['p95']} ms"
+    if stats["retries"]:
+        text += f", {stats['retries']} {'retry' if stats['retries'] == 1 else 'retries'}"
+    if stats["errors"]:
+        text += f", {stats['errors']} failed"
+    return text
+
+
+def http_record_path(output_file):
+    return os.path.splitext(output_file)[0] + ".http.json"
+
+
+def write_http_record(output_file, stats, requests=None, **details):
+    """Write the stats (and each request, if given) as JSON next to the output; returns the path"""
+    path = http_record_path(output_file)
+    record = dict(details, stats=stats)
+    if requests is not None:
+        record["requests"] = requests
+    try:
+        with open(path, "w") as f:
+            json.dump(record, f, indent=2)
+    except OSError as e:
+        logger.log(f"Could not write HTTP statistics to {path}: {e}", 1)
+        return None
+    return path
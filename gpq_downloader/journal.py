@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from . import logger
+
+
+JOURNAL_DIR_NAME = ".gpq_downloader_jobs"
+
+# Spec fields that identify the work; if any differ the recorded tiles are stale
+SPEC_KEYS = ("url", "output_file", "extra_outputs", "columns", "attribute_filter", "bbox", "aoi_wkt")
+
+
+def journal_path(journal_dir, output_file):
+    """Journal file for the job writing output_file"""
+    digest = hashlib.sha1(os.path.abspath(output_file).encode("utf-8")).hexdigest()
+    return os.path.join(journal_dir, f"{digest}.json")
+
+
+class JobJournal:
+    """
+    Journal of one download job: what it downloads and which tiles are done.
+
+    The journal is rewritten after every finished tile, so when QGIS crashes
+    or the connection drops the job can be resumed and only the missing tiles
+    are downloaded again. It is removed once the job has completed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.spec = {}
+        self.tile_level = None
+        self.tiles = {}
+        self.status = "new"
+        self.message = ""
+        self.updated = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_output(cls, journal_dir, output_file):
+        """Journal for a job writing output_file, picking up an earlier attempt if there is one"""
+        path = journal_path(journal_dir, output_file)
+        return cls.load(path) if os.path.exists(path) else cls(path)
+
+    @classmethod
+    def load(cls, path):
+        journal = cls(path)
+        with open(path, "r") as f:
+            data = json.load(f)
+        journal.spec = data.get("spec", {})
+        journal.tile_level = data.get("tile_level")
+        journal.tiles = {int(index): tuple(done) for index, done in data.get("tiles", {}).items()}
+        journal.status = data.get("status", "running")
+        journal.message = data.get("message", "")
+        journal.updated = data.get("updated")
+        return journal
+
+    def save(self):
+        """Write the journal atomically, so a crash never leaves it half written"""
+        with self._lock:
+            self.updated = time.time()
+            data = {
+                "spec": self.spec,
+                "tile_level": self.tile_level,
+                "tiles": {str(index): list(done) for index, done in self.tiles.items()},
+                "status": self.status,
+                "message": self.message,
+                "updated": self.updated,
+            }
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, default=str)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.log(f"Could not write job journal {self.path}: {e}", 1)
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def start(self, spec):
+        """Record the job spec; tiles recorded for a different spec are dropped"""
+        if any(self.spec.get(key) != spec.get(key) for key in SPEC_KEYS):
+            self.tile_level = None
+            self.tiles = {}
+        self.spec = spec
+        self.status = "running"
+        self.message = ""
+        self.save()
+
+    def set_tile_level(self, level):
+        self.tile_level = level
+        self.save()
+
+    def completed_tiles(self):
+        """{tile index: (part_file, rows)} for finished tiles whose part file is still there"""
+        with self._lock:
+            return {
+                index: done for index, done in self.tiles.items()
+                if not done[1] or os.path.exists(done[0])
+            }
+
+    def mark_tile_done(self, index, part_file, rows):
+        with self._lock:
+            self.tiles[index] = (part_file, rows)
+        self.save()
+
+    def mark_stopped(self, status, message=""):
+        """Record why the job stopped ("cancelled" or "failed"), keeping it resumable"""
+        self.status = status
+        self.message = message
+        self.save()
+
+    def remove(self):
+        """Forget the job once it has completed"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def describe(self):
+        """One line summary for the resume dialog"""
+        spec = self.spec
+        name = spec.get("layer_name") or os.path.basename(spec.get("output_file", ""))
+        done = len(self.tiles)
+        total = 4 ** self.tile_level if self.tile_level is not None else None
+        progress = f"{done} of {total} tiles" if total and total > 1 else self.status
+        return f"{name} ({progress})"
+
+
+def list_journals(journal_dir):
+    """Journals of downloads that were started but never completed, newest first"""
+    if not os.path.isdir(journal_dir):
+        return []
+    journals = []
+    for name in os.listdir(journal_dir):
+        if not name.endswith(".json"):
+            continue
+        try:
+            journals.append(JobJournal.load(os.path.join(journal_dir, name)))
+        except (OSError, ValueError) as e:
+            logger.log(f"Skipping unreadable job journal {name}: {e}", 1)
+    journals.sort(key=lambda journal: journal.updated or 0, reverse=True)
+    return journals
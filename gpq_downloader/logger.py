@@ -1,7 +1,100 @@
-from qgis.core import Qgis, QgsMessageLog
+import json
+import os
+import queue
+import threading
+import time
 
+try:
+    from qgis.core import Qgis, QgsMessageLog
+except ImportError:
+    # Outside QGIS (the command line, scripts) messages go to Python logging
+    import logging
+
+    Qgis = QgsMessageLog = None
+    _logger = logging.getLogger("gpq_downloader")
+
+
+# Levels of log(); DEBUG covers SQL, WKT and other bulky detail, off by default
+DEBUG, INFO, WARNING, CRITICAL = -1, 0, 1, 2
+LEVEL_NAMES = {"debug": DEBUG, "info": INFO, "warning": WARNING, "critical": CRITICAL}
+# Longer messages are cut, so megabytes of SQL or WKT never reach the message log whole
+MAX_MESSAGE_CHARS = 10_000
+
+_level = INFO
+# Messages waiting for the writer thread, so callers never wait on the message log
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def set_level(level):
+    """Lowest level logged, a level or its name ("debug", "info", ...)"""
+    global _level
+    _level = LEVEL_NAMES.get(level, INFO) if isinstance(level, str) else level
+
+
+def enabled(level):
+    return level >= _level
+
+
+def truncate(message, limit=MAX_MESSAGE_CHARS):
+    if len(message) <= limit:
+        return message
+    return f"{message[:limit]}... ({len(message) - limit:,} more characters)"
+
+
+def log(message, level_in: int = INFO):
+    """
+    Log a message if its level is enabled.
+
+    message can be a callable returning the text, which is then only built
+    when the level is enabled: log(lambda: f"AOI: {wkt}", DEBUG). The message
+    is cut to MAX_MESSAGE_CHARS and handed to a writer thread.
+    """
+    if level_in < _level:
+        return
+    if callable(message):
+        try:
+            message = message()
+        except Exception as e:
+            message = f"Could not build log message: {e}"
+    _queue.put((truncate(str(message)), level_in))
+    if _writer is None:
+        _start_writer()
+
+
+def flush(timeout=5.0):
+    """Wait until queued messages are written, at most timeout seconds"""
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_queued, name="gpq_downloader log", daemon=True)
+            _writer.start()
+
+
+def _write_queued():
+    while True:
+        message, level_in = _queue.get()
+        try:
+            _write(message, level_in)
+        except Exception:
+            pass
+        finally:
+            _queue.task_done()
+
+
+def _write(message, level_in):
+    if QgsMessageLog is None:
+        levels = {DEBUG: logging.DEBUG, WARNING: logging.WARNING, CRITICAL: logging.CRITICAL}
+        _logger.log(levels.get(level_in, logging.INFO), message)
+        return
 
-def log(message: str, level_in: int = 0):
     if level_in == 0:
         level = Qgis.MessageLevel.Info
     elif level_in == 1:
@@ -11,4 +104,151 @@ def log(message: str, level_in: int = 0):
     else:
         level = Qgis.MessageLevel.Info
 
-    QgsMessageLog.logMessage(str(message), "GeoParquet Downloader", level)
+    QgsMessageLog.logMessage(message, "GeoParquet Downloader", level)
+
+
+class _NoSpan:
+    """Stand-in for span() while tracing is off: entering, exiting and set() do nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class Span:
+    """A timed phase of a job; nested in the span running on the same thread when it started"""
+
+    def __init__(self, trace, name, attributes):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.id = None
+        self.parent = None
+        self.thread = None
+        self.start = None
+        self.duration = None
+
+    def set(self, **attributes):
+        """Add attributes, e.g. rows and bytes once they are known"""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.parent = getattr(_current, "span", None)
+        self.thread = threading.get_ident()
+        self.id = self.trace.next_id()
+        _current.span = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.duration = time.perf_counter() - self.start
+        _current.span = self.parent
+        if exc_type is not None:
+            self.attributes["error"] = str(exc) or exc_type.__name__
+        self.trace.add(self)
+        return False
+
+
+class Trace:
+    """Finished spans of every job run while tracing was on"""
+
+    def __init__(self):
+        self.spans = []
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._ids = 0
+
+    def next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def records(self):
+        """Spans as dicts, in start order, with times in ms since the trace started"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return [
+            {
+                "name": s.name,
+                "id": s.id,
+                "parent": s.parent.id if s.parent else None,
+                "thread": s.thread,
+                "start_ms": round((s.start - self.start) * 1000, 3),
+                "duration_ms": round(s.duration * 1000, 3),
+                "attributes": s.attributes,
+            }
+            for s in spans
+        ]
+
+    def write_json_lines(self, path):
+        with open(path, "w") as f:
+            for record in self.records():
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def write_chrome_trace(self, path):
+        """Trace Event Format, for chrome://tracing or https://ui.perfetto.dev"""
+        events = [
+            {
+                "name": record["name"],
+                "cat": "gpq_downloader",
+                "ph": "X",
+                "ts": record["start_ms"] * 1000,
+                "dur": record["duration_ms"] * 1000,
+                "pid": os.getpid(),
+                "tid": record["thread"],
+                "args": record["attributes"],
+            }
+            for record in self.records()
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def write(self, path):
+        """JSON lines for a .jsonl path, Chrome trace format otherwise"""
+        if path.lower().endswith(".jsonl"):
+            self.write_json_lines(path)
+        else:
+            self.write_chrome_trace(path)
+
+
+_trace = None
+_current = threading.local()
+
+
+def start_trace():
+    """Start recording spans, returning the Trace; an already running trace is kept"""
+    global _trace
+    if _trace is None:
+        _trace = Trace()
+    return _trace
+
+
+def stop_trace():
+    """Stop recording spans and return the Trace, or None if tracing was off"""
+    global _trace
+    trace, _trace = _trace, None
+    return trace
+
+
+def span(name, **attributes):
+    """
+    Time the block as a span of the running trace: with span("read", url=url) as s: ...
+
+    While tracing is off this returns a shared no-op, so spans in the download
+    path cost next to nothing.
+    """
+    if _trace is None:
+        return NO_SPAN
+    return Span(_trace, name, attributes)
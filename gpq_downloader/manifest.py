@@ -0,0 +1,179 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from . import logger
+from .metadata_cache import DEFAULT_TTL_SECONDS, dataset_validator, get_row_group_bounds
+from .partitions import HIVE_SEGMENT
+from .query import default_bbox_covering
+
+
+MANIFEST_VERSION = 1
+
+
+def manifest_validator(url):
+    """
+    Validator of the files behind a wildcard URL.
+
+    Releases and single files use dataset_validator; local globs hash the
+    path, size and modification time of every matching file.
+    """
+    validator = dataset_validator(url)
+    if validator is not None:
+        return validator
+    path = url[len("file://"):] if url.startswith("file://") else url
+    if "://" not in path:
+        digest = hashlib.sha1()
+        for name in sorted(glob.glob(path)):
+            stat = os.stat(name)
+            digest.update(f"{name}|{stat.st_size}|{int(stat.st_mtime)}\n".encode("utf-8"))
+        return f"files={digest.hexdigest()}"
+    return None
+
+
+def build_manifest(url, covering, row_groups, validator=None):
+    """
+    Per file bbox, row count and row group bboxes from get_row_group_bounds rows.
+
+    Returns None if the rows carry no file names.
+    """
+    files = {}
+    for row_group in row_groups:
+        if len(row_group) < 8:
+            return None
+        entry = files.setdefault(row_group[7], {"path": row_group[7], "rows": 0, "bbox": None, "row_groups": []})
+        entry["rows"] += row_group[0] or 0
+        entry["row_groups"].append(list(row_group[:6]))
+
+    for entry in files.values():
+        bounds = [row_group[1:5] for row_group in entry["row_groups"]]
+        # A file with a row group lacking statistics keeps a None bbox and is always read
+        if bounds and all(None not in bound for bound in bounds):
+            entry["bbox"] = [
+                min(bound[0] for bound in bounds), min(bound[1] for bound in bounds),
+                max(bound[2] for bound in bounds), max(bound[3] for bound in bounds),
+            ]
+    return {
+        "version": MANIFEST_VERSION,
+        "url": url,
+        "validator": validator,
+        "created": time.time(),
+        "covering": covering,
+        "files": [files[path] for path in sorted(files)],
+    }
+
+
+def manifest_row_groups(manifest):
+    """The manifest as get_row_group_bounds rows"""
+    return [
+        list(row_group) + [index, entry["path"]]
+        for index, entry in enumerate(manifest["files"])
+        for row_group in entry["row_groups"]
+    ]
+
+
+def intersecting_files(manifest, xmin, ymin, xmax, ymax):
+    """Paths of the files with a row group that may hold rows inside the extent"""
+    paths = []
+    for entry in manifest["files"]:
+        for row_group in entry["row_groups"]:
+            rg_xmin, rg_ymin, rg_xmax, rg_ymax = row_group[1:5]
+            if None in (rg_xmin, rg_ymin, rg_xmax, rg_ymax) or not (
+                rg_xmin > xmax or rg_xmax < xmin or rg_ymin > ymax or rg_ymax < ymin
+            ):
+                paths.append(entry["path"])
+                break
+    return paths
+
+
+def manifest_source(url, paths):
+    """SQL source reading an explicit list of a dataset's files, without listing the prefix"""
+    files = ", ".join(f"'{path}'" for path in paths)
+    if HIVE_SEGMENT.search(url):
+        return f"read_parquet([{files}], hive_partitioning = true)"
+    return f"read_parquet([{files}])"
+
+
+class ManifestStore:
+    """
+    Manifests of wildcard datasets on disk, one per dataset URL and release.
+
+    Manifests of datasets without a release or other validator expire after
+    max_age_seconds, since files may have been added under the prefix.
+    """
+
+    def __init__(self, store_dir, max_age_seconds=DEFAULT_TTL_SECONDS):
+        self.store_dir = store_dir
+        self.max_age_seconds = max_age_seconds
+        self._validators = {}
+        os.makedirs(store_dir, exist_ok=True)
+
+    def validator(self, url):
+        if url not in self._validators:
+            self._validators[url] = manifest_validator(url)
+        return self._validators[url]
+
+    def path(self, url):
+        key = f"{url}|{self.validator(url) or ''}"
+        return os.path.join(self.store_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, url, covering):
+        """The stored manifest of a URL built with the same covering, or None"""
+        try:
+            with open(self.path(url), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("covering") != covering:
+            return None
+        if manifest.get("validator") is None and time.time() - manifest.get("created", 0) > self.max_age_seconds:
+            return None
+        return manifest
+
+    def save(self, manifest):
+        manifest["validator"] = self.validator(manifest["url"])
+        # Write to a temp file and rename so concurrent readers never see partial JSON
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, self.path(manifest["url"]))
+        except OSError as e:
+            logger.log(f"Could not write manifest: {e}", 1)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def build(self, conn, url, covering):
+        """Read every footer once with parquet_metadata() and store the manifest"""
+        manifest = build_manifest(url, covering, get_row_group_bounds(conn, url, covering), self.validator(url))
+        if manifest is not None:
+            self.save(manifest)
+        return manifest
+
+
+def main():
+    """Build the manifest of a dataset, e.g. a local directory of fixture files"""
+    import duckdb
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("url", help="Dataset URL or glob, e.g. 'fixtures/*.parquet'")
+    parser.add_argument("store", help="Directory to store the manifest in")
+    parser.add_argument("--bbox-column", default="bbox", help="bbox struct column with the row group statistics")
+    args = parser.parse_args()
+
+    url = os.path.join(args.url, "*.parquet") if os.path.isdir(args.url) else args.url
+    manifest = ManifestStore(args.store).build(duckdb.connect(), url, default_bbox_covering(args.bbox_column))
+    if manifest is None:
+        raise SystemExit(f"No files found for {url}")
+    rows = sum(entry["rows"] for entry in manifest["files"])
+    print(f"{len(manifest['files'])} files, {rows} rows: {ManifestStore(args.store).path(url)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import urllib.request
+
+from . import logger
+
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# Entries are per dataset and kind, a dataset has a handful of kinds
+DEFAULT_MAX_ENTRIES = 2000
+
+
+def dataset_validator(url, timeout=5):
+    """
+    Return a string that changes when the data behind a URL changes.
+
+    Overture-style URLs carry their release in the path, local files use their
+    size and modification time, and single remote HTTP files use the ETag or
+    size from a HEAD request. Returns None when nothing better than the cache
+    TTL is available (e.g. wildcard S3 prefixes without a release).
+    """
+    release = re.search(r"/release/([^/]+)/", url)
+    if release:
+        return f"release={release.group(1)}"
+
+    path = url[len("file://"):] if url.startswith("file://") else url
+    if "://" not in path and os.path.exists(path):
+        stat = os.stat(path)
+        return f"size={stat.st_size};mtime={int(stat.st_mtime)}"
+
+    if url.startswith(("http://", "https://")) and "*" not in url:
+        try:
+            request = urllib.request.Request(url, method="HEAD")
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                etag = response.headers.get("ETag")
+                if etag:
+                    return f"etag={etag}"
+                size = response.headers.get("Content-Length")
+                if size:
+                    return f"size={size}"
+        except Exception as e:
+            logger.log(f"Could not get validator for {url}: {e}", 1)
+    return None
+
+
+class MetadataCache:
+    """
+    On-disk cache of Parquet schemas and GeoParquet "geo" metadata.
+
+    Entries are keyed by dataset URL plus a validator (release, ETag or size)
+    and the kind of value, expire after a TTL, and the least recently used
+    entries are evicted once the cache holds more than max_entries. Each kind
+    has its own file, so a put only writes its own value: jobs and workers
+    storing different kinds of the same dataset at once can't drop each
+    other's, and a large row group list isn't rewritten by unrelated puts.
+    """
+
+    def __init__(self, cache_dir, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._validators = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def validator(self, url):
+        """Validator for a URL, looked up once per cache instance"""
+        if url not in self._validators:
+            self._validators[url] = dataset_validator(url)
+        return self._validators[url]
+
+    def _entry_path(self, url, kind):
+        key = f"{url}|{self.validator(url) or ''}|{kind}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _read_entry(self, path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, url, kind):
+        """Return the cached value of the given kind for a URL, or None"""
+        path = self._entry_path(url, kind)
+        entry = self._read_entry(path)
+        if entry is None or "value" not in entry:
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+        # Touch the file so eviction sees it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def put(self, url, kind, value):
+        """Store a value of the given kind for a URL"""
+        path = self._entry_path(url, kind)
+        entry = {"url": url, "validator": self.validator(url), "kind": kind, "created": time.time(), "value": value}
+
+        # Write to a temp file and rename so concurrent readers never see partial JSON
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.log(f"Could not write metadata cache entry: {e}", 1)
+            self._remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries"""
+        entries = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".json")
+        ]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=self._last_used)
+        for path in entries[: len(entries) - self.max_entries]:
+            self._remove(path)
+
+    def _last_used(self, path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            # Already removed by another job evicting at the same time
+            return 0
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            self._remove(os.path.join(self.cache_dir, name))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def get_schema(conn, dataset_url, cache=None):
+    """DESCRIBE a Parquet dataset, consulting the metadata cache first"""
+    if cache is not None:
+        schema = cache.get(dataset_url, "schema")
+        if schema is not None:
+            return [tuple(row) for row in schema]
+
+    schema_query = f"DESCRIBE SELECT * FROM read_parquet('{dataset_url}')"
+    schema = conn.execute(schema_query).fetchall()
+    if cache is not None and schema:
+        cache.put(dataset_url, "schema", [list(row) for row in schema])
+    return schema
+
+
+def get_geo_metadata(conn, dataset_url, cache=None):
+    """Return the raw GeoParquet "geo" metadata JSON string, or None if absent"""
+    if cache is not None:
+        cached = cache.get(dataset_url, "geo")
+        if cached is not None:
+            # An empty string records that the dataset has no geo metadata
+            return cached or None
+
+    metadata_query = f"SELECT key, value FROM parquet_kv_metadata('{dataset_url}')"
+    metadata_results = conn.execute(metadata_query).fetchall()
+
+    geo = None
+    for key, value in metadata_results:
+        if key == b"geo":
+            geo = value.decode()
+            break
+
+    if cache is not None:
+        cache.put(dataset_url, "geo", geo or "")
+    return geo
+
+
+def get_row_group_bounds(conn, dataset_url, covering, cache=None):
+    """
+    Per row group statistics from the Parquet footers of a dataset.
+
+    Returns a list of [num_rows, xmin, ymin, xmax, ymax, compressed_bytes, file_index, file_name],
+    with the bbox taken from the statistics of the covering columns. Only
+    footers are read, so this is cheap compared with scanning the data, and it
+    is cached like the schema. Row groups without statistics get None bounds.
+    """
+    kind = "row_groups:" + "|".join(".".join(covering[field]) for field in ("xmin", "ymin", "xmax", "ymax"))
+    if cache is not None:
+        cached = cache.get(dataset_url, kind)
+        if cached is not None:
+            return cached
+
+    # parquet_metadata names struct fields like "bbox, xmin"
+    paths = {field: ", ".join(covering[field]) for field in ("xmin", "ymin", "xmax", "ymax")}
+    bounds_query = f"""
+        SELECT
+            any_value(row_group_num_rows),
+            min(CASE WHEN path_in_schema = '{paths["xmin"]}' THEN TRY_CAST(stats_min_value AS DOUBLE) END),
+            min(CASE WHEN path_in_schema = '{paths["ymin"]}' THEN TRY_CAST(stats_min_value AS DOUBLE) END),
+            max(CASE WHEN path_in_schema = '{paths["xmax"]}' THEN TRY_CAST(stats_max_value AS DOUBLE) END),
+            max(CASE WHEN path_in_schema = '{paths["ymax"]}' THEN TRY_CAST(stats_max_value AS DOUBLE) END),
+            sum(total_compressed_size),
+            dense_rank() OVER (ORDER BY file_name) - 1,
+            file_name
+        FROM parquet_metadata('{dataset_url}')
+        GROUP BY file_name, row_group_id
+    """
+    row_groups = [list(row) for row in conn.execute(bounds_query).fetchall()]
+    if cache is not None:
+        cache.put(dataset_url, kind, row_groups)
+    return row_groups
+
+
+def get_column_sizes(conn, dataset_url, cache=None):
+    """Compressed bytes of every top level column over the whole dataset, from the footers"""
+    if cache is not None:
+        cached = cache.get(dataset_url, "column_sizes")
+        if cached is not None:
+            return cached
+
+    # Nested fields are reported like "bbox, xmin"; they count towards their column
+    sizes_query = f"""
+        SELECT split_part(path_in_schema, ', ', 1), sum(total_compressed_size)
+        FROM parquet_metadata('{dataset_url}')
+        GROUP BY 1
+    """
+    sizes = {column: int(size or 0) for column, size in conn.execute(sizes_query).fetchall()}
+    if cache is not None:
+        cache.put(dataset_url, "column_sizes", sizes)
+    return sizes
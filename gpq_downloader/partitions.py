@@ -0,0 +1,80 @@
+import re
+
+
+# A path segment like theme=buildings marks a Hive partitioned dataset
+HIVE_SEGMENT = re.compile(r"/[^/*=]+=[^/*]+/")
+
+
+def dataset_source(url):
+    """
+    SQL source reading a dataset URL.
+
+    URLs with key=value directories (Overture's theme=/type=) are read with
+    hive_partitioning on, so filters on those keys prune paths instead of
+    relying on DuckDB's auto-detection.
+    """
+    if HIVE_SEGMENT.search(url):
+        return f"read_parquet('{url}', hive_partitioning = true)"
+    return f"read_parquet('{url}')"
+
+
+def partition_layout(url):
+    """
+    (prefix, file pattern) of a URL globbing one level of partition directories.
+
+    e.g. ".../by_country/*/*.parquet" gives (".../by_country", "*.parquet").
+    URLs without a wildcard directory, or with several, give None.
+    """
+    parts = url.split("/")
+    for index, part in enumerate(parts[:-1]):
+        if "*" in part:
+            if part != "*" or any("*" in rest for rest in parts[index + 1:-1]):
+                return None
+            return "/".join(parts[:index]), "/".join(parts[index + 1:])
+    return None
+
+
+def build_partition_index(row_groups, prefix):
+    """
+    Bounds and file count of every partition directory under prefix.
+
+    Built from get_row_group_bounds rows, so it costs no reads beyond the
+    footers the estimate already fetched. Returns {partition: [files, xmin,
+    ymin, xmax, ymax]} with None bounds for partitions lacking statistics, or
+    None if the rows carry no file names.
+    """
+    files = {}
+    bounds = {}
+    for row_group in row_groups:
+        if len(row_group) < 8 or not row_group[7].startswith(prefix + "/"):
+            return None
+        partition = row_group[7][len(prefix) + 1:].split("/")[0]
+        files.setdefault(partition, set()).add(row_group[7])
+        rg_bounds = row_group[1:5]
+        current = bounds.get(partition, rg_bounds)
+        if None in rg_bounds or None in current:
+            bounds[partition] = [None] * 4
+        else:
+            bounds[partition] = [
+                min(current[0], rg_bounds[0]), min(current[1], rg_bounds[1]),
+                max(current[2], rg_bounds[2]), max(current[3], rg_bounds[3]),
+            ]
+    return {partition: [len(files[partition])] + bounds[partition] for partition in files}
+
+
+def prune_partitions(index, xmin, ymin, xmax, ymax):
+    """Partitions whose bounds overlap the extent; partitions without statistics are kept"""
+    kept = []
+    for partition, (_, p_xmin, p_ymin, p_xmax, p_ymax) in index.items():
+        if None not in (p_xmin, p_ymin, p_xmax, p_ymax) and (
+            p_xmin > xmax or p_xmax < xmin or p_ymin > ymax or p_ymax < ymin
+        ):
+            continue
+        kept.append(partition)
+    return sorted(kept)
+
+
+def partition_source(prefix, pattern, partitions):
+    """SQL source reading only the given partition directories"""
+    globs = ", ".join(f"'{prefix}/{partition}/{pattern}'" for partition in partitions)
+    return f"read_parquet([{globs}])"
@@ -1,5 +1,7 @@
 from qgis.PyQt.QtWidgets import (
     QAction,
+    QListWidget,
+    QListWidgetItem,
     QFileDialog,
     QMessageBox,
     QDialog,
@@ -15,12 +17,25 @@ from qgis.PyQt.QtWidgets import (
 )
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import Qt, QThread
-from qgis.core import QgsProject, QgsVectorLayer, QgsSettings
+from qgis.core import (
+    QgsApplication,
+    QgsCoordinateReferenceSystem,
+    QgsGeometry,
+    QgsProject,
+    QgsRectangle,
+    QgsSettings,
+    QgsVectorLayer,
+)
 import os
 import datetime
 from pathlib import Path
 
+from . import logger
 from .dialog import DataSourceDialog
+from .journal import JOURNAL_DIR_NAME, JobJournal, list_journals
+from .query import DEFAULT_AOI_TOLERANCE
+from .resource_profile import load_resource_profile, max_parallel_jobs, tile_jobs_per_job
+from .scheduler import DownloadScheduler
 from .utils import Worker
 
 
@@ -29,8 +44,26 @@ class QgisPluginGeoParquet:
         self.iface = iface
         self.worker = None
         self.worker_thread = None
+        # Cancelled workers and their threads, kept alive until the threads have ended
+        self.stopping_threads = []
         self.action = None
+        self.resume_action = None
         self.output_file = None
+        # Shared DuckDB database, created on first use so extensions load once
+        self.duckdb_session = None
+        # On-disk cache of dataset schemas and geo metadata
+        self.metadata_cache = None
+        # On-disk GeoParquet tiles of earlier downloads
+        self.tile_cache = None
+        # File manifests of wildcard datasets, so later jobs skip listing and footer reads
+        self.manifest_store = None
+        # Runs multi-dataset queues several jobs at a time
+        self.scheduler = None
+        self.job_messages = {}
+        # "debug" also logs the SQL and AOI geometry of each job
+        logger.set_level(QgsSettings().value(
+            "gpq_downloader/log_level", "info", type=str, section=QgsSettings.Plugins
+        ))
         # Create a default downloads directory in user's home directory
         self.download_dir = Path.home() / "Downloads"
         # Create the directory if it doesn't exist
@@ -49,9 +82,15 @@ class QgisPluginGeoParquet:
         # Add the actions to the toolbar
         self.iface.addToolBarIcon(self.action)
 
+        self.resume_action = QAction(
+            QIcon(icon_path), "Resume Interrupted Downloads", self.iface.mainWindow()
+        )
+        self.resume_action.triggered.connect(self.resume_downloads)
+        self.iface.addPluginToMenu("GeoParquet Downloader", self.resume_action)
+
     def unload(self):
         # Clean up worker and thread when plugin is unloaded
-        if self.worker_thread and self.worker_thread.isRunning():
+        if (self.worker_thread and self.worker_thread.isRunning()) or self.queue_running():
             QMessageBox.warning(
                 self.iface.mainWindow(),
                 "Download in Progress",
@@ -59,12 +98,82 @@ class QgisPluginGeoParquet:
             )
             return
         self.cleanup_thread()
+        # Cancelled queries were interrupted, so this is short
+        for _, thread in list(self.stopping_threads):
+            thread.wait()
+        if self.duckdb_session is not None:
+            self.duckdb_session.close()
+            self.duckdb_session = None
+        logger.flush()
         # Remove all actions from the toolbar
         self.iface.removeToolBarIcon(self.action)
+        if self.resume_action is not None:
+            self.iface.removePluginMenu("GeoParquet Downloader", self.resume_action)
+
+    def get_duckdb_session(self):
+        """Return the plugin-wide DuckDB session, creating it on first use"""
+        if self.duckdb_session is None:
+            from .duckdb_session import DuckDBSession
+            from .resource_profile import duckdb_settings, load_resource_profile
+            # Extensions live in the QGIS profile so they are installed once
+            extension_directory = os.path.join(
+                QgsApplication.qgisSettingsDirPath(), "gpq_downloader", "duckdb_extensions"
+            )
+            # Optional pre-seeded repository for machines without internet access
+            extension_repository = QgsSettings().value(
+                "gpq_downloader/extension_repository", "", type=str, section=QgsSettings.Plugins
+            )
+            # threads / memory_limit / temp_directory from the saved resource profile
+            settings = duckdb_settings(load_resource_profile())
+            self.duckdb_session = DuckDBSession(
+                settings=settings,
+                extension_directory=extension_directory,
+                extension_repository=extension_repository or None,
+            )
+        return self.duckdb_session
+
+    def get_metadata_cache(self):
+        """Return the schema/geo metadata cache stored in the QGIS profile"""
+        if self.metadata_cache is None:
+            from .metadata_cache import MetadataCache
+            cache_dir = os.path.join(
+                QgsApplication.qgisSettingsDirPath(), "gpq_downloader", "metadata_cache"
+            )
+            self.metadata_cache = MetadataCache(cache_dir)
+        return self.metadata_cache
+
+    def get_tile_cache(self):
+        """Return the tile cache stored in the QGIS profile, or None if it's turned off"""
+        from .tile_cache import DEFAULT_MAX_MB, TileCache
+        max_mb = QgsSettings().value(
+            "gpq_downloader/tile_cache_mb", DEFAULT_MAX_MB, type=int, section=QgsSettings.Plugins
+        )
+        if not max_mb:
+            return None
+        if self.tile_cache is None:
+            cache_dir = os.path.join(
+                QgsApplication.qgisSettingsDirPath(), "gpq_downloader", "tile_cache"
+            )
+            self.tile_cache = TileCache(cache_dir)
+        self.tile_cache.max_bytes = max_mb * 1024 * 1024
+        return self.tile_cache
+
+    def get_manifest_store(self):
+        """Return the store of wildcard dataset manifests in the QGIS profile"""
+        from .manifest import ManifestStore
+        if self.manifest_store is None:
+            self.manifest_store = ManifestStore(
+                os.path.join(QgsApplication.qgisSettingsDirPath(), "gpq_downloader", "manifests")
+            )
+        return self.manifest_store
+
+    def journal_dir(self):
+        """Where job journals of interrupted downloads are kept"""
+        return str(self.download_dir / JOURNAL_DIR_NAME)
 
     def run(self, default_source=None):
         # Check if a worker is already running
-        if self.worker is not None and self.worker_thread is not None and self.worker_thread.isRunning():
+        if (self.worker is not None and self.worker_thread is not None and self.worker_thread.isRunning()) or self.queue_running():
             QMessageBox.warning(
                 self.iface.mainWindow(),
                 "Download in Progress",
@@ -76,7 +185,10 @@ class QgisPluginGeoParquet:
         self.worker = None
         self.worker_thread = None
         
-        dialog = DataSourceDialog(self.iface.mainWindow(), self.iface)
+        dialog = DataSourceDialog(
+            self.iface.mainWindow(), self.iface,
+            session=self.get_duckdb_session(), metadata_cache=self.get_metadata_cache()
+        )
 
         # Restore last radio selection
         selected_name = QgsSettings().value("gpq_downloader/radio_selection", section=QgsSettings.Plugins)
@@ -118,6 +230,10 @@ class QgisPluginGeoParquet:
                 )
                 aoi_geometry.transform(transform)
         
+        # Columns picked in the dialog only apply to the dataset they were loaded from
+        columns = dialog.get_selected_columns()
+        attribute_filter = dialog.get_attribute_filter()
+
         # First, collect all file locations from user
         download_queue = []
         for url in urls:
@@ -158,7 +274,14 @@ class QgisPluginGeoParquet:
             )
             
             if output_file:
-                download_queue.append((url, output_file))
+                # Other formats are written next to it from the same download
+                base, extension = os.path.splitext(output_file)
+                extra_outputs = [
+                    base + extra for extra in dialog.get_extra_formats()
+                    if extra != extension.lower()
+                ]
+                url_columns = columns if url == dialog.columns_url else None
+                download_queue.append((url, output_file, extra_outputs, url_columns, attribute_filter))
             else:
                 return
         
@@ -232,6 +355,8 @@ class QgisPluginGeoParquet:
             self.progress_dialog.setLabelText(message)
 
     def cancel_download(self):
+        if self.scheduler is not None:
+            self.scheduler.cancel()
         if self.worker:
             self.worker.kill()
         self.cleanup_thread()
@@ -240,8 +365,15 @@ class QgisPluginGeoParquet:
         if self.worker_thread is not None:
             if self.worker:
                 self.worker.kill()
+            # kill() interrupts the running query, so the thread ends by itself
+            # shortly; waiting for it here would freeze the QGIS UI
+            if not self.worker_thread.isFinished():
+                stopping = (self.worker, self.worker_thread)
+                self.stopping_threads.append(stopping)
+                self.worker_thread.finished.connect(
+                    lambda s=stopping: self.stopping_threads.remove(s) if s in self.stopping_threads else None
+                )
             self.worker_thread.quit()
-            self.worker_thread.wait()
             self.worker_thread = None
             self.worker = None
         if hasattr(self, "progress_dialog"):
@@ -284,17 +416,19 @@ class QgisPluginGeoParquet:
                 return
 
         layer_name = Path(output_file).stem  # Get filename without extension
-        # Create the layer
-        layer = QgsVectorLayer(output_file, layer_name, "ogr")
-        if not layer.isValid():
-            QMessageBox.critical(
-                self.iface.mainWindow(),
-                "Error",
-                f"Failed to load the layer from {output_file}",
-            )
-            return
-        # Add the layer to the QGIS project
-        QgsProject.instance().addMapLayer(layer)
+        with logger.span("load_layer", output=output_file) as load_span:
+            # Create the layer
+            layer = QgsVectorLayer(output_file, layer_name, "ogr")
+            if not layer.isValid():
+                QMessageBox.critical(
+                    self.iface.mainWindow(),
+                    "Error",
+                    f"Failed to load the layer from {output_file}",
+                )
+                return
+            load_span.set(features=layer.featureCount())
+            # Add the layer to the QGIS project
+            QgsProject.instance().addMapLayer(layer)
 
     def show_info(self, message):
         """Show an information message to the user"""
@@ -318,7 +452,53 @@ class QgisPluginGeoParquet:
         
         if hasattr(self, 'progress_dialog') and self.progress_dialog:
             self.progress_dialog.close()
-        
+
+        choice = self.prompt_large_file(estimated_size, worker_info['output_file'])
+        if choice is None:
+            if worker_info['remaining_queue']:
+                self.process_download_queue(worker_info['remaining_queue'], worker_info['extent'])
+            else:
+                self.cleanup_thread()
+            return
+
+        output_file, size_warning_accepted = choice
+        self.progress_dialog = self.create_progress_dialog()
+        self.output_file = output_file
+
+        self.worker = Worker(
+            worker_info['dataset_url'],
+            worker_info['extent'],
+            output_file,
+            worker_info['iface'],
+            worker_info['validation_results'],
+            session=self.get_duckdb_session(),
+            metadata_cache=self.get_metadata_cache()
+        )
+        self.worker.remaining_queue = worker_info['remaining_queue']
+        self.worker.size_warning_accepted = size_warning_accepted
+        self.worker_thread = QThread()
+        self.worker.moveToThread(self.worker_thread)
+
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.error.connect(self.handle_error)
+        self.worker.load_layer.connect(self.load_layer)
+        self.worker.info.connect(self.show_info)
+        self.worker.file_size_warning.connect(self.handle_large_file_warning)
+        self.worker.finished.connect(lambda: self.handle_download_complete(worker_info['remaining_queue'], worker_info['extent']))
+        self.worker.progress.connect(self.update_progress)
+        self.worker.percent.connect(self.progress_dialog.setValue)
+        self.progress_dialog.canceled.connect(self.cancel_download)
+
+        self.progress_dialog.show()
+        self.worker_thread.start()
+
+    def prompt_large_file(self, estimated_size, output_file):
+        """
+        Ask what to do about a large GeoJSON output.
+
+        Returns None to skip the download, otherwise (output_file, size_warning_accepted):
+        a new file in another format, or the original GeoJSON file accepted as is.
+        """
         dialog = QDialog(self.iface.mainWindow())
         dialog.setWindowTitle("Large File Warning")
         dialog.setMinimumWidth(400)
@@ -373,94 +553,31 @@ class QgisPluginGeoParquet:
             if result == 1:
                 selected_format = format_combo.currentText()
                 extension = selected_format.split("*")[1].rstrip(")")
-                
-                new_output_file = os.path.splitext(worker_info['output_file'])[0] + extension
-                
-                output_file, _ = QFileDialog.getSaveFileName(
+
+                new_output_file = os.path.splitext(output_file)[0] + extension
+
+                new_output_file, _ = QFileDialog.getSaveFileName(
                     self.iface.mainWindow(),
                     "Save Data",
                     new_output_file,
                     selected_format
                 )
-                
-                if output_file:
-                    self.progress_dialog = QProgressDialog("Starting download...", "Cancel", 0, 0, self.iface.mainWindow())
-                    self.progress_dialog.setWindowTitle("Downloading Data")
-                    self.progress_dialog.setWindowModality(Qt.WindowModality.NonModal)
-                    self.progress_dialog.setMinimumDuration(0)
-                    
-                    self.output_file = output_file
-                    
-                    self.worker = Worker(
-                        worker_info['dataset_url'],
-                        worker_info['extent'],
-                        output_file,
-                        worker_info['iface'],
-                        worker_info['validation_results']
-                    )
-                    self.worker.remaining_queue = worker_info['remaining_queue']
-                    self.worker_thread = QThread()
-                    self.worker.moveToThread(self.worker_thread)
-                    
-                    self.worker_thread.started.connect(self.worker.run)
-                    self.worker.error.connect(self.handle_error)
-                    self.worker.load_layer.connect(self.load_layer)
-                    self.worker.info.connect(self.show_info)
-                    self.worker.file_size_warning.connect(self.handle_large_file_warning)
-                    self.worker.finished.connect(lambda: self.handle_download_complete(worker_info['remaining_queue'], worker_info['extent']))
-                    self.worker.progress.connect(self.update_progress)
-                    self.progress_dialog.canceled.connect(self.cancel_download)
-                    
-                    self.progress_dialog.show()
-                    self.worker_thread.start()
-                    return
+
+                if new_output_file:
+                    return new_output_file, False
                 continue
-            
+
             elif result == 2:
-                self.progress_dialog = QProgressDialog("Starting download...", "Cancel", 0, 0, self.iface.mainWindow())
-                self.progress_dialog.setWindowTitle("Downloading Data")
-                self.progress_dialog.setWindowModality(Qt.WindowModality.NonModal)
-                self.progress_dialog.setMinimumDuration(0)
-                
-                self.worker = Worker(
-                    worker_info['dataset_url'],
-                    worker_info['extent'],
-                    worker_info['output_file'],
-                    worker_info['iface'],
-                    worker_info['validation_results']
-                )
-                self.worker.remaining_queue = worker_info['remaining_queue']
-                self.worker_thread = QThread()
-                self.worker.moveToThread(self.worker_thread)
-                
-                self.worker_thread.started.connect(self.worker.run)
-                self.worker.error.connect(self.handle_error)
-                self.worker.load_layer.connect(self.load_layer)
-                self.worker.info.connect(self.show_info)
-                self.worker.file_size_warning.connect(self.handle_large_file_warning)
-                self.worker.finished.connect(lambda: self.handle_download_complete(worker_info['remaining_queue'], worker_info['extent']))
-                self.worker.progress.connect(self.update_progress)
-                self.progress_dialog.canceled.connect(self.cancel_download)
-                
-                self.worker.size_warning_accepted = True
-                
-                self.progress_dialog.show()
-                self.worker_thread.start()
-                return
-            
-            else:
-                if worker_info['remaining_queue']:
-                    self.process_download_queue(worker_info['remaining_queue'], worker_info['extent'])
-                else:
-                    self.cleanup_thread()
-                return
+                return output_file, True
+
+            return None
 
     def create_progress_dialog(
         self, title="Downloading Data", message="Starting download..."
     ):
         """Create and return a configured progress dialog"""
         progress_dialog = QProgressDialog(
-            message, "Cancel", 0, 0, self.iface.mainWindow()
+            message, "Cancel", 0, 100, self.iface.mainWindow()
         )
         progress_dialog.setWindowTitle(title)
         progress_dialog.setWindowModality(Qt.WindowModality.NonModal)
@@ -470,7 +587,8 @@ class QgisPluginGeoParquet:
     def setup_worker(self, dataset_url, extent, output_file, validation_results, aoi_geometry=None):
         """Create and setup a worker thread with all connections"""
         self.worker = Worker(
-            dataset_url, extent, output_file, self.iface, validation_results, aoi_geometry=aoi_geometry
+            dataset_url, extent, output_file, self.iface, validation_results, aoi_geometry=aoi_geometry,
+            session=self.get_duckdb_session(), metadata_cache=self.get_metadata_cache()
         )
         self.worker_thread = QThread()
         self.worker.moveToThread(self.worker_thread)
@@ -483,19 +601,17 @@ class QgisPluginGeoParquet:
         self.worker.file_size_warning.connect(self.handle_large_file_warning)
         self.worker.finished.connect(self.cleanup_thread)
         self.worker.progress.connect(self.update_progress)
+        self.worker.percent.connect(self.progress_dialog.setValue)
         self.progress_dialog.canceled.connect(self.cancel_download)
 
         return self.worker, self.worker_thread
 
-    def process_download_queue(self, download_queue, extent, aoi_geometry=None):
-        """Process downloads sequentially"""
-        if not download_queue:
-            return
-        
-        # Get the next download
-        url, output_file = download_queue[0]
-        remaining_queue = download_queue[1:]
-        
+    def queue_running(self):
+        return self.scheduler is not None and self.scheduler.is_running()
+
+    def create_download_job(self, url, output_file, extent, aoi_geometry=None, extra_outputs=None, columns=None,
+                            attribute_filter=None):
+        """Describe one queued download for the scheduler"""
         # Extract layer name from URL for Overture data
         layer_name = None
         if 'overture' in url:
@@ -507,57 +623,259 @@ class QgisPluginGeoParquet:
                     layer_name = f"Overture {theme.title()} - {subtype.title()}"
                 else:
                     layer_name = f"Overture {theme.title()}"
-        
+
         # Create validation results (we know Overture URLs are valid)
         validation_results = {'has_bbox': True, 'bbox_column': 'bbox', 'geometry_column': 'geometry'}
-        
+
         # For non-Overture data, try to detect the geometry column name from the URL
         if 'overture' not in url:
             from . import logger
             #logger.log(f"Processing URL: {url}")
-            
+
             # Try to extract dataset name from URL for better logging
             dataset_name = url.split('/')[-1].split('?')[0]
             #logger.log(f"Dataset name from URL: {dataset_name}")
-            
+
             # For specific known datasets, set the geometry column
             if 'addresses.nobbox.pq' in url or 'addresses.pq' in url:
                 #logger.log("Detected addresses dataset, setting geometry column to 'geom'")
                 validation_results['geometry_column'] = 'geom'
-        
-       #logger.log(f"Initial validation_results: {validation_results}")
-        
-        # Create progress dialog
+
+        return {
+            'url': url,
+            'output_file': output_file,
+            'extra_outputs': list(extra_outputs or []),
+            'columns': list(columns) if columns else None,
+            'attribute_filter': attribute_filter or None,
+            'extent': extent,
+            'aoi_geometry': aoi_geometry,
+            'layer_name': layer_name,
+            'validation_results': validation_results,
+        }
+
+    def create_queue_worker(self, job):
+        """Create the Worker for a scheduled job"""
+        worker = Worker(job['url'], job['extent'], job['output_file'], self.iface,
+                        job['validation_results'], job['layer_name'], aoi_geometry=job['aoi_geometry'],
+                        session=self.get_duckdb_session(), metadata_cache=self.get_metadata_cache(),
+                        extra_outputs=job.get('extra_outputs'))
+        worker.size_warning_accepted = job.get('size_warning_accepted', False)
+        # The scheduler's jobs and their tiles split one parallelism budget
+        running_jobs = min(self.scheduler.max_jobs, len(self.scheduler.jobs)) if self.scheduler else 1
+        worker.tile_jobs = tile_jobs_per_job(load_resource_profile(), running_jobs)
+        worker.tile_cache = self.get_tile_cache()
+        worker.profiling = QgsSettings().value(
+            "gpq_downloader/profile_queries", False, type=bool, section=QgsSettings.Plugins
+        )
+        worker.aoi_tolerance = QgsSettings().value(
+            "gpq_downloader/aoi_tolerance", DEFAULT_AOI_TOLERANCE, type=float, section=QgsSettings.Plugins
+        )
+        worker.manifest_store = self.get_manifest_store()
+        worker.columns = job.get('columns')
+        worker.attribute_filter = job.get('attribute_filter')
+        if job.get('extent_crs'):
+            worker.extent_crs = QgsCoordinateReferenceSystem(job['extent_crs'])
+        worker.journal = job.get('journal') or JobJournal.for_output(self.journal_dir(), job['output_file'])
+        return worker
+
+    def process_download_queue(self, download_queue, extent, aoi_geometry=None):
+        """Process downloads, running up to the configured number at once"""
+        if not download_queue:
+            return
+
+        # Entries are (url, output_file), optionally followed by extra_outputs,
+        # columns and attribute_filter
+        jobs = [
+            self.create_download_job(entry[0], entry[1], extent, aoi_geometry, *entry[2:5])
+            for entry in download_queue
+        ]
+        self.start_jobs(jobs)
+
+    def start_jobs(self, jobs):
+        """Run download jobs through the scheduler with a progress dialog"""
+        max_jobs = max_parallel_jobs(load_resource_profile())
+
+        # Create progress dialog; every job counts for 100 steps of the bar
+        first_layer = jobs[0]['layer_name']
         self.progress_dialog = QProgressDialog(
-            "Starting download..." if not layer_name else f"Starting {layer_name} download...",
-            "Cancel", 0, 0, self.iface.mainWindow()
+            "Starting download..." if not first_layer else f"Starting {first_layer} download...",
+            "Cancel", 0, len(jobs) * 100, self.iface.mainWindow()
         )
         self.progress_dialog.setWindowTitle("Downloading Data")
         self.progress_dialog.setWindowModality(Qt.WindowModality.NonModal)
         self.progress_dialog.setMinimumDuration(0)
-        
-        # Create worker with layer name
-        self.worker = Worker(url, extent, output_file, self.iface, validation_results, layer_name)
-        self.worker.aoi_geometry = aoi_geometry  # Pass the aoi_geometry to the worker
-        self.worker.remaining_queue = remaining_queue  # Store remaining queue in worker
-        self.worker_thread = QThread()
-        
-        # Move worker to thread
-        self.worker.moveToThread(self.worker_thread)
-        
-        # Connect signals
-        self.worker_thread.started.connect(self.worker.run)
-        self.worker.error.connect(self.handle_error)
-        self.worker.load_layer.connect(self.load_layer)
-        self.worker.info.connect(self.show_info)
-        self.worker.file_size_warning.connect(self.handle_large_file_warning)
-        self.worker.finished.connect(lambda: self.handle_download_complete(remaining_queue, extent, aoi_geometry))
-        self.worker.progress.connect(self.update_progress)
+
+        self.job_messages = {}
+        self.job_percents = {}
+        self.scheduler = DownloadScheduler(self.create_queue_worker, max_jobs=max_jobs)
+        self.scheduler.job_progress.connect(self.update_job_progress)
+        self.scheduler.job_percent.connect(self.update_job_percent)
+        self.scheduler.job_finished.connect(self.handle_job_finished)
+        self.scheduler.file_size_warning.connect(self.handle_job_size_warning)
+        self.scheduler.load_layer.connect(self.load_layer)
+        self.scheduler.info.connect(self.show_info)
+        self.scheduler.error.connect(self.show_job_error)
+        self.scheduler.all_finished.connect(self.handle_queue_finished)
         self.progress_dialog.canceled.connect(self.cancel_download)
-        
-        # Show the progress dialog and start the thread
+
+        # Time each phase of the jobs when a trace file is set
+        self.trace_file = QgsSettings().value(
+            "gpq_downloader/trace_file", "", type=str, section=QgsSettings.Plugins
+        )
+        if self.trace_file:
+            logger.start_trace()
+
+        # Show the progress dialog and start the jobs
         self.progress_dialog.show()
-        self.worker_thread.start()
+        self.scheduler.start(jobs)
+
+    def resume_downloads(self):
+        """Offer downloads that were interrupted for resuming, from their job journals"""
+        if self.queue_running():
+            QMessageBox.warning(
+                self.iface.mainWindow(),
+                "Download in Progress",
+                "A download is already in progress. Please wait for it to complete before resuming others."
+            )
+            return
+
+        journals = list_journals(self.journal_dir())
+        if not journals:
+            QMessageBox.information(self.iface.mainWindow(), "Resume Downloads", "There are no interrupted downloads.")
+            return
+
+        choice = self.prompt_resume(journals)
+        if choice is None:
+            return
+        action, selected = choice
+        if action == "discard":
+            for journal in selected:
+                journal.remove()
+            return
+        if selected:
+            self.start_jobs([self.create_resume_job(journal) for journal in selected])
+
+    def prompt_resume(self, journals):
+        """
+        Let the user pick interrupted downloads.
+
+        Returns None if cancelled, otherwise ("resume" or "discard", journals).
+        """
+        dialog = QDialog(self.iface.mainWindow())
+        dialog.setWindowTitle("Resume Downloads")
+        dialog.setMinimumWidth(450)
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("These downloads did not complete:"))
+
+        job_list = QListWidget()
+        for journal in journals:
+            item = QListWidgetItem(journal.describe())
+            item.setToolTip(journal.spec.get("url", ""))
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked)
+            job_list.addItem(item)
+        layout.addWidget(job_list)
+
+        button_box = QHBoxLayout()
+        resume_button = QPushButton("Resume")
+        discard_button = QPushButton("Discard")
+        cancel_button = QPushButton("Cancel")
+        button_box.addWidget(resume_button)
+        button_box.addWidget(discard_button)
+        button_box.addWidget(cancel_button)
+        layout.addLayout(button_box)
+        dialog.setLayout(layout)
+
+        resume_button.clicked.connect(lambda: dialog.done(1))
+        discard_button.clicked.connect(lambda: dialog.done(2))
+        cancel_button.clicked.connect(dialog.reject)
+
+        result = dialog.exec()
+        if result not in (1, 2):
+            return None
+        selected = [
+            journal for row, journal in enumerate(journals)
+            if job_list.item(row).checkState() == Qt.CheckState.Checked
+        ]
+        return ("resume" if result == 1 else "discard"), selected
+
+    def create_resume_job(self, journal):
+        """Rebuild a scheduler job from a journal; extent and AOI are stored in EPSG:4326"""
+        spec = journal.spec
+        aoi_geometry = QgsGeometry.fromWkt(spec["aoi_wkt"]) if spec.get("aoi_wkt") else None
+        job = self.create_download_job(
+            spec["url"], spec["output_file"], QgsRectangle(*spec["bbox"]), aoi_geometry,
+            spec.get("extra_outputs"), spec.get("columns"), spec.get("attribute_filter")
+        )
+        job["layer_name"] = spec.get("layer_name")
+        job["validation_results"] = spec.get("validation_results") or job["validation_results"]
+        job["extent_crs"] = "EPSG:4326"
+        job["journal"] = journal
+        return job
+
+    def update_job_progress(self, index, message):
+        self.job_messages[index] = message
+        self.refresh_queue_progress()
+
+    def update_job_percent(self, index, percent):
+        self.job_percents[index] = percent
+        self.refresh_queue_progress()
+
+    def handle_job_finished(self, index):
+        self.job_messages.pop(index, None)
+        self.job_percents.pop(index, None)
+        self.refresh_queue_progress()
+
+    def refresh_queue_progress(self):
+        """Show one progress line per in-flight job, plus the overall count and percentage"""
+        if self.scheduler is None or not hasattr(self, "progress_dialog"):
+            return
+        total = len(self.scheduler.jobs)
+        done = len(self.scheduler.completed)
+        lines = [self.job_messages[index] for index in sorted(self.job_messages)]
+        if total > 1:
+            lines.insert(0, f"{done} of {total} downloads complete")
+        in_flight = sum(
+            percent for index, percent in getattr(self, "job_percents", {}).items()
+            if index not in self.scheduler.completed
+        )
+        self.progress_dialog.setValue(min(done * 100 + in_flight, total * 100 - 1))
+        self.progress_dialog.setLabelText("\n".join(lines))
+
+    def handle_job_size_warning(self, index, estimated_size):
+        """Ask about a large GeoJSON output, then retry or skip that job"""
+        if self.scheduler is None:
+            return
+        job = self.scheduler.jobs[index]
+        outputs = [job['output_file']] + job.get('extra_outputs', [])
+        geojson_file = next(
+            (path for path in outputs if path.lower().endswith('.geojson')), job['output_file']
+        )
+        choice = self.prompt_large_file(estimated_size, geojson_file)
+        if choice is None:
+            self.scheduler.skip(index)
+        else:
+            output_file, size_warning_accepted = choice
+            outputs = [output_file if path == geojson_file else path for path in outputs]
+            self.scheduler.retry(index, output_file=outputs[0], extra_outputs=outputs[1:],
+                                 size_warning_accepted=size_warning_accepted)
+
+    def show_job_error(self, message):
+        """Report a failed job without stopping the rest of the queue"""
+        QMessageBox.critical(self.iface.mainWindow(), "Error", message)
+
+    def handle_queue_finished(self):
+        if hasattr(self, "progress_dialog"):
+            self.progress_dialog.close()
+        trace = logger.stop_trace()
+        if trace is not None and getattr(self, "trace_file", ""):
+            try:
+                trace.write(self.trace_file)
+                logger.log(f"Wrote trace of {len(trace.spans)} spans to {self.trace_file}")
+            except OSError as e:
+                logger.log(f"Could not write trace to {self.trace_file}: {e}", 1)
+        self.scheduler = None
+        self.job_messages = {}
 
     def handle_download_complete(self, remaining_queue, extent, aoi_geometry=None):
         """Handle completion of a download and start the next one if any"""
@@ -0,0 +1,81 @@
+import contextlib
+import json
+import os
+
+from . import logger
+
+
+TOP_OPERATORS = 5
+
+
+def profile_path(output_file, stage):
+    """Where the profile of a job stage goes, next to the output: <name>.profile.<stage>.json"""
+    return f"{os.path.splitext(output_file)[0]}.profile.{stage}.json"
+
+
+@contextlib.contextmanager
+def profiled(conn, path):
+    """
+    Write DuckDB's JSON profile of the query run on conn inside the block to path.
+
+    Profiling settings belong to the cursor, so queries on other cursors of
+    the same database aren't profiled. DuckDB rewrites the file after every
+    query, so the block should run exactly one.
+    """
+    conn.execute("PRAGMA enable_profiling = 'json'")
+    conn.execute(f"PRAGMA profiling_output = '{path}'")
+    try:
+        yield
+    finally:
+        try:
+            conn.execute("PRAGMA disable_profiling")
+        except Exception:
+            pass
+
+
+def operator_label(node):
+    """Operator name, with the table function of a scan (e.g. READ_PARQUET)"""
+    # DuckDB before 1.1 used name/timing rather than operator_name/operator_timing
+    name = (node.get("operator_name") or node.get("name") or "").strip()
+    function = (node.get("extra_info") or {}).get("Function") if isinstance(node.get("extra_info"), dict) else None
+    if function and function.upper() not in name.upper():
+        name = f"{name} ({function})"
+    return name
+
+
+def operator_times(profile):
+    """Seconds spent in each operator of a profile tree, summed per operator and slowest first"""
+    times = {}
+    stack = list(profile.get("children", []))
+    while stack:
+        node = stack.pop()
+        stack.extend(node.get("children", []))
+        label = operator_label(node)
+        if label:
+            times[label] = times.get(label, 0.0) + (node.get("operator_timing", node.get("timing")) or 0.0)
+    return sorted(times.items(), key=lambda item: -item[1])
+
+
+def summarize_profile(path, top=TOP_OPERATORS):
+    """Query time and slowest operators of a saved profile, or None if it can't be read"""
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.log(f"Could not read query profile {path}: {e}", 1)
+        return None
+    operators = operator_times(profile)
+    return {
+        "seconds": profile.get("latency", profile.get("timing")) or sum(seconds for _, seconds in operators),
+        "operators": operators[:top],
+    }
+
+
+def format_profile(stage, summary):
+    """e.g. "Profile of copy: 12.30s; COPY_TO_FILE 6.10s (50%), ORDER_BY 3.00s (24%)" """
+    total = summary["seconds"]
+    operators = ", ".join(
+        f"{name} {seconds:.2f}s" + (f" ({seconds / total:.0%})" if total else "")
+        for name, seconds in summary["operators"]
+    )
+    return f"Profile of {stage}: {total:.2f}s; {operators or 'no operators'}"
@@ -0,0 +1,135 @@
+import threading
+import time
+
+from . import logger
+
+
+POLL_INTERVAL_SECONDS = 0.5
+
+
+def enable_query_progress(cursor):
+    """Have DuckDB track progress of queries on a cursor, without printing a bar"""
+    cursor.execute("SET enable_progress_bar = true")
+    cursor.execute("SET enable_progress_bar_print = false")
+    cursor.execute("SET progress_bar_time = 0")
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds}s"
+
+
+def format_progress(percent, rows_per_second=None, mb_per_second=None, eta_seconds=None):
+    """e.g. "45% · 120,000 rows/s · 12.3 MB/s · ETA 2m 10s" """
+    parts = [f"{percent}%"]
+    if rows_per_second is not None:
+        parts.append(f"{rows_per_second:,.0f} rows/s")
+    if mb_per_second is not None:
+        parts.append(f"{mb_per_second:.1f} MB/s")
+    if eta_seconds is not None:
+        parts.append(f"ETA {format_duration(eta_seconds)}")
+    return " · ".join(parts)
+
+
+class ProgressMonitor:
+    """
+    Polls DuckDB's query progress for the cursors running a job.
+
+    A background thread asks every tracked cursor for query_progress() each
+    interval, so the queries themselves carry no Python callbacks. The job is
+    split into equal units (a query, or a tile) and finished units count in
+    full. Expected rows and bytes from the footer statistics turn the fraction
+    done into rows/s, MB/s and an ETA. callback(percent, message) is called
+    from the polling thread.
+    """
+
+    def __init__(self, callback, units=1, done_units=0, total_rows=None, total_bytes=None,
+                 interval=POLL_INTERVAL_SECONDS):
+        self.callback = callback
+        self.units = max(1, units)
+        self.done_units = done_units
+        self.total_rows = total_rows
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.start_time = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def track(self, cursor):
+        """Follow the next query run on cursor as one unit of the job"""
+        try:
+            enable_query_progress(cursor)
+        except Exception as e:
+            logger.log(f"Query progress not available: {e}", 1)
+        with self._lock:
+            self._cursors[id(cursor)] = [cursor, 0.0]
+
+    def untrack(self, cursor):
+        """Stop following a cursor whose query failed"""
+        with self._lock:
+            self._cursors.pop(id(cursor), None)
+
+    def unit_done(self, cursor=None):
+        with self._lock:
+            if cursor is not None:
+                self._cursors.pop(id(cursor), None)
+            self.done_units += 1
+        self.report()
+
+    def fraction(self):
+        with self._lock:
+            running = sum(fraction for _, fraction in self._cursors.values())
+            return min(1.0, (self.done_units + running) / self.units)
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                tracked = list(self._cursors.values())
+            for entry in tracked:
+                try:
+                    value = float(entry[0].query_progress())
+                except Exception:
+                    continue
+                # -1 means no query is running yet
+                if value >= 0:
+                    entry[1] = min(value, 100.0) / 100.0
+            self.report()
+
+    def report(self):
+        fraction = self.fraction()
+        elapsed = time.perf_counter() - (self.start_time or time.perf_counter())
+        # 100% is left for the caller to report once the job has really finished
+        percent = min(99, int(fraction * 100))
+
+        rows_per_second = mb_per_second = eta_seconds = None
+        if fraction > 0 and elapsed > 0:
+            if self.total_rows:
+                rows_per_second = fraction * self.total_rows / elapsed
+            if self.total_bytes:
+                mb_per_second = fraction * self.total_bytes / elapsed / (1024 * 1024)
+            eta_seconds = elapsed * (1 - fraction) / fraction
+        self.callback(percent, format_progress(percent, rows_per_second, mb_per_second, eta_seconds))
@@ -0,0 +1,247 @@
+import json
+import re
+
+
+def quote_identifier(name):
+    """Quote a column name for DuckDB SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def column_path_expr(path):
+    """
+    Build a column expression from a GeoParquet covering path.
+
+    Covering paths are lists like ["bbox", "xmin"], naming a struct column and
+    the field inside it.
+    """
+    if isinstance(path, str):
+        path = [path]
+    return ".".join(quote_identifier(part) for part in path)
+
+
+def default_bbox_covering(bbox_column="bbox"):
+    """Covering for a GeoParquet 1.1 style bbox struct column"""
+    return {field: [bbox_column, field] for field in ("xmin", "ymin", "xmax", "ymax")}
+
+
+def parse_bbox_covering(geo_metadata):
+    """
+    Return the covering.bbox definition from GeoParquet "geo" metadata.
+
+    Accepts the raw JSON string or an already parsed dict. Looks at the primary
+    geometry column first and falls back to any column with a bbox covering.
+    Returns None when the metadata has no complete bbox covering.
+    """
+    if not geo_metadata:
+        return None
+    if isinstance(geo_metadata, (str, bytes)):
+        geo_metadata = json.loads(geo_metadata)
+
+    columns = geo_metadata.get("columns") or {}
+    primary = geo_metadata.get("primary_column")
+    candidates = [primary] if primary in columns else []
+    candidates += [name for name in columns if name != primary]
+
+    for name in candidates:
+        covering = (columns.get(name) or {}).get("covering") or {}
+        bbox = covering.get("bbox")
+        if bbox and all(field in bbox for field in ("xmin", "ymin", "xmax", "ymax")):
+            return {field: list(bbox[field]) for field in ("xmin", "ymin", "xmax", "ymax")}
+    return None
+
+
+def bbox_overlap_predicate(covering, xmin, ymin, xmax, ymax):
+    """
+    SQL predicate selecting rows whose bbox overlaps the given extent.
+
+    Uses all four covering fields, so features that start outside the extent
+    but cross into it are kept, and the Parquet reader can prune row groups
+    on the min/max statistics of every field.
+    """
+    return (
+        f"{column_path_expr(covering['xmin'])} <= {xmax} "
+        f"AND {column_path_expr(covering['xmax'])} >= {xmin} "
+        f"AND {column_path_expr(covering['ymin'])} <= {ymax} "
+        f"AND {column_path_expr(covering['ymax'])} >= {ymin}"
+    )
+
+
+# Name of the query parameter carrying the AOI as WKB: queries use $aoi
+AOI_PARAMETER = "aoi"
+# Default simplification tolerance for AOIs in degrees, about 10 m at the equator
+DEFAULT_AOI_TOLERANCE = 0.0001
+# AOIs with fewer vertices are used as they are
+SIMPLIFY_MIN_VERTICES = 1_000
+# ST_Buffer rounds corners with chords at most 2% inside the true offset
+# (8 segments per quarter circle), so buffering by this much more than the
+# tolerance still covers everything within the tolerance
+BUFFER_MARGIN = 1.02
+
+
+def prepare_aoi(conn, aoi_wkt, tolerance=DEFAULT_AOI_TOLERANCE):
+    """
+    The AOI to filter on, as a dict of wkb, extent and vertex counts.
+
+    The WKT is bound as a parameter, so it is parsed once and never becomes
+    part of a query's text. A large AOI (more than SIMPLIFY_MIN_VERTICES) is
+    simplified within tolerance degrees and then buffered by the tolerance.
+    Simplifying moves the boundary by at most the tolerance, so the result
+    still covers the original: no feature touching the AOI is lost, and a few
+    just outside it may be kept. A tolerance of 0 turns this off. Needs the
+    spatial extension.
+    """
+    row = conn.execute(f"""
+        WITH aoi AS (SELECT ST_GeomFromText($wkt) AS original),
+        prepared AS (
+            SELECT original,
+                   CASE WHEN $tolerance > 0 AND ST_NPoints(original) > {SIMPLIFY_MIN_VERTICES}
+                        THEN ST_Buffer(ST_SimplifyPreserveTopology(original, $tolerance), $tolerance * {BUFFER_MARGIN})
+                        ELSE original END AS aoi
+            FROM aoi
+        )
+        SELECT ST_AsWKB(aoi), ST_NPoints(original), ST_NPoints(aoi),
+               ST_XMin(aoi), ST_YMin(aoi), ST_XMax(aoi), ST_YMax(aoi)
+        FROM prepared
+    """, {"wkt": aoi_wkt, "tolerance": float(tolerance or 0)}).fetchone()
+    return {
+        "wkb": bytes(row[0]),
+        "vertices": row[1],
+        "simplified_vertices": row[2],
+        "extent": tuple(row[3:7]),
+    }
+
+
+def aoi_predicate(geometry_expr, covering=None, extent=None):
+    """
+    SQL predicate keeping rows whose geometry intersects the $aoi parameter.
+
+    Rows are first tested against the AOI's extent, on the bbox covering
+    columns when there are some (which also lets the reader skip row groups),
+    otherwise on the geometry's own extent. The exact intersection only runs
+    on the rows passing that test.
+    """
+    aoi = f"ST_GeomFromWKB(${AOI_PARAMETER})"
+    exact = f"ST_Intersects({geometry_expr}, {aoi})"
+    if covering is not None and extent is not None:
+        return f"{bbox_overlap_predicate(covering, *extent)} AND {exact}"
+    return f"CASE WHEN ST_Intersects_Extent({geometry_expr}, {aoi}) THEN {exact} ELSE false END"
+
+
+# Operators offered by the attribute filter builder
+FILTER_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "IN", "NOT IN", "LIKE", "IS NULL", "IS NOT NULL")
+
+
+def sql_literal(value):
+    """SQL literal for a value typed into the filter builder: numbers as is, anything else quoted"""
+    value = str(value).strip()
+    try:
+        float(value)
+        return value
+    except ValueError:
+        pass
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        value = value[1:-1].replace("''", "'")
+    return "'" + value.replace("'", "''") + "'"
+
+
+def filter_condition(column, operator, value=""):
+    """
+    One condition of an attribute filter, e.g. "class" IN ('motorway', 'trunk').
+
+    IN and NOT IN take a comma separated list of values.
+    """
+    operator = operator.upper()
+    if operator not in FILTER_OPERATORS:
+        raise ValueError(f"Unsupported operator: {operator}")
+    if operator in ("IS NULL", "IS NOT NULL"):
+        return f"{quote_identifier(column)} {operator}"
+    if operator in ("IN", "NOT IN"):
+        values = ", ".join(sql_literal(item) for item in str(value).split(",") if item.strip())
+        return f"{quote_identifier(column)} {operator} ({values})"
+    return f"{quote_identifier(column)} {operator} {sql_literal(value)}"
+
+
+def _without_literals(expression):
+    """The expression with string literals emptied, so keywords inside them don't count"""
+    return re.sub(r"'(?:[^']|'')*'", "''", expression)
+
+
+def filter_columns(expression, schema):
+    """Columns of schema an attribute filter may refer to (over-inclusion is harmless)"""
+    text = _without_literals(expression)
+    columns = []
+    for row in schema:
+        name = row[0]
+        quoted = quote_identifier(name)
+        if quoted in text or re.search(rf"(?<![\w.]){re.escape(name)}(?![\w])", text, re.IGNORECASE):
+            columns.append(name)
+    return columns
+
+
+def _balanced(text):
+    """Whether every parenthesis in text is closed, and none closes one it didn't open"""
+    depth = 0
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
+
+
+def _has_subquery(conn, expression):
+    """Whether DuckDB parses the expression with a subquery anywhere in it"""
+    try:
+        parsed = conn.execute("SELECT json_serialize_sql(?)", [f"SELECT 1 WHERE ({expression})"]).fetchone()[0]
+        nodes = [json.loads(parsed)]
+    except Exception:
+        # json_serialize_sql comes with the json extension; the keyword check still applies without it
+        return False
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, dict):
+            if node.get("class") == "SUBQUERY":
+                return True
+            nodes.extend(node.values())
+        elif isinstance(node, list):
+            nodes.extend(node)
+    return False
+
+
+def check_attribute_filter(conn, expression, schema=None):
+    """
+    Validate an attribute filter before it is put into a WHERE clause.
+
+    The filter has to be a single boolean expression: no statements, no
+    subqueries, and parentheses that balance, so it can't close the
+    parenthesis it is wrapped in and OR away the spatial filter. With the
+    dataset's schema (DESCRIBE rows) it is also bound against the column
+    names and types, so unknown columns and type errors show up before
+    anything is downloaded. Raises ValueError.
+    """
+    # Quoted identifiers may hold any character, like string literals
+    text = re.sub(r'"(?:[^"]|"")*"', '""', _without_literals(expression))
+    if not _balanced(text):
+        raise ValueError("The filter's parentheses don't match")
+    if (
+        ";" in text
+        or re.search(r"\b(select|from|table|values)\b", text, re.IGNORECASE)
+        or _has_subquery(conn, expression)
+    ):
+        raise ValueError("The filter must be a single expression, without ';' or subqueries")
+    try:
+        if not schema:
+            conn.extract_statements(f"SELECT 1 WHERE ({expression})")
+            return
+        # One row of typed NULLs stands in for the dataset; geometry is only needed as bytes
+        probe = ", ".join(
+            f"CAST(NULL AS {'BLOB' if 'GEOMETRY' in row[1].upper() else row[1]}) AS {quote_identifier(row[0])}"
+            for row in schema
+        )
+        result_type = conn.execute(f"SELECT typeof(({expression})) FROM (SELECT {probe})").fetchone()[0]
+    except Exception as e:
+        raise ValueError(str(e).split("\n")[0]) from e
+    if result_type not in ("BOOLEAN", "NULL"):
+        raise ValueError(f"The filter must be true or false for each row, not {result_type}")
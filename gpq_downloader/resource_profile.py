@@ -0,0 +1,130 @@
+import os
+import tempfile
+
+
+SETTINGS_PREFIX = "gpq_downloader/"
+
+# 0 / "" mean "pick a default for this machine"
+DEFAULT_PROFILE = {
+    "threads": 0,
+    "memory_limit_mb": 0,
+    "temp_directory": "",
+    "preserve_insertion_order": False,
+    "parallel_jobs": 0,
+}
+
+# Downloads mostly wait on the network, so a few at once pays off
+DEFAULT_PARALLEL_JOBS = 4
+# Memory each concurrent job should be able to count on before spilling
+MIN_JOB_MEMORY_MB = 512
+
+
+def default_threads():
+    """Leave one core free so QGIS rendering stays responsive"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def physical_memory_mb():
+    """Total physical memory in MB, or None where it can't be determined"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_memory_limit_mb():
+    """Half of physical memory, leaving the rest to QGIS and the OS"""
+    total = physical_memory_mb()
+    return total // 2 if total else None
+
+
+def default_temp_directory():
+    return os.path.join(tempfile.gettempdir(), "gpq_downloader_spill")
+
+
+def resolve_profile(profile=None):
+    """Fill in machine defaults for any unset values of a resource profile"""
+    resolved = dict(DEFAULT_PROFILE)
+    resolved.update(profile or {})
+    if not resolved["threads"]:
+        resolved["threads"] = default_threads()
+    if not resolved["memory_limit_mb"]:
+        resolved["memory_limit_mb"] = default_memory_limit_mb()
+    if not resolved["temp_directory"]:
+        resolved["temp_directory"] = default_temp_directory()
+    return resolved
+
+
+def max_parallel_jobs(profile=None):
+    """
+    Number of downloads to run at once.
+
+    All jobs share one DuckDB database, so the count is capped by the threads
+    it may use and by how many jobs fit MIN_JOB_MEMORY_MB into memory_limit.
+    """
+    profile = resolve_profile(profile)
+    jobs = int(profile["parallel_jobs"]) or DEFAULT_PARALLEL_JOBS
+    jobs = min(jobs, int(profile["threads"]))
+    if profile["memory_limit_mb"]:
+        jobs = min(jobs, int(profile["memory_limit_mb"]) // MIN_JOB_MEMORY_MB)
+    return max(1, jobs)
+
+
+def tile_jobs_per_job(profile=None, running_jobs=1):
+    """
+    Tiles each job may download at once while running_jobs jobs run side by side.
+
+    Jobs and their tiles share the same max_parallel_jobs budget, so
+    running_jobs times this stays within it whenever running_jobs does.
+    """
+    return max(1, max_parallel_jobs(profile) // max(1, int(running_jobs)))
+
+
+def duckdb_settings(profile=None):
+    """
+    DuckDB settings for a resource profile.
+
+    memory_limit caps what a single database may hold; sorts (the Hilbert
+    ORDER BY), joins and aggregates that need more spill to temp_directory.
+    Turning off preserve_insertion_order lets exports without an ORDER BY
+    stream instead of buffering rows to keep them in read order.
+    """
+    profile = resolve_profile(profile)
+    os.makedirs(profile["temp_directory"], exist_ok=True)
+
+    settings = {
+        "threads": int(profile["threads"]),
+        "temp_directory": profile["temp_directory"],
+        "preserve_insertion_order": bool(profile["preserve_insertion_order"]),
+    }
+    if profile["memory_limit_mb"]:
+        settings["memory_limit"] = f"{int(profile['memory_limit_mb'])}MB"
+    return settings
+
+
+def load_resource_profile(settings=None):
+    """Read the resource profile from settings, QgsSettings by default"""
+    if settings is None:
+        from qgis.core import QgsSettings
+        settings = QgsSettings()
+    profile = {}
+    for key, default in DEFAULT_PROFILE.items():
+        value = settings.value(
+            SETTINGS_PREFIX + key, default, type=type(default), section=settings.Plugins
+        )
+        try:
+            profile[key] = type(default)(value)
+        except (TypeError, ValueError):
+            profile[key] = default
+    return profile
+
+
+def save_resource_profile(profile, settings=None):
+    """Store a resource profile in settings, QgsSettings by default"""
+    if settings is None:
+        from qgis.core import QgsSettings
+        settings = QgsSettings()
+    for key, default in DEFAULT_PROFILE.items():
+        settings.setValue(
+            SETTINGS_PREFIX + key, profile.get(key, default), section=settings.Plugins
+        )
@@ -0,0 +1,174 @@
+from qgis.PyQt.QtCore import QObject, QThread, pyqtSignal
+
+from . import logger
+
+
+class _JobRunner(QObject):
+    """Runs a worker on its thread and reports when run() returns, however it ended"""
+    done = pyqtSignal(int)
+
+    def __init__(self, index, worker):
+        super().__init__()
+        self.index = index
+        self.worker = worker
+
+    def run(self):
+        try:
+            self.worker.run()
+        finally:
+            self.done.emit(self.index)
+
+
+class DownloadScheduler(QObject):
+    """
+    Runs a queue of download jobs, up to max_jobs at a time.
+
+    Every job gets its own Worker on its own QThread. The workers share the
+    plugin's DuckDB session, so concurrent jobs mostly overlap their network
+    waits. Layers to load and info/error messages are held back until all
+    earlier jobs are done, so results reach the project in queue order.
+    """
+
+    job_started = pyqtSignal(int)
+    job_progress = pyqtSignal(int, str)
+    job_percent = pyqtSignal(int, int)
+    job_finished = pyqtSignal(int)
+    file_size_warning = pyqtSignal(int, float)
+    load_layer = pyqtSignal(str)
+    info = pyqtSignal(str)
+    error = pyqtSignal(str)
+    all_finished = pyqtSignal()
+
+    def __init__(self, worker_factory, max_jobs=1):
+        super().__init__()
+        # Called with a job dict, returns a Worker for it
+        self.worker_factory = worker_factory
+        self.max_jobs = max(1, int(max_jobs))
+        self.jobs = []
+        self.pending = []
+        self.running = {}
+        self.results = {}
+        self.completed = set()
+        self.size_warnings = {}
+        self.next_to_flush = 0
+        self.cancelled = False
+        self._stopping = []
+        self._all_finished_emitted = False
+
+    def start(self, jobs):
+        """Queue the jobs and start as many as max_jobs allows"""
+        self.jobs = [dict(job) for job in jobs]
+        self.pending = list(range(len(self.jobs)))
+        logger.log(f"Scheduling {len(self.jobs)} download(s), {self.max_jobs} at a time")
+        self._fill()
+        self._check_all_finished()
+
+    def is_running(self):
+        return bool(self.running or self.pending or self.size_warnings)
+
+    def in_flight(self):
+        return sorted(self.running)
+
+    def _fill(self):
+        while self.pending and len(self.running) < self.max_jobs and not self.cancelled:
+            self._start_job(self.pending.pop(0))
+
+    def _start_job(self, index):
+        worker = self.worker_factory(self.jobs[index])
+        thread = QThread()
+        runner = _JobRunner(index, worker)
+        worker.moveToThread(thread)
+        runner.moveToThread(thread)
+
+        thread.started.connect(runner.run)
+        worker.progress.connect(lambda message, i=index: self.job_progress.emit(i, message))
+        worker.percent.connect(lambda percent, i=index: self.job_percent.emit(i, percent))
+        worker.load_layer.connect(lambda path, i=index: self._record(i, "load_layer", path))
+        worker.info.connect(lambda message, i=index: self._record(i, "info", message))
+        worker.error.connect(lambda message, i=index: self._record(i, "error", message))
+        worker.file_size_warning.connect(lambda size, i=index: self._record_size_warning(i, size))
+        runner.done.connect(self._job_done)
+
+        self.running[index] = (worker, thread, runner)
+        self.results[index] = []
+        self.job_started.emit(index)
+        thread.start()
+
+    def _record(self, index, kind, value):
+        if not self.cancelled:
+            self.results.setdefault(index, []).append((kind, value))
+
+    def _record_size_warning(self, index, size):
+        if not self.cancelled:
+            self.size_warnings[index] = size
+
+    def _job_done(self, index):
+        if index not in self.running:
+            return
+        worker, thread, runner = self.running.pop(index)
+        # Keep the objects alive until the thread has actually stopped
+        stopping = (worker, thread, runner)
+        self._stopping.append(stopping)
+        thread.finished.connect(lambda s=stopping: self._stopping.remove(s) if s in self._stopping else None)
+        thread.quit()
+
+        if not self.cancelled:
+            if index in self.size_warnings:
+                # The job stopped to ask; it resumes through retry() or skip()
+                self.file_size_warning.emit(index, self.size_warnings[index])
+            else:
+                self._complete(index)
+            self._fill()
+        self._check_all_finished()
+
+    def _complete(self, index):
+        self.completed.add(index)
+        self.job_finished.emit(index)
+        self._flush()
+
+    def _flush(self):
+        """Emit results of finished jobs, stopping at the first one still running"""
+        while self.next_to_flush in self.completed:
+            for kind, value in self.results.pop(self.next_to_flush, []):
+                getattr(self, kind).emit(value)
+            self.next_to_flush += 1
+
+    def retry(self, index, **changes):
+        """Run a job that stopped for a size warning again, e.g. with a new output file"""
+        self.size_warnings.pop(index, None)
+        if self.cancelled:
+            return
+        self.jobs[index].update(changes)
+        self.pending.insert(0, index)
+        self._fill()
+
+    def skip(self, index):
+        """Give up on a job that stopped for a size warning"""
+        self.size_warnings.pop(index, None)
+        self.results.pop(index, None)
+        self._complete(index)
+        self._fill()
+        self._check_all_finished()
+
+    def cancel(self):
+        """Stop all in-flight jobs and drop the rest of the queue"""
+        self.cancelled = True
+        self.pending.clear()
+        self.size_warnings.clear()
+        self.results.clear()
+        for worker, _, _ in self.running.values():
+            worker.kill()
+        self._check_all_finished()
+
+    def wait(self):
+        """Block until every job thread has stopped (used when the plugin unloads)"""
+        for _, thread, _ in list(self.running.values()) + list(self._stopping):
+            thread.quit()
+            thread.wait()
+
+    def _check_all_finished(self):
+        if self._all_finished_emitted or self.is_running():
+            return
+        if self.cancelled or self.next_to_flush >= len(self.jobs):
+            self._all_finished_emitted = True
+            self.all_finished.emit()
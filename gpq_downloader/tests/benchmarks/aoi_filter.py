@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: filtering on a detailed AOI inlined as WKT versus bound as WKB.
+
+Writes the synthetic GeoParquet fixture and a jagged star-shaped AOI with
+many vertices, like a county boundary drawn from selected features. Then it
+counts the rows intersecting the AOI three ways: the WKT inlined into the
+SQL text (as downloads used to), the same AOI bound as a WKB parameter
+behind the extent test, and the simplified AOI from prepare_aoi. For each it
+reports the SQL length, the rows kept and the best query time. The
+simplified AOI has to keep every row the exact one keeps.
+
+    python gpq_downloader/tests/benchmarks/aoi_filter.py --features 1000000 --vertices 200000
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from fixtures import write_fixture  # noqa: E402
+from gpq_downloader.query import (  # noqa: E402
+    AOI_PARAMETER,
+    DEFAULT_AOI_TOLERANCE,
+    aoi_predicate,
+    bbox_overlap_predicate,
+    default_bbox_covering,
+    prepare_aoi,
+)
+
+
+def jagged_aoi_wkt(vertices, radius=5.0, seed=7):
+    """A star-like polygon around the fixture centre whose radius jitters at every vertex"""
+    rng = random.Random(seed)
+    points = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        r = radius * (0.75 + 0.2 * math.sin(12 * angle) + 0.05 * rng.random())
+        points.append((r * math.cos(angle), r * math.sin(angle)))
+    points.append(points[0])
+    return "POLYGON((" + ", ".join(f"{x:.7f} {y:.7f}" for x, y in points) + "))"
+
+
+def timed_count(conn, query, parameters=None, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = conn.execute(query, parameters).fetchone()[0]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def run(features, vertices, tolerance, path=None):
+    path = path or os.path.join(tempfile.mkdtemp(), "aoi_filter.parquet")
+    if not os.path.exists(path):
+        write_fixture(path, features)
+
+    conn = duckdb.connect()
+    conn.execute("INSTALL spatial")
+    conn.execute("LOAD spatial")
+    covering = default_bbox_covering("bbox")
+    wkt = jagged_aoi_wkt(vertices)
+    source = f"read_parquet('{path}')"
+    geometry = '"geometry"'
+
+    exact = prepare_aoi(conn, wkt, tolerance=0)
+    simplified = prepare_aoi(conn, wkt, tolerance=tolerance)
+    bbox_where = bbox_overlap_predicate(covering, *exact["extent"])
+
+    cases = {
+        "inline_wkt": (
+            f"SELECT count(*) FROM {source} WHERE {bbox_where} "
+            f"AND ST_Intersects({geometry}, ST_GeomFromText('{wkt}'))",
+            None,
+            exact,
+        ),
+        "wkb_parameter": (
+            f"SELECT count(*) FROM {source} WHERE {aoi_predicate(geometry, covering, exact['extent'])}",
+            {AOI_PARAMETER: exact["wkb"]},
+            exact,
+        ),
+        "simplified": (
+            f"SELECT count(*) FROM {source} WHERE {aoi_predicate(geometry, covering, simplified['extent'])}",
+            {AOI_PARAMETER: simplified["wkb"]},
+            simplified,
+        ),
+    }
+
+    results = {
+        "fixture": path, "features": features, "vertices": exact["vertices"],
+        "simplified_vertices": simplified["simplified_vertices"],
+        "tolerance": tolerance, "cases": {},
+    }
+    for name, (query, parameters, aoi) in cases.items():
+        rows, seconds = timed_count(conn, query, parameters)
+        results["cases"][name] = {
+            "sql_chars": len(query),
+            "aoi_vertices": aoi["simplified_vertices"],
+            "rows": rows,
+            "seconds": seconds,
+        }
+    conn.close()
+
+    exact_rows = results["cases"]["wkb_parameter"]["rows"]
+    results["simplified_extra_rows"] = results["cases"]["simplified"]["rows"] - exact_rows
+    # Simplification keeps a superset, so it never loses rows
+    results["superset_ok"] = results["simplified_extra_rows"] >= 0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--features", type=int, default=1_000_000)
+    parser.add_argument("--vertices", type=int, default=200_000)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_AOI_TOLERANCE * 10)
+    parser.add_argument("--fixture", help="Reuse or create the fixture at this path")
+    args = parser.parse_args()
+    print(json.dumps(run(args.features, args.vertices, args.tolerance, args.fixture), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes read with and without an attribute filter in the WHERE.
+
+Writes the synthetic GeoParquet fixture, then for a few AOIs runs the
+download's bbox predicate alone and ANDed with attribute filters built by
+the dialog's filter builder. For each it reports how many row groups the
+Parquet min/max statistics let the reader skip, the compressed bytes of the
+row groups left to read, the matching rows and the query time in DuckDB.
+Heights in the fixture fall off away from the centre, so a height filter
+also prunes row groups the bbox alone has to read.
+
+    python gpq_downloader/tests/benchmarks/attribute_filter.py --features 1000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from fixtures import write_fixture  # noqa: E402
+from gpq_downloader.query import bbox_overlap_predicate, default_bbox_covering, filter_condition  # noqa: E402
+
+
+AOIS = {
+    "whole": (-10.0, -10.0, 10.0, 10.0),
+    "half": (-10.0, -10.0, 0.0, 10.0),
+}
+
+# Filters on the height column, as (operator, value) for the filter builder
+FILTERS = {
+    "height > 20": (">", 20),
+    "height > 50": (">", 50),
+}
+
+
+def row_group_stats(conn, path):
+    """Per row group bbox and height ranges and compressed size, from the Parquet footer"""
+    rows = conn.execute(f"""
+        SELECT row_group_id,
+               max(row_group_num_rows),
+               min(CASE WHEN path_in_schema = 'bbox, xmin' THEN stats_min_value::DOUBLE END),
+               min(CASE WHEN path_in_schema = 'bbox, ymin' THEN stats_min_value::DOUBLE END),
+               max(CASE WHEN path_in_schema = 'bbox, xmax' THEN stats_max_value::DOUBLE END),
+               max(CASE WHEN path_in_schema = 'bbox, ymax' THEN stats_max_value::DOUBLE END),
+               max(CASE WHEN path_in_schema = 'height' THEN stats_max_value::DOUBLE END),
+               sum(total_compressed_size)
+        FROM parquet_metadata('{path}')
+        GROUP BY row_group_id
+        ORDER BY row_group_id
+    """).fetchall()
+    return [
+        dict(zip(("id", "rows", "xmin", "ymin", "xmax", "ymax", "height_max", "bytes"), row))
+        for row in rows
+    ]
+
+
+def row_groups_read(stats, aoi, min_height=None):
+    """Row groups whose statistics don't rule out the bbox predicate (and height > min_height)"""
+    xmin, ymin, xmax, ymax = aoi
+    return [
+        rg for rg in stats
+        if not (rg["xmin"] > xmax or rg["xmax"] < xmin or rg["ymin"] > ymax or rg["ymax"] < ymin)
+        and (min_height is None or rg["height_max"] > min_height)
+    ]
+
+
+def timed_count(conn, path, where, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = conn.execute(f"SELECT count(*) FROM read_parquet('{path}') WHERE {where}").fetchone()[0]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def summarize(conn, path, where, read):
+    rows, seconds = timed_count(conn, path, where)
+    return {
+        "row_groups_read": len(read),
+        "bytes_read": sum(rg["bytes"] for rg in read),
+        "rows": rows,
+        "seconds": seconds,
+    }
+
+
+def run(features, row_group_size, path=None):
+    path = path or os.path.join(tempfile.mkdtemp(), "attribute_filter.parquet")
+    if not os.path.exists(path):
+        write_fixture(path, features, row_group_size=row_group_size)
+
+    conn = duckdb.connect()
+    stats = row_group_stats(conn, path)
+    covering = default_bbox_covering("bbox")
+    results = {"fixture": path, "features": features, "row_groups": len(stats), "aois": {}}
+
+    for name, aoi in AOIS.items():
+        bbox_where = bbox_overlap_predicate(covering, *aoi)
+        bbox_only = summarize(conn, path, bbox_where, row_groups_read(stats, aoi))
+        result = {"aoi": aoi, "bbox_only": bbox_only, "filters": {}}
+        for label, (operator, value) in FILTERS.items():
+            where = f"{bbox_where} AND ({filter_condition('height', operator, value)})"
+            filtered = summarize(conn, path, where, row_groups_read(stats, aoi, value))
+            filtered["bytes_saved"] = bbox_only["bytes_read"] - filtered["bytes_read"]
+            filtered["bytes_saved_share"] = round(
+                filtered["bytes_saved"] / bbox_only["bytes_read"], 3
+            ) if bbox_only["bytes_read"] else 0.0
+            result["filters"][label] = filtered
+        results["aois"][name] = result
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--features", type=int, default=1_000_000)
+    parser.add_argument("--row-group-size", type=int, default=20_000)
+    parser.add_argument("--fixture", help="Reuse or create the fixture at this path")
+    args = parser.parse_args()
+    print(json.dumps(run(args.features, args.row_group_size, args.fixture), indent=2))
+
+
+if __name__ == "__main__":
+    main()
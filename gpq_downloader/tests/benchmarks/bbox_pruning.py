@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: row groups skipped by the old and new bbox predicates.
+
+Writes a multi-row-group GeoParquet fixture, then for a few AOIs compares the
+old predicate (xmin/ymin BETWEEN the extent) against the overlap predicate on
+all four covering fields. For each it reports how many row groups the Parquet
+min/max statistics allow the reader to skip, how many rows match and how long
+the query takes in DuckDB. The old predicate can skip more row groups only
+because it ignores features that start outside the AOI and cross into it;
+rows_missed_by_old counts those.
+
+    python gpq_downloader/tests/benchmarks/bbox_pruning.py --features 1000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from fixtures import write_fixture  # noqa: E402
+from gpq_downloader.query import bbox_overlap_predicate, default_bbox_covering  # noqa: E402
+
+
+AOIS = {
+    "centre": (-0.5, -0.5, 0.5, 0.5),
+    "corner": (-10.0, -10.0, -8.0, -8.0),
+    "strip": (-10.0, 1.0, 10.0, 1.5),
+}
+
+
+def old_predicate(xmin, ymin, xmax, ymax):
+    return (
+        f'"bbox".xmin BETWEEN {xmin} AND {xmax} '
+        f'AND "bbox".ymin BETWEEN {ymin} AND {ymax}'
+    )
+
+
+def row_group_stats(conn, path):
+    """Per row group min/max of each bbox field from the Parquet footer"""
+    rows = conn.execute(f"""
+        SELECT row_group_id,
+               max(row_group_num_rows),
+               min(CASE WHEN path_in_schema = 'bbox, xmin' THEN stats_min_value::DOUBLE END),
+               max(CASE WHEN path_in_schema = 'bbox, xmin' THEN stats_max_value::DOUBLE END),
+               min(CASE WHEN path_in_schema = 'bbox, ymin' THEN stats_min_value::DOUBLE END),
+               max(CASE WHEN path_in_schema = 'bbox, ymin' THEN stats_max_value::DOUBLE END),
+               max(CASE WHEN path_in_schema = 'bbox, xmax' THEN stats_max_value::DOUBLE END),
+               max(CASE WHEN path_in_schema = 'bbox, ymax' THEN stats_max_value::DOUBLE END)
+        FROM parquet_metadata('{path}')
+        GROUP BY row_group_id
+        ORDER BY row_group_id
+    """).fetchall()
+    return [
+        dict(zip(("id", "rows", "xmin_min", "xmin_max", "ymin_min", "ymin_max", "xmax_max", "ymax_max"), row))
+        for row in rows
+    ]
+
+
+def skipped_by_old(stats, xmin, ymin, xmax, ymax):
+    return sum(
+        1 for rg in stats
+        if rg["xmin_max"] < xmin or rg["xmin_min"] > xmax
+        or rg["ymin_max"] < ymin or rg["ymin_min"] > ymax
+    )
+
+
+def skipped_by_overlap(stats, xmin, ymin, xmax, ymax):
+    return sum(
+        1 for rg in stats
+        if rg["xmin_min"] > xmax or rg["xmax_max"] < xmin
+        or rg["ymin_min"] > ymax or rg["ymax_max"] < ymin
+    )
+
+
+def timed_count(conn, path, where, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = conn.execute(f"SELECT count(*) FROM read_parquet('{path}') WHERE {where}").fetchone()[0]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def run(features, row_group_size, path=None):
+    path = path or os.path.join(tempfile.mkdtemp(), "bbox_pruning.parquet")
+    if not os.path.exists(path):
+        write_fixture(path, features, row_group_size=row_group_size)
+
+    conn = duckdb.connect()
+    stats = row_group_stats(conn, path)
+    covering = default_bbox_covering("bbox")
+    results = {"fixture": path, "features": features, "row_groups": len(stats), "aois": {}}
+
+    for name, aoi in AOIS.items():
+        old_rows, old_seconds = timed_count(conn, path, old_predicate(*aoi))
+        new_rows, new_seconds = timed_count(conn, path, bbox_overlap_predicate(covering, *aoi))
+        results["aois"][name] = {
+            "aoi": aoi,
+            "old": {"row_groups_skipped": skipped_by_old(stats, *aoi), "rows": old_rows, "seconds": old_seconds},
+            "overlap": {"row_groups_skipped": skipped_by_overlap(stats, *aoi), "rows": new_rows, "seconds": new_seconds},
+            # Features crossing into the AOI from outside that the old predicate dropped
+            "rows_missed_by_old": new_rows - old_rows,
+        }
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--features", type=int, default=1_000_000)
+    parser.add_argument("--row-group-size", type=int, default=20_000)
+    parser.add_argument("--fixture", help="Reuse or create the fixture at this path")
+    args = parser.parse_args()
+    print(json.dumps(run(args.features, args.row_group_size, args.fixture), indent=2))
+
+
+if __name__ == "__main__":
+    main()
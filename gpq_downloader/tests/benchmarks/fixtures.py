@@ -0,0 +1,138 @@
+"""
+Synthetic GeoParquet fixtures for benchmarks.
+
+Features are small axis-aligned boxes (plus a share of larger ones that span
+several row groups) laid out in horizontal strips, so every row group covers a
+compact area - the way well-sorted cloud GeoParquet is organised. Heights
+fall off with distance from the centre of the extent, like a city centre, so
+row groups far from it have low height statistics. Geometry is written as WKB
+and, optionally, a GeoParquet 1.1 bbox covering column.
+
+With geometry="native" the file carries GeoParquet metadata, so DuckDB reads
+the geometry as GEOMETRY; with geometry="wkb" it is a plain Parquet file whose
+geometry DuckDB reads as a BLOB, like the non-GeoParquet files the plugin
+converts with ST_GeomFromWKB. Large fixtures are generated and written in
+chunks, each filling one horizontal band of the extent.
+"""
+
+import json
+import math
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# WKB Polygon with one ring of five points, little endian
+_WKB_BOX = np.dtype(
+    [
+        ("byte_order", "u1"),
+        ("geometry_type", "<u4"),
+        ("num_rings", "<u4"),
+        ("num_points", "<u4"),
+        ("coords", "<f8", (10,)),
+    ]
+)
+
+
+def box_wkb(xmin, ymin, xmax, ymax):
+    """Encode arrays of boxes as a pyarrow binary array of WKB polygons"""
+    count = len(xmin)
+    records = np.zeros(count, dtype=_WKB_BOX)
+    records["byte_order"] = 1
+    records["geometry_type"] = 3
+    records["num_rings"] = 1
+    records["num_points"] = 5
+    records["coords"] = np.stack(
+        [xmin, ymin, xmax, ymin, xmax, ymax, xmin, ymax, xmin, ymin], axis=1
+    )
+    offsets = np.arange(count + 1, dtype=np.int32) * _WKB_BOX.itemsize
+    return pa.BinaryArray.from_buffers(
+        pa.binary(), count, [None, pa.py_buffer(offsets), pa.py_buffer(records.tobytes())]
+    )
+
+
+def synthetic_boxes(num_features, extent=(-10.0, -10.0, 10.0, 10.0), strips=None,
+                    large_fraction=0.02, seed=42):
+    """Return (xmin, ymin, xmax, ymax) arrays ordered strip by strip"""
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = extent
+    strips = strips or max(1, int(np.sqrt(num_features) / 50))
+    strip = np.sort(rng.integers(0, strips, num_features))
+    strip_height = (maxy - miny) / strips
+
+    x = rng.uniform(minx, maxx, num_features)
+    y = miny + (strip + rng.uniform(0, 1, num_features)) * strip_height
+    # Within a strip order by x, so consecutive rows are close together
+    order = np.lexsort((x, strip))
+    x, y = x[order], y[order]
+
+    size = np.full(num_features, (maxx - minx) / 20000.0)
+    large = rng.uniform(0, 1, num_features) < large_fraction
+    size[large] = rng.uniform(strip_height, 3 * strip_height, large.sum())
+    return x, y, np.minimum(x + size, maxx), np.minimum(y + size, maxy)
+
+
+def synthetic_heights(x, y, seed=42):
+    """Heights from 2 to 80, tallest near (0, 0)"""
+    rng = np.random.default_rng(seed)
+    falloff = np.exp(-(x ** 2 + y ** 2) / 8.0)
+    return 2 + 78 * falloff * rng.uniform(0.5, 1.0, len(x))
+
+
+EXTENT = (-10.0, -10.0, 10.0, 10.0)
+GEOMETRY_ENCODINGS = ("native", "wkb")
+
+
+def fixture_table(xmin, ymin, xmax, ymax, first_id, bbox_covering, seed):
+    columns = {
+        "id": pa.array(np.arange(first_id, first_id + len(xmin), dtype=np.int64)),
+        "height": pa.array(synthetic_heights(xmin, ymin, seed=seed)),
+        "geometry": box_wkb(xmin, ymin, xmax, ymax),
+    }
+    if bbox_covering:
+        columns["bbox"] = pa.StructArray.from_arrays(
+            [pa.array(xmin), pa.array(ymin), pa.array(xmax), pa.array(ymax)],
+            names=["xmin", "ymin", "xmax", "ymax"],
+        )
+    return pa.table(columns)
+
+
+def write_fixture(path, num_features, row_group_size=10_000, bbox_covering=True, seed=42,
+                  geometry="native", chunk_features=2_000_000):
+    """Write a synthetic GeoParquet file and return its path"""
+    if geometry not in GEOMETRY_ENCODINGS:
+        raise ValueError(f"geometry must be one of {GEOMETRY_ENCODINGS}")
+    # Chunks hold whole row groups, so no row group straddles two bands
+    chunk_features = max(row_group_size, chunk_features // row_group_size * row_group_size)
+    chunks = max(1, math.ceil(num_features / chunk_features))
+    minx, miny, maxx, maxy = EXTENT
+    band_height = (maxy - miny) / chunks
+
+    metadata = None
+    if geometry == "native":
+        geometry_column = {"encoding": "WKB", "geometry_types": ["Polygon"]}
+        if bbox_covering:
+            geometry_column["covering"] = {
+                "bbox": {field: ["bbox", field] for field in ("xmin", "ymin", "xmax", "ymax")}
+            }
+        geo = {"version": "1.1.0", "primary_column": "geometry", "columns": {"geometry": geometry_column}}
+        metadata = {b"geo": json.dumps(geo).encode("utf-8")}
+
+    writer = None
+    try:
+        for chunk in range(chunks):
+            first_id = chunk * chunk_features
+            count = min(chunk_features, num_features - first_id)
+            band = (minx, miny + chunk * band_height, maxx, miny + (chunk + 1) * band_height)
+            boxes = synthetic_boxes(count, extent=band, seed=seed + chunk)
+            table = fixture_table(*boxes, first_id, bbox_covering, seed + chunk)
+            if metadata is not None:
+                table = table.replace_schema_metadata(metadata)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            writer.write_table(table, row_group_size=row_group_size)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
@@ -0,0 +1,172 @@
+"""
+Local stand-in for cloud storage, serving a directory over HTTP.
+
+Handles HEAD and ranged GET requests the way object stores do, so DuckDB's
+httpfs reads footers and column chunks with range requests as it would from
+S3 or a web server. Requests with list-type=2 get an S3 ListObjectsV2 reply,
+so path-style s3:// URLs (and their wildcards) work against it as well.
+Every request and byte sent is counted, so benchmarks can report how much a
+download transferred.
+"""
+
+import contextlib
+import os
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+
+RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def serve(self, send_body):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if query.get("list-type") == ["2"]:
+            return self.list_objects(url.path.strip("/"), query.get("prefix", [""])[0], send_body)
+
+        path = os.path.join(self.server.root, unquote(url.path).lstrip("/"))
+        if not os.path.isfile(path):
+            return self.reply(404, b"", "text/plain", send_body)
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+        match = RANGE.match(self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                # bytes=-N is the last N bytes
+                start = max(0, size - int(match.group(2)))
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        body = b""
+        if send_body:
+            with open(path, "rb") as f:
+                f.seek(start)
+                body = f.read(end - start + 1)
+        self.send_response(status)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Last-Modified", formatdate(os.path.getmtime(path), usegmt=True))
+        self.send_header("ETag", f'"{int(os.path.getmtime(path))}-{size}"')
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+        self.server.count(len(body))
+
+    def list_objects(self, bucket, prefix, send_body):
+        """S3 ListObjectsV2 of every file under prefix in the bucket directory"""
+        root = os.path.join(self.server.root, bucket)
+        contents = []
+        for directory, _, names in os.walk(root):
+            for name in sorted(names):
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                modified = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(os.path.getmtime(path)))
+                contents.append(
+                    f"<Contents><Key>{escape(key)}</Key><LastModified>{modified}</LastModified>"
+                    f"<ETag>&quot;{int(os.path.getmtime(path))}&quot;</ETag>"
+                    f"<Size>{os.path.getsize(path)}</Size><StorageClass>STANDARD</StorageClass></Contents>"
+                )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+            f"<KeyCount>{len(contents)}</KeyCount><MaxKeys>1000</MaxKeys><IsTruncated>false</IsTruncated>"
+            + "".join(contents) + "</ListBucketResult>"
+        ).encode("utf-8")
+        self.reply(200, body, "application/xml", send_body)
+
+    def reply(self, status, body, content_type, send_body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+        self.server.count(len(body) if send_body else 0)
+
+
+class LocalObjectServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root, port=0):
+        super().__init__(("127.0.0.1", port), RangeRequestHandler)
+        self.root = root
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def endpoint(self):
+        """host:port for DuckDB's s3_endpoint"""
+        return f"127.0.0.1:{self.server_address[1]}"
+
+    def s3_settings(self):
+        """DuckDB settings pointing s3:// URLs at this server"""
+        return {
+            "s3_endpoint": self.endpoint,
+            "s3_url_style": "path",
+            "s3_use_ssl": False,
+            "s3_region": "us-east-1",
+            "s3_access_key_id": "benchmark",
+            "s3_secret_access_key": "benchmark",
+        }
+
+    def count(self, sent):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += sent
+
+    def reset_counts(self):
+        """(requests, bytes sent) since the last reset"""
+        with self._lock:
+            counts = (self.requests, self.bytes_sent)
+            self.requests = self.bytes_sent = 0
+        return counts
+
+
+@contextlib.contextmanager
+def serve(root):
+    """Run a LocalObjectServer for root on a free port while the block runs"""
+    server = LocalObjectServer(root)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
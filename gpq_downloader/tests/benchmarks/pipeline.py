@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the whole download pipeline, phase by phase, for every output format.
+
+Writes synthetic GeoParquet fixtures for each combination of feature count,
+row group size, bbox covering on or off and native or WKB geometry. Then it
+downloads an AOI from each, through the same DownloadEngine the plugin uses,
+read straight from disk, from a local HTTP range server and from an S3
+stand-in (the same server answering ListObjectsV2). For each download it
+records how long validation, the footer estimate and every engine phase
+took, plus the rows written and the requests and bytes served. Results are
+written as JSON; `compare` lists what got slower between two runs.
+
+    python gpq_downloader/tests/benchmarks/pipeline.py run --features 10000,1000000 -o results.json
+    python gpq_downloader/tests/benchmarks/pipeline.py compare before.json after.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from fixtures import GEOMETRY_ENCODINGS, write_fixture  # noqa: E402
+from local_server import serve  # noqa: E402
+from gpq_downloader.duckdb_session import DuckDBSession  # noqa: E402
+from gpq_downloader.engine import DownloadEngine, Extent, load_output_formats, validate_dataset  # noqa: E402
+from gpq_downloader.estimate import estimate_download  # noqa: E402
+from gpq_downloader.metadata_cache import MetadataCache  # noqa: E402
+from gpq_downloader.query import default_bbox_covering  # noqa: E402
+
+
+TRANSPORTS = ("local", "http", "s3")
+BUCKET = "fixtures"
+# A tenth of the fixture extent around its centre
+DEFAULT_AOI = (-3.0, -3.0, 3.0, 3.0)
+
+# Engine phases in pipeline order, by the start of their progress messages
+PHASES = (
+    ("connect", ("Connecting", "Loading spatial")),
+    ("plan", ("Preparing query",)),
+    ("read", ("Downloading",)),
+    ("merge", ("Merging",)),
+    ("write", ("Processing", "Writing")),
+)
+
+
+def phase_of(message):
+    for index, (phase, prefixes) in enumerate(PHASES):
+        if message.startswith(prefixes):
+            return index
+    return None
+
+
+class TimedEngine(DownloadEngine):
+    """DownloadEngine timing its phases from its progress messages"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.phase_seconds = {}
+        self._phase = None
+        self._phase_start = None
+
+    def report_progress(self, message):
+        index = phase_of(message)
+        # Progress lines of a phase that already ended (e.g. the export of a
+        # materialized table reports as "Downloading") don't restart it
+        if index is not None and (self._phase is None or index > self._phase):
+            self.end_phase()
+            self._phase, self._phase_start = index, time.perf_counter()
+
+    def end_phase(self):
+        if self._phase is not None:
+            name = PHASES[self._phase][0]
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - self._phase_start
+
+    def run(self):
+        super().run()
+        self.end_phase()
+
+
+def output_extensions(formats=None):
+    extensions = [output_format["extension"].lstrip(".") for output_format in load_output_formats().values()]
+    return [extension for extension in extensions if not formats or extension in formats]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def fixture_name(features, row_group_size, bbox_covering, geometry):
+    covering = "bbox" if bbox_covering else "nobbox"
+    return f"f{features}_rg{row_group_size}_{covering}_{geometry}.parquet"
+
+
+def dataset_url(transport, server, name):
+    if transport == "local":
+        return os.path.join(server.root, BUCKET, name)
+    if transport == "http":
+        return f"{server.url}/{BUCKET}/{name}"
+    return f"s3://{BUCKET}/{name}"
+
+
+def run_download(session, url, output_file, aoi, cache_dir):
+    """Validate, estimate and download one AOI like a plugin job; returns the case's timings"""
+    cache = MetadataCache(cache_dir)
+    start = time.perf_counter()
+    conn = session.cursor()
+    try:
+        validation_results = validate_dataset(conn, url, cache)
+        validated = time.perf_counter()
+        estimate = None
+        if validation_results.get("has_bbox"):
+            covering = validation_results.get("bbox_covering") or default_bbox_covering("bbox")
+            estimate = estimate_download(conn, url, covering, *aoi, cache)
+        estimated = time.perf_counter()
+    finally:
+        conn.close()
+
+    engine = TimedEngine(url, Extent(*aoi), output_file, validation_results, session=session, metadata_cache=cache)
+    engine.size_warning_accepted = True
+    engine.run()
+    finished = time.perf_counter()
+
+    phases = {"validate": validated - start, "estimate": estimated - validated}
+    phases.update(engine.phase_seconds)
+    return {
+        "rows_written": engine.rows_written,
+        "error": engine.error_message,
+        "estimated_rows": estimate["rows"] if estimate else None,
+        "estimated_bytes": estimate["bytes"] if estimate else None,
+        "seconds": round(finished - start, 4),
+        "phases": {phase: round(seconds, 4) for phase, seconds in phases.items()},
+        "output_bytes": sum(os.path.getsize(path) for path in engine.output_files if os.path.exists(path)),
+        "http": engine.http_stats,
+    }
+
+
+def run(features, row_group_sizes, coverings, geometries, transports, formats, aoi, work_dir=None):
+    work_dir = work_dir or tempfile.mkdtemp(prefix="gpq_pipeline_")
+    fixture_dir = os.path.join(work_dir, BUCKET)
+    output_dir = os.path.join(work_dir, "outputs")
+    os.makedirs(fixture_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "duckdb": duckdb.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "aoi": list(aoi),
+        "fixtures": [],
+        "cases": [],
+    }
+
+    with serve(work_dir) as server:
+        sessions = {}
+        for transport in transports:
+            settings = server.s3_settings() if transport == "s3" else {}
+            sessions[transport] = DuckDBSession(settings=settings)
+        try:
+            for count, row_group_size, bbox_covering, geometry in itertools.product(
+                features, row_group_sizes, coverings, geometries
+            ):
+                name = fixture_name(count, row_group_size, bbox_covering, geometry)
+                path = os.path.join(fixture_dir, name)
+                if not os.path.exists(path):
+                    start = time.perf_counter()
+                    write_fixture(path, count, row_group_size, bbox_covering, geometry=geometry)
+                    results["fixtures"].append({
+                        "name": name, "seconds": round(time.perf_counter() - start, 3),
+                        "bytes": os.path.getsize(path),
+                    })
+
+                for transport, extension in itertools.product(transports, formats):
+                    output_file = os.path.join(output_dir, f"{os.path.splitext(name)[0]}_{transport}.{extension}")
+                    if os.path.exists(output_file):
+                        os.remove(output_file)
+                    server.reset_counts()
+                    case = {
+                        "features": count,
+                        "row_group_size": row_group_size,
+                        "bbox_covering": bbox_covering,
+                        "geometry": geometry,
+                        "transport": transport,
+                        "format": extension,
+                    }
+                    try:
+                        case.update(run_download(
+                            sessions[transport], dataset_url(transport, server, name), output_file, aoi,
+                            os.path.join(work_dir, "metadata_cache", f"{name}_{transport}_{extension}"),
+                        ))
+                    except Exception as e:
+                        case.update({"rows_written": None, "error": str(e), "seconds": None, "phases": {}})
+                    case["requests"], case["bytes_served"] = server.reset_counts()
+                    results["cases"].append(case)
+                    print(
+                        f"{name} {transport} {extension}: "
+                        + (f"error: {case['error']}" if case["error"] else
+                           f"{case['seconds']:.2f}s, {case['rows_written']} rows"),
+                        file=sys.stderr,
+                    )
+        finally:
+            for session in sessions.values():
+                session.close()
+    return results
+
+
+def case_key(case):
+    return tuple(case[key] for key in ("features", "row_group_size", "bbox_covering", "geometry", "transport", "format"))
+
+
+def compare(before, after, threshold=0.2, min_seconds=0.05):
+    """Cases and phases over threshold slower in after, ignoring timings under min_seconds"""
+    earlier = {case_key(case): case for case in before["cases"]}
+    slower = []
+    for case in after["cases"]:
+        old = earlier.get(case_key(case))
+        if old is None or old["seconds"] is None or case["seconds"] is None:
+            continue
+        timings = [("total", old["seconds"], case["seconds"])] + [
+            (phase, old["phases"].get(phase), seconds) for phase, seconds in case["phases"].items()
+        ]
+        for phase, old_seconds, new_seconds in timings:
+            if old_seconds is None or max(old_seconds, new_seconds) < min_seconds:
+                continue
+            if new_seconds > old_seconds * (1 + threshold):
+                slower.append({
+                    "case": dict(zip(("features", "row_group_size", "bbox_covering", "geometry", "transport", "format"),
+                                     case_key(case))),
+                    "phase": phase,
+                    "before": old_seconds,
+                    "after": new_seconds,
+                    "change": round(new_seconds / old_seconds - 1, 3) if old_seconds else None,
+                })
+    return slower
+
+
+def int_list(text):
+    return [int(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmark matrix")
+    run_parser.add_argument("--features", type=int_list, default=[10_000, 100_000, 1_000_000],
+                            help="Comma separated feature counts, e.g. 10000,1000000,50000000")
+    run_parser.add_argument("--row-group-size", type=int_list, default=[10_000, 100_000])
+    run_parser.add_argument("--bbox-covering", choices=("on", "off", "both"), default="both")
+    run_parser.add_argument("--geometry", choices=GEOMETRY_ENCODINGS + ("both",), default="both")
+    run_parser.add_argument("--transport", action="append", choices=TRANSPORTS,
+                            help="Where fixtures are read from; can be repeated (default: all)")
+    run_parser.add_argument("--format", action="append", choices=output_extensions(),
+                            help="Output format; can be repeated (default: all)")
+    run_parser.add_argument("--aoi", type=Extent.parse, help="xmin,ymin,xmax,ymax inside -10,-10,10,10")
+    run_parser.add_argument("--work-dir", help="Keep and reuse fixtures in this directory")
+    run_parser.add_argument("-o", "--output", help="Write the JSON results to this file")
+
+    compare_parser = commands.add_parser("compare", help="List cases that got slower between two result files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown to report, 0.2 is 20%%")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        slower = compare(before, after, args.threshold)
+        print(json.dumps(slower, indent=2))
+        sys.exit(1 if slower else 0)
+
+    coverings = {"on": [True], "off": [False], "both": [True, False]}[args.bbox_covering]
+    geometries = list(GEOMETRY_ENCODINGS) if args.geometry == "both" else [args.geometry]
+    aoi = args.aoi or Extent(*DEFAULT_AOI)
+    results = run(
+        args.features, args.row_group_size, coverings, geometries,
+        args.transport or list(TRANSPORTS), output_extensions(args.format),
+        (aoi.xMinimum(), aoi.yMinimum(), aoi.xMaximum(), aoi.yMaximum()), args.work_dir,
+    )
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
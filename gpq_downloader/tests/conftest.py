@@ -24,6 +24,7 @@ class MockIface(QObject):
         self.canvas = MockCanvas()
         self._window = QMainWindow()
         self.toolbar_icons = []  # Add this to track added icons
+        self.menu_actions = []
     
     def mapCanvas(self):
         return self.canvas
@@ -40,6 +41,13 @@ class MockIface(QObject):
         if action in self.toolbar_icons:
             self.toolbar_icons.remove(action)
 
+    def addPluginToMenu(self, menu, action):
+        self.menu_actions.append(action)
+
+    def removePluginMenu(self, menu, action):
+        if action in self.menu_actions:
+            self.menu_actions.remove(action)
+
 class MockCanvas:
     def __init__(self):
         self.settings = MockMapSettings()
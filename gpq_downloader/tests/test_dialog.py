@@ -159,4 +159,55 @@ def test_dialog_base_subtypes_visibility(qgs_app, mock_iface):
 
     # Uncheck should hide
     dialog.base_checkbox.setChecked(False)
-    assert dialog.base_subtype_widget.isHidden()
\ No newline at end of file
+    assert dialog.base_subtype_widget.isHidden()
+
+@patch('gpq_downloader.dialog.QgsSettings')
+def test_dialog_resource_profile_applied_to_session(mock_settings, qgs_app, mock_iface, tmp_path):
+    """Saving the resource settings stores them and updates the shared session"""
+    session = MagicMock()
+    dialog = DataSourceDialog(None, mock_iface, session=session)
+    assert dialog.resource_group is not None
+
+    dialog.threads_spin.setValue(2)
+    dialog.memory_spin.setValue(1024)
+    dialog.temp_dir_input.setText(str(tmp_path))
+    dialog.save_resource_settings()
+
+    keys = [c[0][0] for c in mock_settings.return_value.setValue.call_args_list]
+    assert "gpq_downloader/memory_limit_mb" in keys
+    settings = session.update_settings.call_args[0][0]
+    assert settings["threads"] == 2
+    assert settings["memory_limit"] == "1024MB"
+    assert settings["temp_directory"] == str(tmp_path)
+
+
+def test_cancel_estimate_does_not_wait_for_the_thread(qgs_app, mock_iface):
+    """Cancelling interrupts the estimate and parks its thread rather than blocking the UI on it"""
+    dialog = DataSourceDialog(None, mock_iface)
+    worker, thread = MagicMock(), MagicMock()
+    thread.isFinished.return_value = False
+    dialog.estimate_worker, dialog.estimate_thread = worker, thread
+
+    dialog.cancel_estimate()
+
+    worker.kill.assert_called_once()
+    worker.blockSignals.assert_called_once_with(True)
+    thread.quit.assert_called_once()
+    thread.wait.assert_not_called()
+    assert dialog.stopping_threads == [(worker, thread)]
+    assert dialog.estimate_thread is None
+
+
+def test_cancel_column_load_does_not_wait_for_the_thread(qgs_app, mock_iface):
+    """Cancelling the column read interrupts it and releases its thread without waiting"""
+    dialog = DataSourceDialog(None, mock_iface)
+    worker, thread = MagicMock(), MagicMock()
+    thread.isFinished.return_value = False
+    dialog.schema_worker, dialog.schema_thread = worker, thread
+
+    dialog.cancel_schema_worker()
+
+    worker.kill.assert_called_once()
+    thread.wait.assert_not_called()
+    assert dialog.stopping_threads == [(worker, thread)]
+    assert dialog.load_columns_button.isEnabled()
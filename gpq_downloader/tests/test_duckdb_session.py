@@ -0,0 +1,276 @@
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+
+from gpq_downloader.duckdb_session import DuckDBSession
+from gpq_downloader.utils import Worker
+
+
+def executed(mock_conn):
+    return [c[0][0] for c in mock_conn.execute.call_args_list]
+
+
+@patch("duckdb.connect")
+def test_session_warms_up_once(mock_connect):
+    """Extensions are installed and loaded once, however many cursors are handed out"""
+    mock_conn = MagicMock()
+    mock_connect.return_value = mock_conn
+
+    session = DuckDBSession()
+    assert not session.is_warm
+
+    first = session.cursor()
+    second = session.cursor()
+
+    mock_connect.assert_called_once()
+    queries = executed(mock_conn)
+    assert queries.count("INSTALL spatial;") == 1
+    assert queries.count("LOAD httpfs;") == 1
+    assert first is mock_conn.cursor.return_value
+    assert second is mock_conn.cursor.return_value
+    assert session.is_warm
+    # Cursors alone aren't download jobs
+    assert session.jobs_run == 0
+    assert session.warmup_seconds is not None
+
+
+@patch("duckdb.connect")
+def test_session_applies_settings(mock_connect):
+    """httpfs/S3 settings are applied globally on the shared database"""
+    mock_conn = MagicMock()
+    mock_connect.return_value = mock_conn
+
+    session = DuckDBSession(settings={"s3_region": "us-west-2", "http_keep_alive": True})
+    session.warm_up()
+
+    queries = executed(mock_conn)
+    assert "SET GLOBAL s3_region = 'us-west-2';" in queries
+    assert "SET GLOBAL http_keep_alive = true;" in queries
+
+
+@patch("duckdb.connect")
+def test_session_failed_warmup_is_retried(mock_connect):
+    """A failed warm-up closes the connection and the next cursor tries again"""
+    broken = MagicMock()
+    broken.execute.side_effect = Exception("no network")
+    working = MagicMock()
+    mock_connect.side_effect = [broken, working]
+
+    session = DuckDBSession()
+    with pytest.raises(Exception):
+        session.cursor()
+    broken.close.assert_called_once()
+    assert not session.is_warm
+
+    session.cursor()
+    assert session.is_warm
+
+
+@patch("duckdb.connect")
+def test_session_connect_file(mock_connect, tmp_path):
+    """DuckDB outputs get their own connection with extensions loaded"""
+    mock_conn = MagicMock()
+    mock_connect.return_value = mock_conn
+
+    session = DuckDBSession()
+    output = str(tmp_path / "out.duckdb")
+    conn = session.connect_file(output)
+
+    assert conn is mock_conn
+    mock_connect.assert_called_once_with(output)
+    assert "LOAD spatial;" in executed(mock_conn)
+
+
+@patch("duckdb.connect")
+def test_session_timing_summary(mock_connect):
+    """The timing summary reports warm-up against accumulated job time"""
+    mock_connect.return_value = MagicMock()
+
+    session = DuckDBSession()
+    assert "not started" in session.timing_summary()
+
+    session.cursor()
+    session.record_job(1.5)
+    session.record_job(2.5)
+
+    summary = session.timing_summary()
+    assert "2 job(s)" in summary
+    assert "4.00s" in summary
+
+
+@patch("duckdb.connect")
+def test_workers_share_session(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results):
+    """Two workers on the same session only warm up one database"""
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_conn
+    mock_conn.execute.return_value.fetchall.return_value = sample_validation_results["schema"]
+    mock_conn.execute.return_value.fetchone.return_value = (0,)
+    mock_connect.return_value = mock_conn
+
+    session = DuckDBSession()
+    for name in ("one.gpkg", "two.gpkg"):
+        worker = Worker(
+            "https://example.com/test.parquet",
+            sample_bbox,
+            str(tmp_path / name),
+            mock_iface,
+            dict(sample_validation_results),
+            session=session,
+        )
+        # The mock answers every query with the schema, HTTP log queries included
+        worker.http_logging = False
+        worker.run()
+
+    mock_connect.assert_called_once()
+    assert executed(mock_conn).count("INSTALL spatial;") == 1
+    assert session.jobs_run == 2
+    assert session.is_warm
+
+
+@patch("duckdb.connect")
+def test_bootstrap_installs_once_from_local_repository(mock_connect, tmp_path):
+    """The first session installs from the local repository, later ones only LOAD"""
+    extension_dir = tmp_path / "extensions"
+    repository = tmp_path / "repository"
+    repository.mkdir()
+
+    first_conn = MagicMock()
+    mock_connect.return_value = first_conn
+    DuckDBSession(
+        extension_directory=str(extension_dir), extension_repository=str(repository)
+    ).warm_up()
+
+    queries = executed(first_conn)
+    assert f"SET extension_directory = '{extension_dir}';" in queries
+    assert f"INSTALL spatial FROM '{repository}';" in queries
+    assert f"INSTALL httpfs FROM '{repository}';" in queries
+    assert (extension_dir / DuckDBSession.BOOTSTRAP_MARKER).exists()
+
+    second_conn = MagicMock()
+    mock_connect.return_value = second_conn
+    session = DuckDBSession(
+        extension_directory=str(extension_dir), extension_repository=str(repository)
+    )
+    assert session.extensions_bootstrapped()
+    session.warm_up()
+
+    queries = executed(second_conn)
+    assert not any(q.startswith("INSTALL") for q in queries)
+    assert "LOAD spatial;" in queries
+    assert "LOAD httpfs;" in queries
+
+
+@patch("duckdb.connect")
+def test_bootstrap_reinstalls_for_new_duckdb_version(mock_connect, tmp_path):
+    """A marker written by another DuckDB version triggers a fresh install"""
+    extension_dir = tmp_path / "extensions"
+    extension_dir.mkdir()
+    (extension_dir / DuckDBSession.BOOTSTRAP_MARKER).write_text(
+        '{"duckdb_version": "0.0.1", "extensions": ["httpfs", "spatial"]}'
+    )
+    mock_conn = MagicMock()
+    mock_connect.return_value = mock_conn
+
+    session = DuckDBSession(extension_directory=str(extension_dir))
+    assert not session.extensions_bootstrapped()
+    session.warm_up()
+
+    assert "INSTALL spatial;" in executed(mock_conn)
+    assert session.extensions_bootstrapped()
+
+
+@patch("duckdb.connect")
+def test_bootstrap_reinstalls_when_load_fails(mock_connect, tmp_path):
+    """If the bootstrapped files are gone, LOAD failure falls back to INSTALL"""
+    extension_dir = tmp_path / "extensions"
+    mock_connect.return_value = MagicMock()
+    DuckDBSession(extension_directory=str(extension_dir)).warm_up()
+
+    mock_conn = MagicMock()
+    attempts = []
+
+    def execute(query):
+        attempts.append(query)
+        if query == "LOAD httpfs;" and not any(q.startswith("INSTALL") for q in attempts):
+            raise Exception("extension file missing")
+        return MagicMock()
+
+    mock_conn.execute.side_effect = execute
+    mock_connect.return_value = mock_conn
+    DuckDBSession(extension_directory=str(extension_dir)).warm_up()
+
+    reinstall = attempts.index("INSTALL httpfs;")
+    assert "LOAD httpfs;" in attempts[reinstall:]
+
+
+def test_local_repository_never_contacts_network(tmp_path):
+    """Installing from a local directory stand-in only looks at that directory"""
+    import duckdb
+
+    repository = tmp_path / "repository"
+    repository.mkdir()
+    session = DuckDBSession(
+        extension_directory=str(tmp_path / "extensions"),
+        extension_repository=str(repository),
+    )
+    conn = duckdb.connect()
+    try:
+        with pytest.raises(duckdb.Error) as excinfo:
+            session.install_extensions(conn)
+    finally:
+        conn.close()
+
+    message = str(excinfo.value)
+    assert str(repository) in message
+    assert "http://" not in message
+    assert "https://" not in message
+
+
+def test_installs_from_seeded_local_repository(tmp_path):
+    """Extensions copied into a local repository layout install and load from it"""
+    import shutil
+    import duckdb
+
+    conn = duckdb.connect()
+    installed = {
+        name: path for name, path in conn.execute(
+            "SELECT extension_name, install_path FROM duckdb_extensions() "
+            "WHERE installed AND install_path LIKE '%.duckdb_extension'"
+        ).fetchall()
+        if name in DuckDBSession.EXTENSIONS and os.path.exists(path)
+    }
+    if not installed:
+        conn.close()
+        pytest.skip("No installed httpfs or spatial extension to seed a repository with")
+    version = conn.execute("SELECT library_version FROM pragma_version()").fetchone()[0]
+    platform = conn.execute("PRAGMA platform").fetchone()[0]
+    conn.close()
+
+    # <repository>/<duckdb version>/<platform>/<name>.duckdb_extension, as DuckDB expects
+    repository = tmp_path / "repository"
+    platform_dir = repository / version / platform
+    platform_dir.mkdir(parents=True)
+    for name, path in installed.items():
+        shutil.copy(path, platform_dir / f"{name}.duckdb_extension")
+
+    session = DuckDBSession(
+        extension_directory=str(tmp_path / "extensions"),
+        extension_repository=str(repository),
+    )
+    session.EXTENSIONS = tuple(installed)
+    conn = duckdb.connect()
+    try:
+        session.load_extensions(conn)
+        rows = conn.execute(
+            "SELECT extension_name, loaded, installed_from FROM duckdb_extensions() "
+            f"WHERE extension_name IN ({', '.join(repr(name) for name in installed)})"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    assert session.extensions_bootstrapped()
+    assert all(loaded and str(repository) in installed_from for _, loaded, installed_from in rows)
+    assert all(
+        (tmp_path / "extensions" / version / platform / f"{name}.duckdb_extension").exists()
+        for name in installed
+    )
@@ -0,0 +1,144 @@
+import pytest
+from unittest.mock import patch
+import os
+
+from gpq_downloader.cli import build_parser, plan_jobs
+from gpq_downloader.engine import DownloadEngine, DownloadError, Extent, download, download_many, resolve_preset
+
+
+class MockResult:
+    def __init__(self, data):
+        self.data = data
+
+    def fetchall(self):
+        return self.data
+
+    def fetchone(self):
+        return self.data[0] if self.data else None
+
+
+class CopyConnection:
+    """Connection whose COPY writes copy_rows rows"""
+    def __init__(self, schema_data, copy_rows=5):
+        self.schema_data = schema_data
+        self.copy_rows = copy_rows
+        self.executed_queries = []
+        self.parameters = {}
+
+    def execute(self, query, parameters=None):
+        self.executed_queries.append(query)
+        if parameters is not None:
+            self.parameters[query] = parameters
+        if "DESCRIBE" in query:
+            return MockResult(self.schema_data)
+        if "ST_AsWKB" in query:
+            # prepare_aoi: WKB, vertex counts before and after, extent
+            return MockResult([(b"\x01aoi", 4, 4, 1.5, 2.0, 3.0, 4.0)])
+        if "ST_XMin" in query:
+            return MockResult([(1.0, 2.0, 3.0, 4.0)])
+        if query.lstrip().startswith("COPY"):
+            return MockResult([(self.copy_rows,)])
+        return MockResult([])
+
+    def cursor(self):
+        return self
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def schema_with_bbox():
+    return [
+        ("id", "INTEGER", "YES", None, None, None),
+        ("bbox", "STRUCT(xmin DOUBLE, ymin DOUBLE, xmax DOUBLE, ymax DOUBLE)", "YES", None, None, None),
+        ("geom", "GEOMETRY", "YES", None, None, None),
+    ]
+
+
+def test_extent_parse():
+    extent = Extent.parse("-122.5,37.7,-122.4,37.8")
+    assert (extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum()) == (-122.5, 37.7, -122.4, 37.8)
+    with pytest.raises(ValueError):
+        Extent.parse("1,2,3")
+
+
+def test_resolve_preset():
+    url, name = resolve_preset("overture/buildings", release="2025-01-22.0")
+    assert url == "s3://overturemaps-us-west-2/release/2025-01-22.0/theme=buildings/type=building/*"
+    assert name == "Overture Buildings"
+    url, name = resolve_preset("overture/base/land", release="2025-01-22.0")
+    assert url.endswith("/theme=base/type=land/*")
+    assert name == "Overture Base - Land"
+    url, _ = resolve_preset("source_cooperative/vida_buildings")
+    assert url.endswith("by_country/*/*.parquet")
+    for name in ("overture/base", "overture/nothing", "source_cooperative/vida_buildings/x", "buildings"):
+        with pytest.raises(ValueError):
+            resolve_preset(name, release="2025-01-22.0")
+
+
+@patch("duckdb.connect")
+def test_download_without_qgis(mock_connect, tmp_path, schema_with_bbox):
+    """download() detects the geometry column, filters on bbox and AOI and reports the rows written"""
+    conn = CopyConnection(schema_with_bbox)
+    mock_connect.return_value = conn
+    aoi = "POLYGON((1 2, 3 2, 3 4, 1 2))"
+
+    engine = download("https://example.com/test.parquet", None, str(tmp_path / "out.parquet"), aoi_wkt=aoi)
+
+    assert isinstance(engine, DownloadEngine)
+    assert engine.rows_written == 5
+    assert engine.validation_results["geometry_column"] == "geom"
+    copy = next(query for query in conn.executed_queries if query.lstrip().startswith("COPY"))
+    assert '"bbox"."xmin" <= 3.0' in copy
+    # The AOI is bound as WKB, with the cheap test on its extent before the exact one
+    assert aoi not in copy
+    assert '"bbox"."xmax" >= 1.5' in copy
+    assert 'ST_Intersects("geom", ST_GeomFromWKB($aoi))' in copy
+    assert conn.parameters[copy] == {"aoi": b"\x01aoi"}
+
+
+@patch("duckdb.connect")
+def test_download_errors_raise(mock_connect, tmp_path, schema_with_bbox):
+    mock_connect.return_value = CopyConnection(schema_with_bbox)
+    with pytest.raises(DownloadError):
+        download("https://example.com/test.parquet", (1, 2, 3, 4), str(tmp_path / "out.txt"))
+
+
+@patch("duckdb.connect")
+def test_download_many_returns_results_in_order(mock_connect, tmp_path, schema_with_bbox):
+    mock_connect.return_value = CopyConnection(schema_with_bbox)
+    jobs = [
+        {"dataset_url": "https://example.com/a.parquet", "output_file": str(tmp_path / "a.parquet")},
+        {"dataset_url": "https://example.com/b.parquet", "output_file": str(tmp_path / "b.txt")},
+    ]
+    results = download_many(jobs, max_jobs=2, bbox=(1, 2, 3, 4))
+    assert isinstance(results[0], DownloadEngine)
+    assert results[0].output_file == jobs[0]["output_file"]
+    assert isinstance(results[1], DownloadError)
+
+
+def test_cli_plans_one_file_per_dataset(tmp_path):
+    parser = build_parser()
+    args = parser.parse_args([
+        "--preset", "overture/base/land", "--url", "https://example.com/roads.parquet",
+        "--release", "2025-01-22.0", "--bbox", "1,2,3,4", "-o", str(tmp_path / "out"),
+        "--format", "gpkg", "--columns", "id, class",
+    ])
+    jobs = plan_jobs(args, parser)
+    assert [os.path.basename(job["output_file"]) for job in jobs] == ["overture_base_land.gpkg", "roads.gpkg"]
+    assert jobs[0]["columns"] == ["id", "class"]
+    assert jobs[1]["bbox"].xMaximum() == 3.0
+
+
+def test_cli_single_output_file(tmp_path):
+    parser = build_parser()
+    output = str(tmp_path / "land.fgb")
+    args = parser.parse_args(["--url", "https://example.com/land.parquet", "--aoi", "POINT(1 2)", "-o", output])
+    jobs = plan_jobs(args, parser)
+    assert [job["output_file"] for job in jobs] == [output]
+    assert jobs[0]["aoi_wkt"] == "POINT(1 2)"
+    assert jobs[0]["bbox"] is None
@@ -0,0 +1,110 @@
+import duckdb
+import pytest
+from unittest.mock import MagicMock
+from qgis.core import QgsCoordinateReferenceSystem, QgsRectangle
+
+from gpq_downloader.estimate import (
+    check_thresholds,
+    combine_estimates,
+    estimate_download,
+    find_bbox_covering,
+    format_estimate,
+)
+from gpq_downloader.query import default_bbox_covering
+from gpq_downloader.utils import EstimateWorker
+
+
+@pytest.fixture
+def bbox_parquet(tmp_path):
+    """Two row groups of 4096 rows, side by side along x"""
+    path = str(tmp_path / "bbox.parquet")
+    conn = duckdb.connect()
+    conn.execute(f"""
+        COPY (
+            SELECT range AS id,
+                   {{'xmin': range::DOUBLE, 'ymin': 0.0, 'xmax': range + 1.0, 'ymax': 1.0}} AS bbox
+            FROM range(8192)
+        ) TO '{path}' (FORMAT 'parquet', ROW_GROUP_SIZE 4096)
+    """)
+    return conn, path
+
+
+def test_estimate_counts_only_overlapping_row_groups(bbox_parquet):
+    conn, path = bbox_parquet
+    covering = find_bbox_covering(conn, path)
+    assert covering == default_bbox_covering("bbox")
+
+    estimate = estimate_download(conn, path, covering, 0.0, 0.0, 100.0, 1.0)
+    assert estimate["files"] == 1
+    assert estimate["row_groups"] == 1
+    assert estimate["rows"] == 100
+    assert estimate["bytes"] > 0
+
+
+def test_combine_and_format_estimates():
+    total = combine_estimates([
+        {"files": 2, "row_groups": 10, "rows": 1_000_000, "bytes": 30 * 1024 * 1024},
+        None,
+        {"files": 1, "row_groups": 2, "rows": 200_000, "bytes": 15 * 1024 * 1024 // 10},
+    ])
+    assert total == {
+        "files": 3, "row_groups": 12, "rows": 1_200_000,
+        "bytes": 30 * 1024 * 1024 + 15 * 1024 * 1024 // 10, "unknown": 1,
+    }
+    assert format_estimate(total) == (
+        "About 1,200,000 rows in 12 row groups of 3 files, 31.5 MB to read "
+        "(1 dataset(s) without statistics not included)"
+    )
+
+
+def test_check_thresholds():
+    estimate = {"bytes": 600 * 1024 * 1024}
+    assert check_thresholds(estimate, warn_mb=500, block_mb=1000) == "warn"
+    assert check_thresholds(estimate, warn_mb=500, block_mb=550) == "block"
+    assert check_thresholds(estimate, warn_mb=0, block_mb=0) == "ok"
+    assert check_thresholds(estimate, warn_mb=1000, block_mb=0) == "ok"
+
+
+def test_estimate_worker_reads_footers_only(bbox_parquet):
+    """The worker adds up the estimates of every selected dataset"""
+    conn, path = bbox_parquet
+    session = MagicMock()
+    session.cursor.return_value = conn
+    results = []
+
+    worker = EstimateWorker(
+        [path, path], QgsRectangle(4000, 0, 4200, 1), QgsCoordinateReferenceSystem("EPSG:4326"),
+        session=session,
+    )
+    worker.finished.connect(results.append)
+    worker.run()
+
+    assert results[0]["row_groups"] == 4
+    assert results[0]["unknown"] == 0
+    assert results[0]["rows"] == 400
+
+
+def test_cancelled_estimate_interrupts_the_read():
+    """kill() interrupts the footer read, and the interrupted worker reports nothing"""
+    conn = MagicMock()
+    session = MagicMock()
+    session.cursor.return_value = conn
+    results = []
+    worker = EstimateWorker(
+        ["https://example.com/a.parquet"], QgsRectangle(0, 0, 1, 1), QgsCoordinateReferenceSystem("EPSG:4326"),
+        validation_results={"bbox_covering": default_bbox_covering("bbox")}, session=session,
+    )
+
+    def cancel_while_reading(*args):
+        # The dialog cancels while the remote footers are being read
+        worker.kill()
+        raise duckdb.InterruptException("INTERRUPT Error: Interrupted!")
+
+    conn.execute.side_effect = cancel_while_reading
+    worker.finished.connect(results.append)
+    worker.run()
+
+    conn.interrupt.assert_called_once()
+    conn.close.assert_called_once()
+    assert results == []
+    assert worker.conn is None
@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+
+import pytest
+
+from gpq_downloader.duckdb_session import DuckDBSession
+from gpq_downloader.engine import DownloadEngine, Extent
+from gpq_downloader.http_stats import (
+    format_http_stats, header, http_record_path, job_requests, summarize_requests,
+)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "benchmarks"))
+
+
+def request(method="GET", url="http://example.com/a.parquet", status=206, duration_ms=20, size=1000, byte_range=None):
+    return {"method": method, "url": url, "status": status, "duration_ms": duration_ms, "bytes": size, "range": byte_range}
+
+
+class MockResult:
+    def __init__(self, data):
+        self.data = data
+
+    def fetchall(self):
+        return self.data
+
+    def fetchone(self):
+        return self.data[0] if self.data else None
+
+
+class LoggingConnection:
+    """Connection answering the HTTP log queries with log_rows"""
+    def __init__(self, log_rows):
+        self.log_rows = log_rows
+        self.executed_queries = []
+
+    def execute(self, query, parameters=None):
+        self.executed_queries.append(query)
+        if "current_connection_id" in query:
+            return MockResult([(7,)])
+        if "duckdb_logs_parsed" in query:
+            return MockResult(self.log_rows)
+        if "DESCRIBE" in query:
+            return MockResult([
+                ("id", "INTEGER", "YES", None, None, None),
+                ("geometry", "GEOMETRY", "YES", None, None, None),
+            ])
+        if query.lstrip().startswith("COPY"):
+            return MockResult([(3,)])
+        return MockResult([])
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+
+def test_header_is_case_insensitive():
+    assert header({"content-length": "10"}, "Content-Length") == "10"
+    assert header({"key": ["Range"], "value": ["bytes=0-9"]}, "range") == "bytes=0-9"
+    assert header(None, "Range") is None
+
+
+def test_job_requests_parses_log_rows():
+    conn = LoggingConnection([
+        ("HEAD", "http://h/a.parquet", 5, {}, "OK_200", {"Content-Length": "5000"}),
+        ("GET", "http://h/a.parquet", 12, {"Range": "bytes=100-199"}, "PartialContent_206", {}),
+    ])
+    requests = job_requests(conn, [7, None])
+    assert "connection_id IN (7)" in conn.executed_queries[-1]
+    assert [r["method"] for r in requests] == ["HEAD", "GET"]
+    # HEAD reports the object size, which wasn't transferred
+    assert requests[0]["bytes"] == 0 and requests[0]["status"] == 200
+    # Without Content-Length the size comes from the range
+    assert requests[1]["bytes"] == 100 and requests[1]["status"] == 206
+    assert job_requests(conn, []) == []
+
+
+def test_summarize_requests():
+    requests = [
+        request("HEAD", size=0, duration_ms=5),
+        request(byte_range="bytes=0-999", duration_ms=30),
+        request(byte_range="bytes=0-999", duration_ms=3000),
+        request(url="http://example.com/b.parquet", status=503, duration_ms=80),
+    ]
+    stats = summarize_requests(requests)
+    assert stats["requests"] == 4
+    assert stats["methods"] == {"HEAD": 1, "GET": 3}
+    assert stats["bytes"] == 3000 and stats["mean_get_bytes"] == 1000
+    assert stats["retries"] == 1
+    assert stats["errors"] == 1
+    assert stats["files"] == 2
+    assert stats["latency_ms"]["max"] == 3000
+    assert stats["latency_histogram"]["<=10ms"] == 1
+    assert stats["latency_histogram"]["<=5000ms"] == 1
+    assert sum(stats["latency_histogram"].values()) == 4
+
+    text = format_http_stats(stats)
+    assert text.startswith("4 HTTP requests (3 GET, 1 HEAD)")
+    assert "1 retry" in text and "1 failed" in text
+
+
+def test_summarize_no_requests():
+    stats = summarize_requests([])
+    assert stats["requests"] == 0 and stats["latency_ms"]["p50"] is None
+    assert format_http_stats(stats) == "0 HTTP requests (), 0.0 MB"
+
+
+def test_engine_reports_and_records_http_stats(tmp_path):
+    conn = LoggingConnection([
+        ("GET", "http://h/a.parquet", 40, {"Range": "bytes=0-1023"}, "PartialContent_206", {"Content-Length": "1024"}),
+    ])
+    session = DuckDBSession()
+    session._conn = conn
+    output_file = str(tmp_path / "out.parquet")
+    # The mocked COPY doesn't write anything, so stand in for its output
+    open(output_file, "w").close()
+
+    engine = DownloadEngine(
+        "http://h/a.parquet", Extent(0, 0, 1, 1), output_file,
+        {"has_bbox": False, "geometry_column": "geometry"}, session=session,
+    )
+    engine.size_warning_accepted = True
+    engine.run()
+
+    assert engine.error_message is None
+    assert engine.http_stats["requests"] == 1
+    assert engine.http_stats["bytes"] == 1024
+    with open(http_record_path(output_file)) as f:
+        record = json.load(f)
+    assert record["url"] == "http://h/a.parquet"
+    assert record["stats"]["requests"] == 1
+    assert record["requests"][0]["range"] == "bytes=0-1023"
+    assert any("truncate_duckdb_logs" in query for query in conn.executed_queries)
+
+
+def test_engine_http_logging_off(tmp_path):
+    conn = LoggingConnection([])
+    session = DuckDBSession()
+    session._conn = conn
+    engine = DownloadEngine(
+        "a.parquet", Extent(0, 0, 1, 1), str(tmp_path / "out.parquet"),
+        {"has_bbox": False, "geometry_column": "geometry"}, session=session,
+    )
+    engine.http_logging = False
+    engine.size_warning_accepted = True
+    engine.run()
+    assert engine.http_stats is None
+    assert not any("enable_logging" in query for query in conn.executed_queries)
+
+
+def test_http_stats_match_local_server(tmp_path):
+    """Requests logged by DuckDB are the ones a local HTTP stand-in served"""
+    pytest.importorskip("pyarrow")
+    from fixtures import write_fixture
+    from local_server import serve
+
+    session = DuckDBSession()
+    try:
+        session.cursor().close()
+    except Exception as e:
+        pytest.skip(f"httpfs/spatial extensions not available: {e}")
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    write_fixture(str(data_dir / "points.parquet"), 20_000, row_group_size=2_000)
+    output_file = str(tmp_path / "out.parquet")
+
+    with serve(str(tmp_path)) as server:
+        engine = DownloadEngine(
+            f"{server.url}/data/points.parquet", Extent(-1, -1, 1, 1), output_file,
+            {"has_bbox": True, "bbox_column": "bbox", "geometry_column": "geometry"}, session=session,
+        )
+        engine.size_warning_accepted = True
+        engine.run()
+        served, _ = server.reset_counts()
+    session.close()
+
+    if engine.error_message:
+        pytest.skip(f"download over HTTP failed: {engine.error_message}")
+    assert engine.http_stats["requests"] == served
+    assert engine.http_stats["methods"].get("GET")
+    assert os.path.exists(http_record_path(output_file))
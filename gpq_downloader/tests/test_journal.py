@@ -0,0 +1,157 @@
+import os
+import duckdb
+import pytest
+from unittest.mock import patch
+from qgis.core import QgsRectangle
+
+from gpq_downloader.duckdb_session import DuckDBSession
+from gpq_downloader.journal import JobJournal, journal_path, list_journals
+from gpq_downloader.tiling import run_tiles
+from gpq_downloader.utils import Worker
+
+SPEC = {
+    "url": "https://example.com/test.parquet",
+    "output_file": "/data/out.parquet",
+    "extra_outputs": [],
+    "bbox": [1.0, 2.0, 3.0, 4.0],
+    "aoi_wkt": None,
+    "format": "parquet",
+    "layer_name": None,
+    "validation_results": {"has_bbox": True, "bbox_column": "bbox", "geometry_column": "geometry"},
+}
+
+
+def test_journal_roundtrip(tmp_path):
+    """Spec, tiling and finished tiles survive a reload"""
+    part = tmp_path / "part-00001.parquet"
+    part.write_bytes(b"part")
+    journal = JobJournal.for_output(str(tmp_path), SPEC["output_file"])
+    journal.start(dict(SPEC))
+    journal.set_tile_level(1)
+    journal.mark_tile_done(1, str(part), 25)
+    journal.mark_tile_done(2, str(tmp_path / "gone.parquet"), 10)
+    journal.mark_stopped("failed", "connection reset")
+
+    loaded = JobJournal.for_output(str(tmp_path), SPEC["output_file"])
+    assert loaded.path == journal_path(str(tmp_path), SPEC["output_file"])
+    assert loaded.spec == SPEC
+    assert loaded.tile_level == 1
+    assert loaded.status == "failed"
+    # A tile whose part file has disappeared has to be downloaded again
+    assert loaded.completed_tiles() == {1: (str(part), 25)}
+
+
+def test_journal_new_spec_drops_tiles(tmp_path):
+    """Tiles recorded for a different extent are not reused"""
+    journal = JobJournal.for_output(str(tmp_path), SPEC["output_file"])
+    journal.start(dict(SPEC))
+    journal.set_tile_level(1)
+    journal.mark_tile_done(0, "part-00000.parquet", 0)
+
+    journal.start(dict(SPEC, bbox=[0.0, 0.0, 1.0, 1.0]))
+    assert journal.tiles == {}
+    assert journal.tile_level is None
+
+
+def test_list_journals_skips_unreadable(tmp_path):
+    JobJournal.for_output(str(tmp_path), "/data/a.parquet").start(dict(SPEC, output_file="/data/a.parquet"))
+    (tmp_path / "broken.json").write_text("{")
+    journals = list_journals(str(tmp_path))
+    assert [journal.spec["output_file"] for journal in journals] == ["/data/a.parquet"]
+    journals[0].remove()
+    assert list_journals(str(tmp_path)) == []
+
+
+@pytest.fixture
+def spatial_session():
+    session = DuckDBSession(settings={"threads": 1})
+    try:
+        session.warm_up()
+    except Exception as e:
+        pytest.skip(f"DuckDB spatial extension not available: {e}")
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def point_fixture(tmp_path):
+    """400 points with a bbox covering column, spread over (0, 0, 10, 10)"""
+    path = str(tmp_path / "points.parquet")
+    conn = duckdb.connect()
+    conn.execute(f"""
+        COPY (
+            SELECT i AS id,
+                   {{'xmin': x, 'ymin': y, 'xmax': x, 'ymax': y}} AS bbox,
+                   ('POINT(' || x || ' ' || y || ')')::GEOMETRY AS geometry
+            FROM (
+                SELECT range AS i, (range % 20) / 2.0 + 0.25 AS x, (range // 20) / 2.0 + 0.25 AS y
+                FROM range(400)
+            )
+        ) TO '{path}' (FORMAT 'parquet')
+    """)
+    conn.close()
+    return path
+
+
+def make_worker(url, output_file, iface, session, journal=None):
+    worker = Worker(
+        url,
+        QgsRectangle(0, 0, 10, 10),
+        output_file,
+        iface,
+        {"has_bbox": True, "bbox_column": "bbox", "geometry_column": "geometry"},
+        session=session,
+    )
+    # 400 rows at 100 per tile -> 4 tiles, one at a time
+    worker.tile_target_rows = 100
+    worker.tile_jobs = 1
+    worker.journal = journal
+    return worker
+
+
+def counting_run_tiles(calls, stop_after=None, worker=None):
+    """run_tiles that counts tile downloads and can kill the worker partway"""
+    def wrapped(tiles, run_tile, **kwargs):
+        def counted(tile):
+            if stop_after is not None and len(calls) >= stop_after:
+                worker.kill()
+                return None
+            calls.append(tile["index"])
+            return run_tile(tile)
+        return run_tiles(tiles, counted, **kwargs)
+    return wrapped
+
+
+def test_resumed_download_matches_uninterrupted(tmp_path, mock_iface, spatial_session, point_fixture):
+    """A job killed after two tiles resumes with the other two and writes the same file"""
+    clean_output = str(tmp_path / "clean.parquet")
+    calls = []
+    with patch("gpq_downloader.engine.run_tiles", counting_run_tiles(calls)):
+        make_worker(point_fixture, clean_output, mock_iface, spatial_session).run()
+    assert len(calls) == 4
+
+    journal_dir = str(tmp_path / "journal")
+    output = str(tmp_path / "resumed.parquet")
+    interrupted = make_worker(
+        point_fixture, output, mock_iface, spatial_session,
+        JobJournal.for_output(journal_dir, output),
+    )
+    calls = []
+    with patch("gpq_downloader.engine.run_tiles", counting_run_tiles(calls, 2, interrupted)):
+        interrupted.run()
+    assert len(calls) == 2
+    assert not os.path.exists(output)
+    journal = JobJournal.for_output(journal_dir, output)
+    assert journal.status == "cancelled"
+    assert sorted(journal.completed_tiles()) == calls
+
+    resumed = make_worker(point_fixture, output, mock_iface, spatial_session, journal)
+    resumed_calls = []
+    with patch("gpq_downloader.engine.run_tiles", counting_run_tiles(resumed_calls)):
+        resumed.run()
+
+    assert sorted(resumed_calls + calls) == [0, 1, 2, 3]
+    with open(clean_output, "rb") as clean, open(output, "rb") as resumed_file:
+        assert clean.read() == resumed_file.read()
+    assert list_journals(journal_dir) == []
+    assert not os.path.exists(str(tmp_path / "resumed_tiles"))
@@ -1,4 +1,7 @@
 import pytest
+from unittest.mock import patch
+
+from gpq_downloader import logger
 from gpq_downloader.logger import log
 
 def test_logger_basic():
@@ -11,4 +14,95 @@ def test_logger_levels():
     """Test different logger levels"""
     log("Info message", 0)
     log("Warning message", 1)
-    log("Error message", 2) 
\ No newline at end of file
+    log("Error message", 2) 
+
+def test_span_is_noop_when_tracing_is_off():
+    from gpq_downloader import logger
+    assert logger.stop_trace() is None
+    with logger.span("read", rows=1) as s:
+        s.set(bytes=2)
+    assert s is logger.NO_SPAN
+
+
+def test_nested_spans_and_export(tmp_path):
+    import json
+    from gpq_downloader import logger
+
+    trace = logger.start_trace()
+    try:
+        with logger.span("job", layer="buildings") as job:
+            with logger.span("read") as read:
+                read.set(rows=10, bytes=2048)
+            with pytest.raises(ValueError):
+                with logger.span("write"):
+                    raise ValueError("disk full")
+            job.set(rows=10)
+    finally:
+        assert logger.stop_trace() is trace
+
+    records = {record["name"]: record for record in trace.records()}
+    assert records["job"]["parent"] is None
+    assert records["read"]["parent"] == records["job"]["id"]
+    assert records["read"]["attributes"] == {"rows": 10, "bytes": 2048}
+    assert records["write"]["attributes"]["error"] == "disk full"
+    assert records["job"]["duration_ms"] >= records["read"]["duration_ms"]
+
+    lines_path = tmp_path / "trace.jsonl"
+    trace.write(str(lines_path))
+    lines = [json.loads(line) for line in lines_path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["job", "read", "write"]
+
+    chrome_path = tmp_path / "trace.json"
+    trace.write(str(chrome_path))
+    events = json.loads(chrome_path.read_text())["traceEvents"]
+    assert {event["ph"] for event in events} == {"X"}
+    assert events[1]["args"]["rows"] == 10
+
+
+def test_engine_records_spans(tmp_path):
+    from gpq_downloader import logger
+    from gpq_downloader.duckdb_session import DuckDBSession
+    from gpq_downloader.engine import DownloadEngine, Extent
+
+    class Result:
+        def __init__(self, data):
+            self.data = data
+
+        def fetchall(self):
+            return self.data
+
+        def fetchone(self):
+            return self.data[0] if self.data else None
+
+    class Connection:
+        def execute(self, query, parameters=None):
+            if "DESCRIBE" in query:
+                return Result([("geometry", "GEOMETRY", "YES", None, None, None)])
+            if query.lstrip().startswith("COPY"):
+                return Result([(4,)])
+            return Result([])
+
+        def cursor(self):
+            return self
+
+        def close(self):
+            pass
+
+    session = DuckDBSession()
+    session._conn = Connection()
+    engine = DownloadEngine(
+        "a.parquet", Extent(0, 0, 1, 1), str(tmp_path / "out.parquet"),
+        {"has_bbox": False, "geometry_column": "geometry"}, session=session,
+    )
+    engine.size_warning_accepted = True
+    trace = logger.start_trace()
+    try:
+        engine.run()
+    finally:
+        logger.stop_trace()
+
+    records = {record["name"]: record for record in trace.records()}
+    assert {"job", "connect", "schema", "read_sort_write"} <= set(records)
+    assert records["read_sort_write"]["attributes"]["rows"] == 4
+    assert records["job"]["attributes"]["rows"] == 4
+    assert records["schema"]["parent"] == records["job"]["id"]
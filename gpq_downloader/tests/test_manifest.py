@@ -0,0 +1,86 @@
+import os
+import duckdb
+import pytest
+
+from gpq_downloader.manifest import (
+    ManifestStore,
+    build_manifest,
+    intersecting_files,
+    manifest_row_groups,
+    manifest_source,
+)
+from gpq_downloader.query import bbox_overlap_predicate, default_bbox_covering
+
+
+COVERING = default_bbox_covering("bbox")
+
+
+@pytest.fixture
+def fixture_dir(tmp_path):
+    """Three files side by side along x, two row groups each"""
+    directory = tmp_path / "fixtures"
+    directory.mkdir()
+    conn = duckdb.connect()
+    for number in range(3):
+        conn.execute(f"""
+            COPY (
+                SELECT range AS id,
+                       {{'xmin': {number * 10} + range / 400, 'ymin': 0.0,
+                         'xmax': {number * 10} + range / 400 + 0.1, 'ymax': 1.0}} AS bbox
+                FROM range(4096)
+            ) TO '{directory / f"part-{number}.parquet"}' (FORMAT 'parquet', ROW_GROUP_SIZE 2048)
+        """)
+    return directory
+
+
+def test_build_manifest_from_local_directory(fixture_dir, tmp_path):
+    """One parquet_metadata() pass records every file's bbox, rows and row group bboxes"""
+    url = str(fixture_dir / "*.parquet")
+    store = ManifestStore(str(tmp_path / "manifests"))
+    manifest = store.build(duckdb.connect(), url, COVERING)
+
+    assert [os.path.basename(entry["path"]) for entry in manifest["files"]] == [
+        "part-0.parquet", "part-1.parquet", "part-2.parquet"
+    ]
+    first = manifest["files"][0]
+    assert first["rows"] == 4096
+    assert len(first["row_groups"]) == 2
+    assert first["bbox"] == [0.0, 0.0, pytest.approx(4095 / 400 + 0.1), 1.0]
+    assert store.load(url, COVERING) == manifest
+    assert store.load(url, default_bbox_covering("other")) is None
+
+
+def test_manifest_expires_when_files_change(fixture_dir, tmp_path):
+    url = str(fixture_dir / "*.parquet")
+    store = ManifestStore(str(tmp_path / "manifests"))
+    store.build(duckdb.connect(), url, COVERING)
+
+    duckdb.connect().execute(f"COPY (SELECT 1 AS id) TO '{fixture_dir / 'part-3.parquet'}' (FORMAT 'parquet')")
+    assert ManifestStore(str(tmp_path / "manifests")).load(url, COVERING) is None
+
+
+def test_manifest_files_read_same_rows(fixture_dir, tmp_path):
+    """Reading only the intersecting files gives the same rows as the glob"""
+    url = str(fixture_dir / "*.parquet")
+    conn = duckdb.connect()
+    manifest = ManifestStore(str(tmp_path / "manifests")).build(conn, url, COVERING)
+
+    paths = intersecting_files(manifest, 11.0, 0.0, 22.0, 1.0)
+    assert [os.path.basename(path) for path in paths] == ["part-1.parquet", "part-2.parquet"]
+
+    where = bbox_overlap_predicate(COVERING, 11.0, 0.0, 22.0, 1.0)
+    query = "SELECT id, bbox FROM {} WHERE " + where + " ORDER BY ALL"
+    assert conn.execute(query.format(manifest_source(url, paths))).fetchall() == \
+        conn.execute(query.format(f"read_parquet('{url}')")).fetchall()
+
+
+def test_manifest_row_groups_roundtrip():
+    row_groups = [
+        [10, 0.0, 0.0, 1.0, 1.0, 100, 0, "a.parquet"],
+        [10, None, None, None, None, 100, 1, "b.parquet"],
+    ]
+    manifest = build_manifest("*.parquet", COVERING, row_groups)
+    assert manifest_row_groups(manifest) == row_groups
+    # A file without statistics is always read
+    assert manifest["files"][1]["bbox"] is None
+    assert intersecting_files(manifest, 5.0, 5.0, 6.0, 6.0) == ["b.parquet"]
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+import duckdb
+import pytest
+from unittest.mock import MagicMock, patch
+
+from gpq_downloader.metadata_cache import (
+    MetadataCache,
+    dataset_validator,
+    get_column_sizes,
+    get_geo_metadata,
+    get_row_group_bounds,
+    get_schema,
+)
+from gpq_downloader.query import default_bbox_covering
+from gpq_downloader.utils import SchemaWorker, ValidationWorker
+
+OVERTURE_URL = "s3://overturemaps-us-west-2/release/2025-10-22.0/theme=buildings/type=building/*"
+
+SCHEMA = [
+    ("id", "VARCHAR", "YES", None, None, None),
+    ("bbox", "STRUCT(xmin DOUBLE, ymin DOUBLE, xmax DOUBLE, ymax DOUBLE)", "YES", None, None, None),
+    ("geometry", "GEOMETRY", "YES", None, None, None),
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return MetadataCache(str(tmp_path / "metadata_cache"))
+
+
+def test_validator_uses_release_from_url():
+    """Overture URLs are validated by their release, with no network access"""
+    assert dataset_validator(OVERTURE_URL) == "release=2025-10-22.0"
+
+
+def test_validator_for_local_file_changes_with_content(tmp_path):
+    """Local files are validated by size and mtime"""
+    path = tmp_path / "data.parquet"
+    path.write_bytes(b"1234")
+    before = dataset_validator(str(path))
+    path.write_bytes(b"123456")
+    assert dataset_validator(f"file://{path}") != before
+
+
+def test_cache_roundtrip(cache):
+    """Stored values come back for the same URL and kind"""
+    cache.put(OVERTURE_URL, "geo", '{"version": "1.1.0"}')
+    assert cache.get(OVERTURE_URL, "geo") == '{"version": "1.1.0"}'
+    assert cache.get(OVERTURE_URL, "schema") is None
+    assert cache.get(OVERTURE_URL.replace("2025-10-22.0", "2025-11-19.0"), "geo") is None
+
+
+def test_cache_ttl_expiry(tmp_path):
+    """Entries older than the TTL are ignored and removed"""
+    cache = MetadataCache(str(tmp_path), ttl_seconds=10)
+    cache.put(OVERTURE_URL, "geo", "{}")
+    with patch("gpq_downloader.metadata_cache.time.time", return_value=time.time() + 60):
+        assert cache.get(OVERTURE_URL, "geo") is None
+    assert not any(name.endswith(".json") for name in os.listdir(tmp_path))
+
+
+def test_cache_lru_eviction(tmp_path):
+    """The least recently used entry is evicted once max_entries is exceeded"""
+    cache = MetadataCache(str(tmp_path), max_entries=2)
+    urls = [OVERTURE_URL.replace("buildings", theme) for theme in ("a", "b", "c")]
+
+    cache.put(urls[0], "geo", "{}")
+    cache.put(urls[1], "geo", "{}")
+    # Make the first entry the most recently used
+    old = time.time() - 100
+    os.utime(cache._entry_path(urls[1], "geo"), (old, old))
+    cache.get(urls[0], "geo")
+    cache.put(urls[2], "geo", "{}")
+
+    assert cache.get(urls[0], "geo") == "{}"
+    assert cache.get(urls[1], "geo") is None
+    assert cache.get(urls[2], "geo") == "{}"
+
+
+def test_concurrent_puts_keep_every_kind(cache):
+    """Workers storing different kinds of one dataset at the same time don't drop each other's"""
+    kinds = [f"row_groups:{number}" for number in range(40)]
+    barrier = threading.Barrier(len(kinds))
+
+    def put(kind):
+        barrier.wait()
+        cache.put(OVERTURE_URL, kind, [[number] for number in range(200)])
+
+    threads = [threading.Thread(target=put, args=(kind,)) for kind in kinds]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(cache.get(OVERTURE_URL, kind) == [[number] for number in range(200)] for kind in kinds)
+    assert not any(name.endswith(".tmp") for name in os.listdir(cache.cache_dir))
+
+
+def test_get_schema_uses_cache(cache):
+    """The second DESCRIBE of a dataset is served from the cache"""
+    conn = MagicMock()
+    conn.execute.return_value.fetchall.return_value = SCHEMA
+
+    assert get_schema(conn, OVERTURE_URL, cache) == SCHEMA
+    assert get_schema(conn, OVERTURE_URL, cache) == SCHEMA
+    assert conn.execute.call_count == 1
+
+
+def test_get_geo_metadata_caches_missing_metadata(cache):
+    """Datasets without geo metadata are remembered as such"""
+    conn = MagicMock()
+    conn.execute.return_value.fetchall.return_value = [(b"pandas", b"{}")]
+
+    assert get_geo_metadata(conn, OVERTURE_URL, cache) is None
+    assert get_geo_metadata(conn, OVERTURE_URL, cache) is None
+    assert conn.execute.call_count == 1
+
+
+def test_row_group_bounds_from_footer_statistics(tmp_path, cache):
+    """Row group counts and bbox come from the footer and are cached"""
+    path = str(tmp_path / "bbox.parquet")
+    conn = duckdb.connect()
+    conn.execute(f"""
+        COPY (
+            SELECT range AS id,
+                   {{'xmin': range::DOUBLE, 'ymin': 0.0, 'xmax': range + 1.0, 'ymax': 1.0}} AS bbox
+            FROM range(8192)
+        ) TO '{path}' (FORMAT 'parquet', ROW_GROUP_SIZE 4096)
+    """)
+
+    row_groups = get_row_group_bounds(conn, path, default_bbox_covering("bbox"), cache)
+    assert sorted(row_group[:5] for row_group in row_groups) == [
+        [4096, 0.0, 0.0, 4096.0, 1.0],
+        [4096, 4096.0, 0.0, 8192.0, 1.0],
+    ]
+    # Compressed bytes and the index of the file holding the row group
+    assert all(row_group[5] > 0 and row_group[6] == 0 for row_group in row_groups)
+
+    uncached = MagicMock()
+    assert get_row_group_bounds(uncached, path, default_bbox_covering("bbox"), cache) == row_groups
+    assert not uncached.execute.called
+
+
+def test_column_sizes_add_up_nested_fields(tmp_path, cache):
+    """Struct fields count towards their top level column, and the sizes are cached"""
+    path = str(tmp_path / "columns.parquet")
+    conn = duckdb.connect()
+    conn.execute(f"""
+        COPY (
+            SELECT range AS id,
+                   {{'xmin': range::DOUBLE, 'ymin': 0.0, 'xmax': range + 1.0, 'ymax': 1.0}} AS bbox
+            FROM range(1000)
+        ) TO '{path}' (FORMAT 'parquet')
+    """)
+
+    sizes = get_column_sizes(conn, path, cache)
+    assert set(sizes) == {"id", "bbox"}
+    assert all(size > 0 for size in sizes.values())
+
+    uncached = MagicMock()
+    assert get_column_sizes(uncached, path, cache) == sizes
+    assert not uncached.execute.called
+
+
+@patch("duckdb.connect")
+def test_validation_worker_skips_footers_on_repeat(mock_connect, mock_iface, sample_bbox, cache):
+    """A repeat validation of the same dataset runs no DESCRIBE or kv metadata query"""
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = mock_conn
+    mock_conn.execute.return_value.fetchall.return_value = SCHEMA
+    mock_connect.return_value = mock_conn
+
+    url = "https://example.com/release/1/test.parquet"
+    for _ in range(2):
+        worker = ValidationWorker(url, mock_iface, sample_bbox, metadata_cache=cache)
+        with patch.object(worker, "PRESET_DATASETS", {}):
+            worker.run()
+
+    queries = [c[0][0] for c in mock_conn.execute.call_args_list]
+    assert sum("DESCRIBE" in q for q in queries) == 1
+
+
+def test_cancelled_schema_read_is_interrupted():
+    """kill() interrupts the remote schema read, and the interrupted worker reports nothing"""
+    conn = MagicMock()
+    session = MagicMock()
+    session.cursor.return_value = conn
+    worker = SchemaWorker(OVERTURE_URL, session=session)
+    emitted = []
+
+    def cancel_while_reading(*args):
+        worker.kill()
+        raise duckdb.InterruptException("INTERRUPT Error: Interrupted!")
+
+    conn.execute.side_effect = cancel_while_reading
+    worker.finished.connect(emitted.append)
+    worker.error.connect(emitted.append)
+    worker.run()
+
+    conn.interrupt.assert_called_once()
+    conn.close.assert_called_once()
+    assert emitted == []
@@ -50,6 +50,7 @@ class TestNonGeoParquetHandling:
         """Test that Worker can process non-GeoParquet files with geometry."""
         # Mock connection
         mock_conn = MagicMock()
+        mock_conn.cursor.return_value = mock_conn
         mock_connect.return_value = mock_conn
         
         # Mock execute method to handle spatial extension loading
@@ -126,6 +127,7 @@ class TestNonGeoParquetHandling:
     def test_non_geoparquet_spatial_query(self, mock_connect, mock_transform_bbox, non_geoparquet_file, tmp_path):
         """Test spatial filtering works without bbox column."""
         mock_conn = MagicMock()
+        mock_conn.cursor.return_value = mock_conn
         mock_connect.return_value = mock_conn
         
         # Track all queries
@@ -188,10 +190,23 @@ class TestNonGeoParquetHandling:
         # Run worker
         worker.run()
         
-        # For BLOB geometry columns, spatial filtering happens after conversion
-        # So we should see the conversion happening in a separate step
+        # When streaming, BLOB geometries are converted and filtered in the same
+        # COPY that reads the source, with no intermediate table
+        streaming_query = any(
+            "COPY" in query and "read_parquet" in query
+            and "ST_GeomFromWKB" in query and "ST_Intersects" in query
+            for query in queries_executed
+        )
+        assert streaming_query, f"Expected single-pass conversion for BLOB column. Queries: {queries_executed}"
+        assert not any("CREATE TEMP TABLE" in query for query in queries_executed)
+
+        # The materialized export still converts in a separate step
+        queries_executed.clear()
+        worker.streaming = False
+        worker.run()
+
         conversion_query = any(
-            "ST_GeomFromWKB" in query and "CREATE TABLE" in query
+            "ST_GeomFromWKB" in query and "CREATE TEMP TABLE" in query
             for query in queries_executed
         )
         assert conversion_query, f"Expected geometry conversion for BLOB column. Queries: {queries_executed}"
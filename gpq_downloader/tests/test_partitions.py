@@ -0,0 +1,75 @@
+import duckdb
+import pytest
+
+from gpq_downloader.metadata_cache import get_row_group_bounds
+from gpq_downloader.partitions import (
+    build_partition_index,
+    dataset_source,
+    partition_layout,
+    partition_source,
+    prune_partitions,
+)
+from gpq_downloader.query import bbox_overlap_predicate, default_bbox_covering
+
+
+def test_dataset_source_turns_on_hive_partitioning():
+    overture = "s3://overturemaps-us-west-2/release/2025-01-22.0/theme=buildings/type=building/*"
+    assert dataset_source(overture) == f"read_parquet('{overture}', hive_partitioning = true)"
+    assert dataset_source("https://example.com/data.parquet") == "read_parquet('https://example.com/data.parquet')"
+
+
+def test_partition_layout():
+    assert partition_layout("s3://bucket/data/by_country/*/*.parquet") == ("s3://bucket/data/by_country", "*.parquet")
+    assert partition_layout("s3://bucket/data/*.parquet") is None
+    assert partition_layout("s3://bucket/theme=buildings/type=building/*") is None
+    assert partition_layout("s3://bucket/*/*/*.parquet") is None
+
+
+def test_partition_index_and_pruning():
+    prefix = "s3://bucket/by_country"
+    row_groups = [
+        [10, 0.0, 0.0, 1.0, 1.0, 100, 0, f"{prefix}/country=A/a.parquet"],
+        [10, 1.0, 1.0, 2.0, 2.0, 100, 0, f"{prefix}/country=A/a.parquet"],
+        [10, 5.0, 5.0, 6.0, 6.0, 100, 1, f"{prefix}/country=B/b1.parquet"],
+        [10, 6.0, 5.0, 7.0, 6.0, 100, 2, f"{prefix}/country=B/b2.parquet"],
+        [10, None, None, None, None, 100, 3, f"{prefix}/country=C/c.parquet"],
+    ]
+    index = build_partition_index(row_groups, prefix)
+    assert index == {
+        "country=A": [1, 0.0, 0.0, 2.0, 2.0],
+        "country=B": [2, 5.0, 5.0, 7.0, 6.0],
+        "country=C": [1, None, None, None, None],
+    }
+    # Partitions without statistics are never pruned
+    assert prune_partitions(index, 0.5, 0.5, 1.5, 1.5) == ["country=A", "country=C"]
+    # Rows without file names can't be grouped
+    assert build_partition_index([row[:7] for row in row_groups], prefix) is None
+
+
+def test_pruned_source_reads_same_rows(tmp_path):
+    """Reading only the overlapping partitions gives the same rows as the full glob"""
+    conn = duckdb.connect()
+    for country, offset in (("AAA", 0), ("BBB", 10), ("CCC", 20)):
+        directory = tmp_path / "by_country" / f"country_iso={country}"
+        directory.mkdir(parents=True)
+        conn.execute(f"""
+            COPY (
+                SELECT range AS id,
+                       {{'xmin': {offset} + range / 100, 'ymin': 0.0, 'xmax': {offset} + range / 100 + 0.5, 'ymax': 1.0}} AS bbox
+                FROM range(500)
+            ) TO '{directory / "part.parquet"}' (FORMAT 'parquet')
+        """)
+    url = str(tmp_path / "by_country" / "*" / "*.parquet")
+    covering = default_bbox_covering("bbox")
+
+    prefix, pattern = partition_layout(url)
+    index = build_partition_index(get_row_group_bounds(conn, url, covering), prefix)
+    kept = prune_partitions(index, 4.0, 0.0, 12.0, 1.0)
+    assert kept == ["country_iso=AAA", "country_iso=BBB"]
+
+    where = bbox_overlap_predicate(covering, 4.0, 0.0, 12.0, 1.0)
+    query = "SELECT id, bbox, country_iso FROM {} WHERE " + where + " ORDER BY ALL"
+    pruned = conn.execute(query.format(partition_source(prefix, pattern, kept))).fetchall()
+    full = conn.execute(query.format(dataset_source(url))).fetchall()
+    assert pruned == full
+    assert len(pruned) > 0
@@ -310,4 +310,78 @@ def test_setup_worker(qgs_app, mock_iface):
     assert worker.dataset_url == dataset_url
     assert worker.extent == extent
     assert worker.output_file == output_file
-    assert worker.validation_results == validation_results 
\ No newline at end of file
+    assert worker.validation_results == validation_results 
+@patch('gpq_downloader.plugin.max_parallel_jobs', return_value=3)
+@patch('gpq_downloader.plugin.DownloadScheduler')
+def test_process_download_queue_uses_scheduler(mock_scheduler, mock_max_jobs, qgs_app, mock_iface):
+    """A multi-dataset queue is handed to the scheduler in order, bounded by the profile"""
+    plugin = QgisPluginGeoParquet(mock_iface)
+    queue = [
+        ("s3://overturemaps-us-west-2/release/x/theme=base/type=land/*", "land.parquet"),
+        ("s3://overturemaps-us-west-2/release/x/theme=base/type=water/*", "water.parquet", ["water.gpkg"]),
+    ]
+
+    plugin.process_download_queue(queue, QgsRectangle(0, 0, 1, 1))
+
+    assert mock_scheduler.call_args[1]["max_jobs"] == 3
+    jobs = mock_scheduler.return_value.start.call_args[0][0]
+    assert [job["output_file"] for job in jobs] == ["land.parquet", "water.parquet"]
+    assert jobs[1]["layer_name"] == "Overture Base - Water"
+    assert [job["extra_outputs"] for job in jobs] == [[], ["water.gpkg"]]
+    plugin.progress_dialog.close()
+
+@patch('gpq_downloader.plugin.load_resource_profile',
+       return_value={"threads": 8, "memory_limit_mb": 16384, "parallel_jobs": 6})
+def test_queue_jobs_and_tiles_share_the_parallel_budget(mock_profile, qgs_app, mock_iface, tmp_path):
+    """Jobs running side by side split the profile's parallelism between their tiles"""
+    plugin = QgisPluginGeoParquet(mock_iface)
+    plugin.get_duckdb_session = MagicMock()
+    plugin.get_metadata_cache = MagicMock(return_value=None)
+    plugin.get_tile_cache = MagicMock(return_value=None)
+    plugin.get_manifest_store = MagicMock(return_value=None)
+    plugin.journal_dir = MagicMock(return_value=str(tmp_path))
+    plugin.scheduler = MagicMock(max_jobs=6, jobs=[{}] * 3)
+    job = {
+        'url': "https://example.com/test.parquet", 'extent': QgsRectangle(0, 0, 1, 1),
+        'output_file': str(tmp_path / "out.parquet"), 'validation_results': {}, 'layer_name': "test",
+        'aoi_geometry': None,
+    }
+
+    worker = plugin.create_queue_worker(job)
+
+    assert worker.tile_jobs == 2
+    assert min(plugin.scheduler.max_jobs, len(plugin.scheduler.jobs)) * worker.tile_jobs <= 6
+
+def test_plugin_cancel_download_cancels_queue(qgs_app, mock_iface):
+    """Cancelling stops every job in the running queue"""
+    plugin = QgisPluginGeoParquet(mock_iface)
+    plugin.scheduler = MagicMock()
+
+    plugin.cancel_download()
+    plugin.scheduler.cancel.assert_called_once()
+
+def test_resume_job_from_journal(qgs_app, mock_iface, tmp_path):
+    """A journal becomes a scheduler job with its EPSG:4326 extent and validation results"""
+    from gpq_downloader.journal import JobJournal
+
+    plugin = QgisPluginGeoParquet(mock_iface)
+    plugin.download_dir = tmp_path
+    journal = JobJournal.for_output(plugin.journal_dir(), str(tmp_path / "out.parquet"))
+    journal.start({
+        "url": "https://example.com/data.parquet",
+        "output_file": str(tmp_path / "out.parquet"),
+        "extra_outputs": [str(tmp_path / "out.gpkg")],
+        "bbox": [1.0, 2.0, 3.0, 4.0],
+        "aoi_wkt": None,
+        "format": "parquet",
+        "layer_name": None,
+        "validation_results": {"has_bbox": True, "bbox_column": "bbox", "geometry_column": "geom"},
+    })
+
+    job = plugin.create_resume_job(journal)
+
+    assert job["extent"] == QgsRectangle(1, 2, 3, 4)
+    assert job["extent_crs"] == "EPSG:4326"
+    assert job["extra_outputs"] == [str(tmp_path / "out.gpkg")]
+    assert job["validation_results"]["geometry_column"] == "geom"
+    assert job["journal"] is journal
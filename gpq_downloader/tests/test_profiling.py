@@ -0,0 +1,125 @@
+import json
+import re
+
+import duckdb
+
+from gpq_downloader.duckdb_session import DuckDBSession
+from gpq_downloader.engine import DownloadEngine, Extent
+from gpq_downloader.profiling import format_profile, operator_times, profile_path, profiled, summarize_profile
+
+
+PROFILE = {
+    "latency": 2.0,
+    "children": [{
+        "operator_name": "COPY_TO_FILE", "operator_timing": 1.0, "extra_info": {},
+        "children": [{
+            "operator_name": "ORDER_BY", "operator_timing": 0.6, "extra_info": {},
+            "children": [{
+                "operator_name": "TABLE_SCAN", "operator_timing": 0.4,
+                "extra_info": {"Function": "READ_PARQUET"}, "children": [],
+            }],
+        }],
+    }],
+}
+
+
+class MockResult:
+    def __init__(self, data):
+        self.data = data
+
+    def fetchall(self):
+        return self.data
+
+    def fetchone(self):
+        return self.data[0] if self.data else None
+
+
+class ProfilingConnection:
+    """Connection writing PROFILE for queries run while profiling is on"""
+    def __init__(self):
+        self.executed_queries = []
+        self.profiling_output = None
+
+    def execute(self, query, parameters=None):
+        self.executed_queries.append(query)
+        match = re.search(r"profiling_output = '(.*)'", query)
+        if match:
+            self.profiling_output = match.group(1)
+        elif "disable_profiling" in query:
+            self.profiling_output = None
+        elif "DESCRIBE" in query:
+            return MockResult([
+                ("id", "INTEGER", "YES", None, None, None),
+                ("geometry", "GEOMETRY", "YES", None, None, None),
+            ])
+        elif query.lstrip().startswith("COPY"):
+            if self.profiling_output:
+                with open(self.profiling_output, "w") as f:
+                    json.dump(PROFILE, f)
+            return MockResult([(3,)])
+        return MockResult([])
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+
+def test_operator_times_and_format():
+    assert operator_times(PROFILE) == [
+        ("COPY_TO_FILE", 1.0), ("ORDER_BY", 0.6), ("TABLE_SCAN (READ_PARQUET)", 0.4),
+    ]
+    text = format_profile("copy", {"seconds": 2.0, "operators": operator_times(PROFILE)[:2]})
+    assert text == "Profile of copy: 2.00s; COPY_TO_FILE 1.00s (50%), ORDER_BY 0.60s (30%)"
+
+
+def test_profiled_writes_duckdb_profile(tmp_path):
+    path = str(tmp_path / "query.json")
+    conn = duckdb.connect()
+    with profiled(conn, path):
+        conn.execute("SELECT range % 7 AS k, count(*) FROM range(100000) GROUP BY k ORDER BY k").fetchall()
+    summary = summarize_profile(path)
+    assert summary["seconds"] >= 0
+    assert summary["operators"]
+    # Profiling stops with the block
+    assert conn.execute("SELECT current_setting('enable_profiling')").fetchone()[0] in (None, "")
+    conn.close()
+
+
+def test_summarize_unreadable_profile(tmp_path):
+    assert summarize_profile(str(tmp_path / "missing.json")) is None
+
+
+def test_engine_saves_copy_profile(tmp_path):
+    conn = ProfilingConnection()
+    session = DuckDBSession()
+    session._conn = conn
+    output_file = str(tmp_path / "out.parquet")
+    engine = DownloadEngine(
+        "a.parquet", Extent(0, 0, 1, 1), output_file,
+        {"has_bbox": False, "geometry_column": "geometry"}, session=session,
+    )
+    engine.size_warning_accepted = True
+    engine.http_logging = False
+    engine.profiling = True
+    engine.run()
+
+    assert engine.error_message is None
+    assert engine.profiles == {"copy": profile_path(output_file, "copy")}
+    assert engine.profiles["copy"].endswith("out.profile.copy.json")
+    assert any("disable_profiling" in query for query in conn.executed_queries)
+
+
+def test_engine_profiling_off_by_default(tmp_path):
+    conn = ProfilingConnection()
+    session = DuckDBSession()
+    session._conn = conn
+    engine = DownloadEngine(
+        "a.parquet", Extent(0, 0, 1, 1), str(tmp_path / "out.parquet"),
+        {"has_bbox": False, "geometry_column": "geometry"}, session=session,
+    )
+    engine.size_warning_accepted = True
+    engine.run()
+    assert engine.profiles == {}
+    assert not any("enable_profiling" in query for query in conn.executed_queries)
@@ -0,0 +1,83 @@
+import threading
+import time
+import duckdb
+import pytest
+
+from gpq_downloader.progress import ProgressMonitor, format_duration, format_progress
+
+
+def test_format_progress():
+    assert format_progress(45, 120000, 12.34, 130) == "45% · 120,000 rows/s · 12.3 MB/s · ETA 2m 10s"
+    assert format_progress(3) == "3%"
+    assert format_duration(3725) == "1h 2m"
+
+
+class FakeCursor:
+    def __init__(self, progress=-1.0):
+        self.progress = progress
+        self.executed = []
+
+    def execute(self, query):
+        self.executed.append(query)
+
+    def query_progress(self):
+        return self.progress
+
+
+def test_monitor_combines_units_and_running_queries():
+    """Finished units count in full, running ones with their polled progress"""
+    reports = []
+    monitor = ProgressMonitor(lambda percent, message: reports.append((percent, message)),
+                              units=4, done_units=1, total_rows=1000, total_bytes=1024 * 1024,
+                              interval=0.01)
+    cursor = FakeCursor(progress=50.0)
+    monitor.track(cursor)
+    assert any("enable_progress_bar" in q for q in cursor.executed)
+
+    with monitor:
+        deadline = time.time() + 5
+        while monitor.fraction() < 1.5 / 4 and time.time() < deadline:
+            time.sleep(0.01)
+        assert monitor.fraction() == pytest.approx(1.5 / 4)
+        monitor.unit_done(cursor)
+
+    assert monitor.fraction() == pytest.approx(2 / 4)
+    percent, message = reports[-1]
+    assert percent == 50
+    assert "rows/s" in message and "MB/s" in message and "ETA" in message
+
+
+def test_monitor_never_reports_100():
+    reports = []
+    monitor = ProgressMonitor(lambda percent, message: reports.append(percent), units=1)
+    with monitor:
+        monitor.unit_done()
+    assert reports == [99]
+
+
+def test_monitor_polls_duckdb_query(tmp_path):
+    """A real COPY on a tracked cursor reports progress while it runs"""
+    source = tmp_path / "source.parquet"
+    conn = duckdb.connect()
+    conn.execute(
+        f"COPY (SELECT range AS id, random() AS value FROM range(20000000)) TO '{source}' (FORMAT 'parquet')"
+    )
+    reports = []
+    lock = threading.Lock()
+
+    def callback(percent, message):
+        with lock:
+            reports.append(percent)
+
+    cursor = conn.cursor()
+    with ProgressMonitor(callback, interval=0.01) as monitor:
+        monitor.track(cursor)
+        cursor.execute(
+            f"COPY (SELECT id, value * 2 AS value FROM read_parquet('{source}')) "
+            f"TO '{tmp_path / 'out.parquet'}' (FORMAT 'parquet')"
+        )
+        monitor.unit_done(cursor)
+
+    assert reports[-1] == 99
+    assert any(0 < percent < 99 for percent in reports)
+    assert reports == sorted(reports)
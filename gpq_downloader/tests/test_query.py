@@ -0,0 +1,195 @@
+import json
+import duckdb
+import pytest
+
+from gpq_downloader.query import (
+    SIMPLIFY_MIN_VERTICES,
+    aoi_predicate,
+    bbox_overlap_predicate,
+    check_attribute_filter,
+    column_path_expr,
+    default_bbox_covering,
+    filter_columns,
+    filter_condition,
+    parse_bbox_covering,
+    prepare_aoi,
+    quote_identifier,
+)
+
+
+def test_quote_identifier():
+    assert quote_identifier("bbox") == '"bbox"'
+    assert quote_identifier('we"ird') == '"we""ird"'
+
+
+def test_column_path_expr():
+    assert column_path_expr(["bbox", "xmin"]) == '"bbox"."xmin"'
+    assert column_path_expr("minx") == '"minx"'
+
+
+def test_parse_bbox_covering_from_primary_column():
+    """The covering of the primary geometry column is used"""
+    geo = {
+        "version": "1.1.0",
+        "primary_column": "geom",
+        "columns": {
+            "geom": {
+                "encoding": "WKB",
+                "covering": {
+                    "bbox": {
+                        "xmin": ["geom_bbox", "minx"],
+                        "ymin": ["geom_bbox", "miny"],
+                        "xmax": ["geom_bbox", "maxx"],
+                        "ymax": ["geom_bbox", "maxy"],
+                    }
+                },
+            }
+        },
+    }
+    covering = parse_bbox_covering(json.dumps(geo))
+    assert covering["xmin"] == ["geom_bbox", "minx"]
+    assert covering["ymax"] == ["geom_bbox", "maxy"]
+
+
+def test_parse_bbox_covering_missing():
+    """Metadata without a complete covering returns None"""
+    assert parse_bbox_covering(None) is None
+    assert parse_bbox_covering('{"columns": {"geometry": {"encoding": "WKB"}}}') is None
+    partial = {"columns": {"geometry": {"covering": {"bbox": {"xmin": ["bbox", "xmin"]}}}}}
+    assert parse_bbox_covering(partial) is None
+
+
+def test_bbox_overlap_predicate_uses_all_four_fields():
+    """Features overlapping the extent from any side are selected"""
+    predicate = bbox_overlap_predicate(default_bbox_covering("bbox"), 1, 2, 3, 4)
+    assert predicate == (
+        '"bbox"."xmin" <= 3 AND "bbox"."xmax" >= 1 '
+        'AND "bbox"."ymin" <= 4 AND "bbox"."ymax" >= 2'
+    )
+
+
+def test_bbox_overlap_predicate_keeps_crossing_features():
+    """A feature starting left of the extent but crossing into it is kept"""
+    duckdb = pytest.importorskip("duckdb")
+    conn = duckdb.connect()
+    conn.execute("""
+        CREATE TABLE t AS SELECT * FROM (VALUES
+            (1, {'xmin': 0.0, 'ymin': 2.5, 'xmax': 1.5, 'ymax': 3.0}),
+            (2, {'xmin': 2.0, 'ymin': 3.0, 'xmax': 2.5, 'ymax': 3.5}),
+            (3, {'xmin': 5.0, 'ymin': 5.0, 'xmax': 6.0, 'ymax': 6.0})
+        ) v(id, bbox)
+    """)
+    predicate = bbox_overlap_predicate(default_bbox_covering("bbox"), 1, 2, 3, 4)
+    ids = [row[0] for row in conn.execute(f"SELECT id FROM t WHERE {predicate} ORDER BY id").fetchall()]
+    assert ids == [1, 2]
+
+
+FILTER_SCHEMA = [
+    ("id", "BIGINT"),
+    ("class", "VARCHAR"),
+    ("height", "DOUBLE"),
+    ("geometry", "GEOMETRY"),
+]
+
+
+def test_filter_condition_quotes_values():
+    assert filter_condition("class", "IN", "motorway, trunk") == """"class" IN ('motorway', 'trunk')"""
+    assert filter_condition("height", ">", "50") == '"height" > 50'
+    assert filter_condition("name", "=", "O'Brien") == """"name" = 'O''Brien'"""
+    assert filter_condition("height", "is null") == '"height" IS NULL'
+    with pytest.raises(ValueError):
+        filter_condition("height", "BETWEEN", "1")
+
+
+def test_check_attribute_filter_binds_against_schema():
+    conn = duckdb.connect()
+    check_attribute_filter(conn, "class IN ('motorway', 'trunk') AND height > 50", FILTER_SCHEMA)
+    with pytest.raises(ValueError, match="nope"):
+        check_attribute_filter(conn, "nope > 1", FILTER_SCHEMA)
+    with pytest.raises(ValueError, match="true or false"):
+        check_attribute_filter(conn, "height", FILTER_SCHEMA)
+    # Without a schema only the syntax is checked
+    check_attribute_filter(conn, "nope > 1")
+    with pytest.raises(ValueError):
+        check_attribute_filter(conn, "height >")
+
+
+def test_check_attribute_filter_rejects_statements():
+    conn = duckdb.connect()
+    with pytest.raises(ValueError, match="single expression"):
+        check_attribute_filter(conn, "true; DROP TABLE t", FILTER_SCHEMA)
+    with pytest.raises(ValueError, match="single expression"):
+        check_attribute_filter(conn, "id IN (SELECT 1)", FILTER_SCHEMA)
+    with pytest.raises(ValueError, match="single expression"):
+        check_attribute_filter(conn, "EXISTS (FROM duckdb_settings())", FILTER_SCHEMA)
+    with pytest.raises(ValueError, match="single expression"):
+        check_attribute_filter(conn, "EXISTS (FROM duckdb_settings())")
+    # Keywords inside string literals are fine
+    check_attribute_filter(conn, "class = 'select; this'", FILTER_SCHEMA)
+
+
+def test_check_attribute_filter_rejects_unbalanced_parentheses():
+    """A filter closing the parenthesis it is wrapped in could OR away the spatial filter"""
+    conn = duckdb.connect()
+    with pytest.raises(ValueError, match="parentheses"):
+        check_attribute_filter(conn, "height > 1) OR (true", FILTER_SCHEMA)
+    with pytest.raises(ValueError, match="parentheses"):
+        check_attribute_filter(conn, "height > 1) OR (true")
+    # Parentheses in string literals and quoted names don't count
+    check_attribute_filter(conn, """(class = 'a)' OR "class" = '(') AND height > 1""", FILTER_SCHEMA)
+
+
+def test_filter_columns():
+    assert filter_columns("""height > 50 AND "class" = 'id'""", FILTER_SCHEMA) == ["class", "height"]
+
+
+def test_aoi_predicate_tests_extent_first():
+    covering = default_bbox_covering("bbox")
+    predicate = aoi_predicate('"geometry"', covering, (1.0, 2.0, 3.0, 4.0))
+    assert predicate.startswith('"bbox"."xmin" <= 3.0')
+    assert predicate.endswith('AND ST_Intersects("geometry", ST_GeomFromWKB($aoi))')
+
+    predicate = aoi_predicate('"geometry"')
+    assert predicate.startswith('CASE WHEN ST_Intersects_Extent("geometry", ST_GeomFromWKB($aoi))')
+    assert "THEN ST_Intersects(" in predicate
+
+
+def spatial_connection():
+    conn = duckdb.connect()
+    try:
+        conn.execute("LOAD spatial")
+    except Exception:
+        try:
+            conn.execute("INSTALL spatial")
+            conn.execute("LOAD spatial")
+        except Exception as e:
+            pytest.skip(f"spatial extension not available: {e}")
+    return conn
+
+
+def circle_wkt(vertices, radius=1.0):
+    import math
+    points = [
+        (radius * math.cos(2 * math.pi * i / vertices), radius * math.sin(2 * math.pi * i / vertices))
+        for i in range(vertices)
+    ]
+    points.append(points[0])
+    return "POLYGON((" + ", ".join(f"{x} {y}" for x, y in points) + "))"
+
+
+def test_prepare_aoi_simplifies_to_a_superset():
+    conn = spatial_connection()
+    wkt = circle_wkt(SIMPLIFY_MIN_VERTICES * 5)
+    aoi = prepare_aoi(conn, wkt, tolerance=0.01)
+    assert aoi["vertices"] == SIMPLIFY_MIN_VERTICES * 5 + 1
+    assert aoi["simplified_vertices"] < aoi["vertices"]
+    covers = conn.execute(
+        "SELECT ST_Covers(ST_GeomFromWKB($aoi), ST_GeomFromText($wkt))", {"aoi": aoi["wkb"], "wkt": wkt}
+    ).fetchone()[0]
+    assert covers
+    assert aoi["extent"][0] <= -1.0 and aoi["extent"][2] >= 1.0
+
+    small = prepare_aoi(conn, circle_wkt(10), tolerance=0.01)
+    assert small["simplified_vertices"] == small["vertices"]
+    exact = prepare_aoi(conn, wkt, tolerance=0)
+    assert exact["simplified_vertices"] == exact["vertices"]
@@ -0,0 +1,192 @@
+import os
+import duckdb
+import pytest
+from unittest.mock import MagicMock, patch
+
+from gpq_downloader.duckdb_session import DuckDBSession
+from gpq_downloader.resource_profile import (
+    DEFAULT_PROFILE,
+    MIN_JOB_MEMORY_MB,
+    default_temp_directory,
+    default_threads,
+    duckdb_settings,
+    load_resource_profile,
+    max_parallel_jobs,
+    resolve_profile,
+    save_resource_profile,
+    tile_jobs_per_job,
+)
+
+
+def test_default_profile_resolves_machine_defaults():
+    """Unset values become machine defaults that leave room for QGIS"""
+    profile = resolve_profile(DEFAULT_PROFILE)
+    assert profile["threads"] == default_threads()
+    assert profile["threads"] >= 1
+    assert profile["temp_directory"] == default_temp_directory()
+    assert profile["preserve_insertion_order"] is False
+
+
+def test_duckdb_settings_from_profile(tmp_path):
+    """A profile maps onto DuckDB settings and creates the scratch directory"""
+    scratch = tmp_path / "scratch"
+    settings = duckdb_settings({
+        "threads": 2,
+        "memory_limit_mb": 512,
+        "temp_directory": str(scratch),
+        "preserve_insertion_order": True,
+    })
+
+    assert settings == {
+        "threads": 2,
+        "memory_limit": "512MB",
+        "temp_directory": str(scratch),
+        "preserve_insertion_order": True,
+    }
+    assert scratch.is_dir()
+
+
+def test_profile_roundtrip_through_settings():
+    """The profile is stored under gpq_downloader/ and read back with its types"""
+    store = {}
+    settings = MagicMock()
+    settings.setValue.side_effect = lambda key, value, section=None: store.__setitem__(key, value)
+    settings.value.side_effect = lambda key, default, type=None, section=None: store.get(key, default)
+
+    profile = {
+        "threads": 3,
+        "memory_limit_mb": 2048,
+        "temp_directory": "/scratch",
+        "preserve_insertion_order": True,
+        "parallel_jobs": 3,
+    }
+    save_resource_profile(profile, settings)
+
+    assert store["gpq_downloader/memory_limit_mb"] == 2048
+    assert load_resource_profile(settings) == profile
+
+
+def test_parallel_jobs_bounded_by_threads_and_memory():
+    """Parallel downloads never exceed the thread count or the memory per job"""
+    assert max_parallel_jobs({"threads": 8, "memory_limit_mb": 16384, "parallel_jobs": 6}) == 6
+    assert max_parallel_jobs({"threads": 2, "memory_limit_mb": 16384, "parallel_jobs": 6}) == 2
+    assert max_parallel_jobs({"threads": 8, "memory_limit_mb": 1024, "parallel_jobs": 6}) == 2
+    assert max_parallel_jobs({"threads": 8, "memory_limit_mb": 256, "parallel_jobs": 6}) == 1
+    assert max_parallel_jobs({"threads": 1, "memory_limit_mb": 0, "parallel_jobs": 0}) == 1
+
+
+def test_jobs_and_tiles_stay_within_the_profile():
+    """Concurrent jobs times the tiles each runs never exceed the parallel budget"""
+    for profile in (
+        {"threads": 8, "memory_limit_mb": 16384, "parallel_jobs": 6},
+        {"threads": 3, "memory_limit_mb": 16384, "parallel_jobs": 0},
+        {"threads": 8, "memory_limit_mb": 1024, "parallel_jobs": 6},
+        {"threads": 1, "memory_limit_mb": 0, "parallel_jobs": 0},
+    ):
+        budget = max_parallel_jobs(profile)
+        for running_jobs in range(1, budget + 1):
+            assert running_jobs * tile_jobs_per_job(profile, running_jobs) <= budget
+    # A single job gets the whole budget for its tiles
+    assert tile_jobs_per_job({"threads": 8, "memory_limit_mb": 16384, "parallel_jobs": 6}) == 6
+
+
+@patch("duckdb.connect")
+def test_session_applies_profile_to_every_connection(mock_connect, tmp_path):
+    """Resource settings are applied to the shared database and to DuckDB file outputs"""
+    shared = MagicMock()
+    output = MagicMock()
+    mock_connect.side_effect = [shared, output]
+
+    settings = duckdb_settings({"threads": 2, "memory_limit_mb": 256, "temp_directory": str(tmp_path)})
+    session = DuckDBSession(settings=settings)
+    session.cursor()
+    session.connect_file(str(tmp_path / "out.duckdb"))
+
+    for conn in (shared, output):
+        queries = [c[0][0] for c in conn.execute.call_args_list]
+        assert "SET GLOBAL threads = 2;" in queries
+        assert "SET GLOBAL memory_limit = '256MB';" in queries
+        assert f"SET GLOBAL temp_directory = '{tmp_path}';" in queries
+        assert "SET GLOBAL preserve_insertion_order = false;" in queries
+
+
+@patch("duckdb.connect")
+def test_file_database_gets_its_own_small_memory_limit(mock_connect, tmp_path):
+    """A DuckDB file output runs next to the shared database without doubling its memory"""
+    shared = MagicMock()
+    output = MagicMock()
+    mock_connect.side_effect = [shared, output]
+
+    settings = duckdb_settings({"threads": 4, "memory_limit_mb": 8192, "temp_directory": str(tmp_path)})
+    session = DuckDBSession(settings=settings)
+    session.cursor()
+    session.connect_file(str(tmp_path / "out.duckdb"))
+
+    assert "SET GLOBAL memory_limit = '8192MB';" in [c[0][0] for c in shared.execute.call_args_list]
+    queries = [c[0][0] for c in output.execute.call_args_list]
+    assert f"SET GLOBAL memory_limit = '{MIN_JOB_MEMORY_MB}MB';" in queries
+    # Without a profile the file database still doesn't take DuckDB's default of most of RAM
+    assert DuckDBSession().file_database_settings() == {"memory_limit": f"{MIN_JOB_MEMORY_MB}MB"}
+
+
+@patch("duckdb.connect")
+def test_session_update_settings_applies_to_warm_database(mock_connect):
+    """Changing the profile in the dialog takes effect without restarting the session"""
+    mock_conn = MagicMock()
+    mock_connect.return_value = mock_conn
+
+    session = DuckDBSession()
+    session.update_settings({"threads": 4})
+    assert not mock_conn.execute.called
+
+    session.warm_up()
+    session.update_settings({"memory_limit": "1024MB"})
+
+    queries = [c[0][0] for c in mock_conn.execute.call_args_list]
+    assert "SET GLOBAL threads = 4;" in queries
+    assert queries[-1] == "SET GLOBAL memory_limit = '1024MB';"
+
+
+def test_export_larger_than_memory_limit_spills(tmp_path):
+    """
+    A sorted export bigger than memory_limit succeeds by spilling to the scratch directory.
+
+    The same export with spilling disabled runs out of memory, showing the data
+    really doesn't fit.
+    """
+    scratch = tmp_path / "scratch"
+    settings = duckdb_settings({
+        "threads": 1,
+        "memory_limit_mb": 100,
+        "temp_directory": str(scratch),
+    })
+    session = DuckDBSession(settings=settings)
+
+    # ~130MB of sort payload, ordered like the Hilbert sort in the export
+    output = tmp_path / "large.parquet"
+    export = f"""
+        COPY (
+            SELECT range AS id, md5(range::VARCHAR) || md5((range * 7)::VARCHAR) AS payload
+            FROM range(2000000)
+            ORDER BY payload
+        ) TO '{output}' (FORMAT 'parquet')
+    """
+
+    conn = duckdb.connect()
+    try:
+        session.apply_settings(conn, settings=dict(settings, temp_directory=""))
+        with pytest.raises(duckdb.OutOfMemoryException):
+            conn.execute(export)
+    finally:
+        conn.close()
+
+    conn = duckdb.connect()
+    try:
+        session.apply_settings(conn)
+        assert conn.execute(export).fetchone()[0] == 2000000
+        assert conn.execute(
+            f"SELECT count(*) FROM read_parquet('{output}')"
+        ).fetchone()[0] == 2000000
+    finally:
+        conn.close()
+    assert os.path.getsize(output) > 100 * 1024 * 1024
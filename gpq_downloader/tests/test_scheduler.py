@@ -0,0 +1,186 @@
+import threading
+import time
+import pytest
+from qgis.PyQt.QtCore import QObject, pyqtSignal
+
+from gpq_downloader.scheduler import DownloadScheduler
+
+
+class Tracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.created = []
+
+
+class FakeWorker(QObject):
+    """Stands in for Worker: same signals, sleeps instead of downloading"""
+    finished = pyqtSignal()
+    error = pyqtSignal(str)
+    load_layer = pyqtSignal(str)
+    info = pyqtSignal(str)
+    progress = pyqtSignal(str)
+    percent = pyqtSignal(int)
+    file_size_warning = pyqtSignal(float)
+
+    def __init__(self, job, tracker):
+        super().__init__()
+        self.job = job
+        self.tracker = tracker
+        self.killed = False
+
+    def run(self):
+        with self.tracker.lock:
+            self.tracker.active += 1
+            self.tracker.peak = max(self.tracker.peak, self.tracker.active)
+        self.progress.emit(f"Downloading {self.job['output_file']}")
+        self.percent.emit(50)
+        end = time.time() + self.job.get("delay", 0.05)
+        while time.time() < end and not self.killed:
+            time.sleep(0.01)
+        with self.tracker.lock:
+            self.tracker.active -= 1
+
+        if self.killed:
+            return
+        if self.job.get("error"):
+            self.error.emit(f"failed {self.job['output_file']}")
+            return
+        if self.job.get("large") and not self.job.get("size_warning_accepted"):
+            self.file_size_warning.emit(5000.0)
+            return
+        self.load_layer.emit(self.job["output_file"])
+        self.finished.emit()
+
+    def kill(self):
+        self.killed = True
+
+
+def make_scheduler(max_jobs):
+    tracker = Tracker()
+
+    def factory(job):
+        worker = FakeWorker(job, tracker)
+        tracker.created.append(worker)
+        return worker
+
+    return DownloadScheduler(factory, max_jobs=max_jobs), tracker
+
+
+def run_to_end(qtbot, scheduler, jobs, timeout=10000):
+    with qtbot.waitSignal(scheduler.all_finished, timeout=timeout):
+        scheduler.start(jobs)
+
+
+def test_scheduler_runs_jobs_concurrently_up_to_limit(qgs_app, qtbot):
+    """No more than max_jobs workers run at the same time"""
+    scheduler, tracker = make_scheduler(max_jobs=2)
+    jobs = [{"output_file": f"{i}.parquet", "delay": 0.2} for i in range(5)]
+
+    run_to_end(qtbot, scheduler, jobs)
+
+    assert tracker.peak == 2
+    assert len(tracker.created) == 5
+
+
+def test_scheduler_loads_results_in_queue_order(qgs_app, qtbot):
+    """Later jobs that finish first still load after earlier ones"""
+    scheduler, _ = make_scheduler(max_jobs=3)
+    loaded = []
+    scheduler.load_layer.connect(loaded.append)
+    jobs = [
+        {"output_file": "a.parquet", "delay": 0.4},
+        {"output_file": "b.parquet", "delay": 0.1},
+        {"output_file": "c.parquet", "delay": 0.2},
+    ]
+
+    run_to_end(qtbot, scheduler, jobs)
+
+    assert loaded == ["a.parquet", "b.parquet", "c.parquet"]
+
+
+def test_scheduler_error_does_not_stop_queue(qgs_app, qtbot):
+    """A failed job is reported in order and the others still complete"""
+    scheduler, _ = make_scheduler(max_jobs=2)
+    events = []
+    scheduler.load_layer.connect(lambda path: events.append(("load", path)))
+    scheduler.error.connect(lambda message: events.append(("error", message)))
+    jobs = [
+        {"output_file": "a.parquet", "delay": 0.2},
+        {"output_file": "b.parquet", "error": True},
+        {"output_file": "c.parquet"},
+    ]
+
+    run_to_end(qtbot, scheduler, jobs)
+
+    assert events == [("load", "a.parquet"), ("error", "failed b.parquet"), ("load", "c.parquet")]
+
+
+def test_scheduler_reports_per_job_progress(qgs_app, qtbot):
+    """Progress messages carry the index of the job they belong to"""
+    scheduler, _ = make_scheduler(max_jobs=2)
+    progress = []
+    scheduler.job_progress.connect(lambda index, message: progress.append((index, message)))
+
+    run_to_end(qtbot, scheduler, [{"output_file": "a.parquet"}, {"output_file": "b.parquet"}])
+
+    assert sorted(progress) == [(0, "Downloading a.parquet"), (1, "Downloading b.parquet")]
+
+
+def test_scheduler_reports_per_job_percent(qgs_app, qtbot):
+    """Percentages carry the index of the job they belong to"""
+    scheduler, _ = make_scheduler(max_jobs=2)
+    percents = []
+    scheduler.job_percent.connect(lambda index, percent: percents.append((index, percent)))
+
+    run_to_end(qtbot, scheduler, [{"output_file": "a.parquet"}, {"output_file": "b.parquet"}])
+
+    assert sorted(percents) == [(0, 50), (1, 50)]
+
+
+def test_scheduler_cancel_stops_all_jobs(qgs_app, qtbot):
+    """Cancelling kills every in-flight job, drops the queue and loads nothing"""
+    scheduler, tracker = make_scheduler(max_jobs=2)
+    loaded = []
+    scheduler.load_layer.connect(loaded.append)
+    jobs = [{"output_file": f"{i}.parquet", "delay": 5} for i in range(4)]
+
+    with qtbot.waitSignal(scheduler.all_finished, timeout=3000):
+        scheduler.start(jobs)
+        qtbot.waitUntil(lambda: tracker.active == 2, timeout=2000)
+        scheduler.cancel()
+
+    assert len(tracker.created) == 2
+    assert all(worker.killed for worker in tracker.created)
+    assert loaded == []
+    assert not scheduler.is_running()
+    qtbot.waitUntil(lambda: not scheduler._stopping, timeout=2000)
+
+
+def test_scheduler_retry_after_size_warning(qgs_app, qtbot):
+    """A job stopped by the size warning can be re-run with the warning accepted"""
+    scheduler, _ = make_scheduler(max_jobs=2)
+    loaded = []
+    scheduler.load_layer.connect(loaded.append)
+    scheduler.file_size_warning.connect(
+        lambda index, size: scheduler.retry(index, size_warning_accepted=True)
+    )
+    jobs = [{"output_file": "big.geojson", "large": True}, {"output_file": "b.parquet"}]
+
+    run_to_end(qtbot, scheduler, jobs)
+
+    assert loaded == ["big.geojson", "b.parquet"]
+
+
+def test_scheduler_skip_after_size_warning(qgs_app, qtbot):
+    """Skipping a job releases the results queued behind it"""
+    scheduler, _ = make_scheduler(max_jobs=2)
+    loaded = []
+    scheduler.load_layer.connect(loaded.append)
+    scheduler.file_size_warning.connect(lambda index, size: scheduler.skip(index))
+    jobs = [{"output_file": "big.geojson", "large": True}, {"output_file": "b.parquet"}]
+
+    run_to_end(qtbot, scheduler, jobs)
+
+    assert loaded == ["b.parquet"]
@@ -0,0 +1,122 @@
+import os
+import duckdb
+import pytest
+
+from gpq_downloader.query import bbox_overlap_predicate, default_bbox_covering
+from gpq_downloader.tile_cache import TileCache, cached_source, tiles_for_extent
+
+
+RELEASE_URL = "s3://overturemaps-us-west-2/release/2025-01-22.0/theme=buildings/type=building/*"
+
+
+def test_tiles_for_extent_on_fixed_grid():
+    tiles = tiles_for_extent(10.05, 20.05, 10.25, 20.15, size=0.1)
+    assert [tile["key"] for tile in tiles] == ["1900_1100", "1901_1100", "1902_1100", "1900_1101", "1901_1101", "1902_1101"]
+    assert tiles[0]["xmin"] == pytest.approx(10.0)
+    assert tiles[-1]["ymax"] == pytest.approx(20.2)
+
+
+def test_tile_cache_needs_a_release(tmp_path):
+    cache = TileCache(str(tmp_path))
+    assert cache.dataset_dir(RELEASE_URL) is not None
+    assert cache.dataset_dir("s3://bucket/no-release/*.parquet") is None
+
+
+def test_cached_tiles_return_every_row_once(tmp_path):
+    """Rows crossing tile edges are read once, and match a direct read of the extent"""
+    source_file = str(tmp_path / "source.parquet")
+    conn = duckdb.connect()
+    conn.execute(f"""
+        COPY (
+            SELECT range AS id, {{'xmin': x, 'ymin': y, 'xmax': x + w, 'ymax': y + h}} AS bbox
+            FROM (
+                SELECT range, 10 + random() * 0.5 AS x, 20 + random() * 0.5 AS y,
+                       CASE WHEN range % 50 = 0 THEN random() * 0.4 ELSE random() * 0.01 END AS w,
+                       random() * 0.02 AS h
+                FROM range(20000)
+            )
+        ) TO '{source_file}' (FORMAT 'parquet')
+    """)
+    cache = TileCache(str(tmp_path / "cache"))
+    covering = default_bbox_covering("bbox")
+
+    for extent in [(10.05, 20.05, 10.23, 20.31), (10.17, 20.2, 10.42, 20.44)]:
+        tiles = tiles_for_extent(*extent)
+        missing = [tile for tile in tiles if not cache.has(source_file, tile)]
+        fill_file = cache.temp_path(source_file, {"key": "fill"})
+        conn.execute(cache.fill_query(source_file, covering, missing, fill_file))
+        cache.split(conn, covering, missing, fill_file, source_file)
+        os.remove(fill_file)
+        source = cached_source([cache.tile_path(source_file, tile) for tile in tiles], covering, *extent)
+        predicate = bbox_overlap_predicate(covering, *extent)
+
+        cached_rows, distinct_ids = conn.execute(
+            f"SELECT count(*), count(DISTINCT id) FROM {source} WHERE {predicate}"
+        ).fetchone()
+        direct_rows = conn.execute(
+            f"SELECT count(*) FROM read_parquet('{source_file}') WHERE {predicate}"
+        ).fetchone()[0]
+        assert cached_rows == distinct_ids == direct_rows
+        assert [row[0] for row in conn.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()] == ["id", "bbox"]
+
+
+def test_cold_fill_reads_the_source_once(tmp_path):
+    """All missing tiles come from one read of the source, and each holds the rows overlapping it"""
+    source_file = str(tmp_path / "source.parquet")
+    conn = duckdb.connect()
+    try:
+        conn.execute("CALL enable_logging('FileSystem')")
+    except duckdb.Error:
+        pytest.skip("DuckDB without file system logging")
+    conn.execute(f"""
+        COPY (
+            SELECT range AS id, {{'xmin': x, 'ymin': y, 'xmax': x + 0.03, 'ymax': y + 0.03}} AS bbox
+            FROM (SELECT range, 10 + random() * 0.5 AS x, 20 + random() * 0.3 AS y FROM range(5000))
+        ) TO '{source_file}' (FORMAT 'parquet')
+    """)
+    cache = TileCache(str(tmp_path / "cache"))
+    covering = default_bbox_covering("bbox")
+    # Reaches past the data, so some tiles have no rows
+    tiles = tiles_for_extent(10.05, 20.05, 10.55, 20.45)
+
+    conn.execute("CALL truncate_duckdb_logs()")
+    fill_file = cache.temp_path(source_file, {"key": "fill"})
+    conn.execute(cache.fill_query(source_file, covering, tiles, fill_file))
+    cache.split(conn, covering, tiles, fill_file, source_file)
+    # Binding and scanning each open the file, so count the queries that did
+    source_reads = conn.execute(
+        f"SELECT count(DISTINCT query_id) FROM duckdb_logs_parsed('FileSystem') WHERE path = '{source_file}'"
+    ).fetchone()[0]
+    os.remove(fill_file)
+
+    assert len(tiles) == 30
+    assert source_reads == 1
+    for tile in tiles:
+        assert cache.has(source_file, tile)
+        predicate = bbox_overlap_predicate(covering, tile["xmin"], tile["ymin"], tile["xmax"], tile["ymax"])
+        cached = conn.execute(
+            f"SELECT count(*) FROM read_parquet('{cache.tile_path(source_file, tile)}') WHERE {predicate}"
+        ).fetchone()[0]
+        direct = conn.execute(f"SELECT count(*) FROM read_parquet('{source_file}') WHERE {predicate}").fetchone()[0]
+        assert cached == direct
+    # No fill or split leftovers count towards the cache
+    assert len(cache.tile_files()) == len(tiles)
+
+
+def test_tile_cache_evicts_least_recently_used(tmp_path):
+    cache = TileCache(str(tmp_path / "cache"), max_bytes=2500)
+    tiles = tiles_for_extent(0.0, 0.0, 0.25, 0.05)
+    for number, tile in enumerate(tiles):
+        path = cache.tile_path(RELEASE_URL, tile)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x" * 1000)
+        os.utime(path, (number, number))
+
+    # Using the oldest tile makes it the most recent
+    assert cache.has(RELEASE_URL, tiles[0])
+    cache.evict()
+
+    assert cache.size() <= 2500
+    assert cache.has(RELEASE_URL, tiles[0])
+    assert not os.path.exists(cache.tile_path(RELEASE_URL, tiles[1]))
@@ -0,0 +1,176 @@
+import threading
+import duckdb
+import pytest
+
+from gpq_downloader.query import bbox_overlap_predicate, default_bbox_covering
+from gpq_downloader.tiling import (
+    MAX_TILE_LEVEL,
+    TARGET_ROWS_PER_TILE,
+    estimate_rows,
+    plan_tiles,
+    run_tiles,
+    summarize_scan,
+    tile_level,
+    tile_ownership_predicate,
+)
+
+
+def test_estimate_rows_counts_overlapping_share():
+    """Row groups count with the share of their bbox inside the extent"""
+    row_groups = [
+        [100, 0.0, 0.0, 10.0, 10.0],     # half inside
+        [50, 20.0, 20.0, 30.0, 30.0],    # outside
+        [10, None, None, None, None],    # no statistics, counted in full
+    ]
+    assert estimate_rows(row_groups, 5.0, 0.0, 15.0, 10.0) == 60
+
+
+def test_summarize_scan_counts_candidate_files_and_bytes():
+    row_groups = [
+        [100, 0.0, 0.0, 10.0, 10.0, 4000, 0],
+        [100, 20.0, 20.0, 30.0, 30.0, 5000, 0],
+        [100, 5.0, 5.0, 15.0, 15.0, 3000, 1],
+    ]
+    assert summarize_scan(row_groups, 0.0, 0.0, 10.0, 10.0) == {
+        "files": 2,
+        "row_groups": 2,
+        "rows": 125,
+        "bytes": 7000,
+    }
+
+
+def test_tile_level_from_row_estimate():
+    """Tiles hold about TARGET_ROWS_PER_TILE rows, up to MAX_TILE_LEVEL"""
+    assert tile_level(10) == 0
+    assert tile_level(TARGET_ROWS_PER_TILE * 3) == 1
+    assert tile_level(TARGET_ROWS_PER_TILE * 10) == 2
+    assert tile_level(TARGET_ROWS_PER_TILE * 10 ** 9) == MAX_TILE_LEVEL
+
+
+def test_plan_tiles_cover_extent_with_shared_edges():
+    tiles = plan_tiles(0.0, 0.0, 1.0, 1.0, 2)
+    assert len(tiles) == 16
+    assert tiles[0]["xmin"] == 0.0 and tiles[-1]["xmax"] == 1.0
+    assert tiles[0]["xmax"] == tiles[1]["xmin"]
+    assert sum(tile["last_column"] for tile in tiles) == 4
+
+
+def test_tiles_own_every_row_once():
+    """Rows on tile edges or reaching outside the extent land in exactly one tile"""
+    conn = duckdb.connect()
+    conn.execute("""
+        CREATE TABLE features AS
+        SELECT i AS id,
+               {'xmin': x, 'ymin': y, 'xmax': x + 0.3, 'ymax': y + 0.3} AS bbox
+        FROM (
+            SELECT range AS i, (range % 41) / 10.0 - 0.5 AS x, (range // 41) / 10.0 - 0.5 AS y
+            FROM range(41 * 41)
+        )
+    """)
+    covering = default_bbox_covering("bbox")
+    extent = (0.0, 0.0, 3.0, 3.0)
+    expected = conn.execute(
+        f"SELECT count(*) FROM features WHERE {bbox_overlap_predicate(covering, *extent)}"
+    ).fetchone()[0]
+
+    seen = []
+    for tile in plan_tiles(*extent, 2):
+        seen += [row[0] for row in conn.execute(f"""
+            SELECT id FROM features
+            WHERE {bbox_overlap_predicate(covering, *extent)}
+            AND {tile_ownership_predicate(covering, tile, extent[0], extent[1])}
+        """).fetchall()]
+
+    assert len(seen) == expected
+    assert len(set(seen)) == expected
+
+
+def bytes_read(conn, query):
+    """Bytes DuckDB reads from local files while running query, from its FileSystem log"""
+    conn.execute("CALL truncate_duckdb_logs()")
+    conn.execute(query).fetchall()
+    return conn.execute(
+        "SELECT coalesce(sum(bytes), 0) FROM duckdb_logs_parsed('FileSystem') WHERE op = 'READ'"
+    ).fetchone()[0]
+
+
+def test_tile_query_skips_row_groups_outside_the_tile(tmp_path):
+    """A tile only reads the row groups overlapping it, not every row group of the extent"""
+    path = str(tmp_path / "sorted.parquet")
+    conn = duckdb.connect()
+    try:
+        conn.execute("CALL enable_logging('FileSystem')")
+    except duckdb.Error:
+        pytest.skip("DuckDB without file system logging")
+    # Rows sorted by x, so each row group covers a narrow band of x
+    conn.execute(f"""
+        COPY (
+            SELECT range AS id,
+                   {{'xmin': x, 'ymin': y, 'xmax': x + 0.01, 'ymax': y + 0.01}} AS bbox
+            FROM (SELECT range, (range // 2000) / 10.0 AS x, (range % 2000) / 2000.0 AS y FROM range(200000))
+            ORDER BY range
+        ) TO '{path}' (FORMAT 'parquet', ROW_GROUP_SIZE 2048)
+    """)
+    covering = default_bbox_covering("bbox")
+    extent = (0.0, 0.0, 10.0, 1.0)
+    extent_where = bbox_overlap_predicate(covering, *extent)
+
+    whole = bytes_read(conn, f"SELECT id FROM read_parquet('{path}') WHERE {extent_where}")
+    tiles = plan_tiles(*extent, 1)
+    tile_bytes = [
+        bytes_read(conn, f"""
+            SELECT id FROM read_parquet('{path}')
+            WHERE {extent_where} AND {tile_ownership_predicate(covering, tile, extent[0], extent[1])}
+        """)
+        for tile in tiles
+    ]
+
+    # Each tile spans half the x range, so it reads about half of the row groups
+    assert all(read < whole * 0.6 for read in tile_bytes)
+
+
+def test_run_tiles_retries_only_the_failing_tile():
+    tiles = plan_tiles(0.0, 0.0, 1.0, 1.0, 1)
+    calls = {}
+    lock = threading.Lock()
+
+    def run_tile(tile):
+        with lock:
+            calls[tile["index"]] = calls.get(tile["index"], 0) + 1
+            attempt = calls[tile["index"]]
+        if tile["index"] == 2 and attempt == 1:
+            raise IOError("connection reset")
+        return tile["index"] * 10
+
+    results = run_tiles(tiles, run_tile, max_workers=2)
+
+    assert results == {0: 0, 1: 10, 2: 20, 3: 30}
+    assert calls == {0: 1, 1: 1, 2: 2, 3: 1}
+
+
+def test_run_tiles_gives_up_after_retries():
+    tiles = plan_tiles(0.0, 0.0, 1.0, 1.0, 1)
+
+    def run_tile(tile):
+        if tile["index"] == 1:
+            raise IOError("still failing")
+        return tile["index"]
+
+    with pytest.raises(IOError):
+        run_tiles(tiles, run_tile, max_workers=1, retries=1)
+
+
+def test_run_tiles_cancels_queued_tiles_after_a_failure():
+    """Tiles still queued when one gives up are cancelled, not run"""
+    tiles = plan_tiles(0.0, 0.0, 1.0, 1.0, 3)
+    ran = []
+
+    def run_tile(tile):
+        ran.append(tile["index"])
+        if tile["index"] == 0:
+            raise IOError("still failing")
+        return tile["index"]
+
+    with pytest.raises(IOError):
+        run_tiles(tiles, run_tile, max_workers=1, retries=0)
+    assert len(ran) < len(tiles)
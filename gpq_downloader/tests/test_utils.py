@@ -7,7 +7,9 @@ from pathlib import Path
 from gpq_downloader.utils import (
     transform_bbox_to_4326, 
     Worker, 
-    ValidationWorker
+    ValidationWorker,
+    find_preset,
+    load_presets,
 )
 
 # Add new test for file size estimation
@@ -220,4 +222,13 @@ def test_worker_error_handling(mock_connect, mock_iface, sample_bbox, tmp_path):
     worker.run()
     
     assert error_message is not None
-    assert "Test error" in error_message 
\ No newline at end of file
+    assert "Test error" in error_message 
+
+def test_find_preset_matches_url_templates():
+    """URLs built from a preset template map back to the preset and its column presets"""
+    presets = load_presets()
+    url = "s3://overturemaps-us-west-2/release/2099-01-01.0/theme=buildings/type=building/*"
+    dataset = find_preset(presets, url)
+    assert dataset is not None
+    assert "Footprints" in dataset["column_presets"]
+    assert find_preset(presets, "https://example.com/unknown.parquet") is None
@@ -15,6 +15,7 @@ def test_validation_worker_with_bbox(mock_connect, mock_iface, sample_bbox):
         ("bbox", "STRUCT(xmin DOUBLE, ymin DOUBLE, xmax DOUBLE, ymax DOUBLE)", "YES", None, None, None),
         ("geometry", "GEOMETRY", "YES", None, None, None)
     ]
+    mock_conn.cursor.return_value = mock_conn
     mock_connect.return_value = mock_conn
     
     # Setup validation signals
@@ -48,6 +49,7 @@ def test_validation_worker_without_bbox(mock_connect, mock_iface, sample_bbox):
         ("id", "INTEGER", "YES", None, None, None),
         ("geometry", "GEOMETRY", "YES", None, None, None)
     ]
+    mock_conn.cursor.return_value = mock_conn
     mock_connect.return_value = mock_conn
     
     # Setup validation signals
@@ -1,8 +1,14 @@
 import pytest
 from unittest.mock import MagicMock, patch
 import os
+import threading
+import time
+import duckdb
 from qgis.PyQt.QtCore import QObject
 
+from gpq_downloader.manifest import ManifestStore, build_manifest
+from gpq_downloader.query import default_bbox_covering
+from gpq_downloader.tile_cache import TileCache, tiles_for_extent
 from gpq_downloader.utils import Worker
 
 class MockResult:
@@ -29,6 +35,9 @@ class MockConnection:
             return MockResult([(self.count_result,)])
         return MockResult([])
     
+    def cursor(self):
+        return self
+
     def commit(self):
         pass
     
@@ -75,13 +84,14 @@ def test_worker_run_with_bbox(mock_connect, mock_iface, sample_bbox, tmp_path, s
     # Run the worker
     worker.run()
     
-    # Check queries
+    # Check queries: sample_bbox is (1, 2, 3, 4), so all four bbox fields are tested for overlap
     bbox_query_found = False
     for query in mock_conn.executed_queries:
-        if '"bbox".xmin BETWEEN' in query:
+        if ('"bbox"."xmin" <= 3' in query and '"bbox"."xmax" >= 1' in query
+                and '"bbox"."ymin" <= 4' in query and '"bbox"."ymax" >= 2' in query):
             bbox_query_found = True
     
-    assert bbox_query_found, "Should use bbox in the query"
+    assert bbox_query_found, "Should use a bbox overlap predicate in the query"
     assert any("Downloading" in msg for msg in progress_messages)
 
 @patch("duckdb.connect")
@@ -116,4 +126,494 @@ def test_worker_run_without_bbox(mock_connect, mock_iface, sample_bbox, tmp_path
             st_intersects_found = True
     
     assert st_intersects_found, "Should use ST_Intersects in the query when no bbox column"
-    assert any("Downloading" in msg for msg in progress_messages) 
\ No newline at end of file
+    assert any("Downloading" in msg for msg in progress_messages) 
+class StreamingConnection(MockConnection):
+    """MockConnection whose COPY reports the number of rows written"""
+    def __init__(self, schema_data=None, rows_written=1):
+        super().__init__(schema_data=schema_data)
+        self.rows_written = rows_written
+
+    def execute(self, query):
+        if query.lstrip().startswith("COPY"):
+            self.executed_queries.append(query)
+            return MockResult([(self.rows_written,)])
+        return super().execute(query)
+
+@patch("duckdb.connect")
+def test_worker_streams_in_single_pass(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """The filtered read feeds COPY directly, without a table or COUNT(*) scan"""
+    mock_conn = StreamingConnection(schema_data=schema_with_bbox, rows_written=42)
+    mock_connect.return_value = mock_conn
+    loaded = []
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        os.path.join(tmp_path, "output.parquet"),
+        mock_iface,
+        sample_validation_results
+    )
+    worker.load_layer.connect(lambda path: loaded.append(path))
+    worker.run()
+
+    copy_queries = [q for q in mock_conn.executed_queries if q.lstrip().startswith("COPY")]
+    assert len(copy_queries) == 1
+    assert "read_parquet('https://example.com/test.parquet')" in copy_queries[0]
+    assert '"bbox"."xmin" <= 3' in copy_queries[0]
+    assert "ST_MakeEnvelope(1.0, 2.0, 3.0, 4.0)" in copy_queries[0]
+    assert not any("CREATE" in q and "download_data" in q for q in mock_conn.executed_queries)
+    assert not any("COUNT(*)" in q for q in mock_conn.executed_queries)
+    assert loaded == [os.path.join(tmp_path, "output.parquet")]
+
+@patch("duckdb.connect")
+def test_worker_streaming_empty_result(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """Zero rows written removes the output file and reports no data"""
+    mock_conn = StreamingConnection(schema_data=schema_with_bbox, rows_written=0)
+    mock_connect.return_value = mock_conn
+    output_file = tmp_path / "output.fgb"
+    output_file.write_bytes(b"empty")
+    infos = []
+    loaded = []
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        str(output_file),
+        mock_iface,
+        sample_validation_results
+    )
+    worker.info.connect(lambda msg: infos.append(msg))
+    worker.load_layer.connect(lambda path: loaded.append(path))
+    worker.run()
+
+    assert not output_file.exists()
+    assert any("No data found" in msg for msg in infos)
+    assert loaded == []
+
+@patch("duckdb.connect")
+def test_worker_geojson_materializes_for_size_check(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """GeoJSON keeps the materialized path until the size warning is accepted"""
+    mock_conn = StreamingConnection(schema_data=schema_with_bbox)
+    mock_connect.return_value = mock_conn
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        os.path.join(tmp_path, "output.geojson"),
+        mock_iface,
+        sample_validation_results
+    )
+    assert not worker.use_streaming("geojson")
+    worker.run()
+    assert any("CREATE TEMP TABLE download_data" in q for q in mock_conn.executed_queries)
+
+    worker.size_warning_accepted = True
+    assert worker.use_streaming("geojson")
+    assert not worker.use_streaming("duckdb")
+
+@patch("duckdb.connect")
+def test_worker_multi_output_reads_remote_once(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """Extra formats are written from the local GeoParquet output, not from another remote read"""
+    mock_conn = StreamingConnection(schema_data=schema_with_bbox, rows_written=42)
+    mock_connect.return_value = mock_conn
+    loaded = []
+    parquet_file = os.path.join(tmp_path, "output.parquet")
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        parquet_file,
+        mock_iface,
+        sample_validation_results,
+        extra_outputs=[os.path.join(tmp_path, "output.gpkg"), os.path.join(tmp_path, "output.duckdb")]
+    )
+    worker.load_layer.connect(lambda path: loaded.append(path))
+    worker.run()
+
+    remote_reads = [
+        q for q in mock_conn.executed_queries
+        if "read_parquet('https://example.com/test.parquet')" in q and "DESCRIBE" not in q
+    ]
+    assert len(remote_reads) == 1
+    gpkg_copy = [q for q in mock_conn.executed_queries if "output.gpkg" in q]
+    assert len(gpkg_copy) == 1
+    assert f"FROM read_parquet('{parquet_file}')" in gpkg_copy[0]
+    assert "DRIVER 'GPKG'" in gpkg_copy[0]
+    assert any(
+        "CREATE OR REPLACE TABLE download_data" in q and f"read_parquet('{parquet_file}')" in q
+        for q in mock_conn.executed_queries
+    )
+    assert loaded == [parquet_file]
+
+@patch("duckdb.connect")
+def test_worker_multi_output_without_parquet_uses_staging(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """Without a GeoParquet output the remote read goes to a staging file that is removed afterwards"""
+    mock_conn = StreamingConnection(schema_data=schema_with_bbox, rows_written=42)
+    mock_connect.return_value = mock_conn
+    staging_file = tmp_path / "output.staging.parquet"
+    staging_file.write_bytes(b"stage")
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        os.path.join(tmp_path, "output.gpkg"),
+        mock_iface,
+        sample_validation_results,
+        extra_outputs=[os.path.join(tmp_path, "output.fgb")]
+    )
+    worker.run()
+
+    copy_queries = [q for q in mock_conn.executed_queries if q.lstrip().startswith("COPY")]
+    assert len(copy_queries) == 3
+    assert "read_parquet('https://example.com/test.parquet')" in copy_queries[0]
+    assert f"TO '{staging_file}'" in copy_queries[0]
+    assert all(f"read_parquet('{staging_file}')" in q for q in copy_queries[1:])
+    assert not staging_file.exists()
+
+class TiledConnection(StreamingConnection):
+    """StreamingConnection whose footer statistics report a dataset worth tiling"""
+    def __init__(self, schema_data=None, rows_written=1, row_groups=None):
+        super().__init__(schema_data=schema_data, rows_written=rows_written)
+        self.row_groups = row_groups or []
+
+    def execute(self, query):
+        if "parquet_metadata" in query:
+            self.executed_queries.append(query)
+            return MockResult(self.row_groups)
+        return super().execute(query)
+
+@patch("duckdb.connect")
+def test_worker_downloads_large_extent_in_tiles(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """A large estimate splits the extent into tiles whose parts are merged into the output"""
+    # 3M rows spread over the (1, 2, 3, 4) extent -> 4 tiles
+    mock_conn = TiledConnection(
+        schema_data=schema_with_bbox, rows_written=10,
+        row_groups=[[3_000_000, 1.0, 2.0, 3.0, 4.0]],
+    )
+    mock_connect.return_value = mock_conn
+    output_file = os.path.join(tmp_path, "output.parquet")
+    loaded = []
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        output_file,
+        mock_iface,
+        sample_validation_results
+    )
+    worker.load_layer.connect(lambda path: loaded.append(path))
+    worker.run()
+
+    tile_queries = [q for q in mock_conn.executed_queries if "_tiles" in q and "GREATEST" in q]
+    assert len(tile_queries) == 4
+    assert all("read_parquet('https://example.com/test.parquet')" in q for q in tile_queries)
+    merge = [q for q in mock_conn.executed_queries if "read_parquet([" in q]
+    assert len(merge) == 1
+    assert merge[0].count("part-") == 4
+    assert f"TO '{output_file}'" in merge[0]
+    assert not os.path.exists(os.path.join(tmp_path, "output_tiles"))
+    assert loaded == [output_file]
+
+@patch("duckdb.connect")
+def test_worker_reports_percent_and_throughput(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """Footer statistics size the job; progress carries percent, rows/s and ETA, ending at 100"""
+    mock_conn = TiledConnection(
+        schema_data=schema_with_bbox, rows_written=42,
+        row_groups=[[1000, 1.0, 2.0, 3.0, 4.0, 2 * 1024 * 1024, 0]],
+    )
+    mock_connect.return_value = mock_conn
+    percents = []
+    messages = []
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        os.path.join(tmp_path, "output.parquet"),
+        mock_iface,
+        sample_validation_results
+    )
+    worker.percent.connect(lambda value: percents.append(value))
+    worker.progress.connect(lambda msg: messages.append(msg))
+    worker.run()
+
+    assert worker.scan_summary == {"files": 1, "row_groups": 1, "rows": 1000, "bytes": 2 * 1024 * 1024}
+    assert percents[-1] == 100
+    assert percents == sorted(percents)
+    assert any("rows/s" in msg and "ETA" in msg for msg in messages)
+
+def test_worker_kill_interrupts_running_query(mock_iface, sample_bbox, tmp_path, sample_validation_results):
+    """kill() interrupts a slow query instead of waiting for it to finish"""
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        os.path.join(tmp_path, "output.parquet"),
+        mock_iface,
+        sample_validation_results
+    )
+    cursor = worker.use_connection(duckdb.connect().cursor())
+    errors = []
+
+    def slow_query():
+        try:
+            cursor.execute("SELECT sum(hash(range)) FROM range(100000000000)").fetchall()
+        except duckdb.InterruptException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=slow_query)
+    thread.start()
+    time.sleep(0.2)
+
+    start = time.perf_counter()
+    worker.kill()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert time.perf_counter() - start < 1
+    assert len(errors) == 1
+
+class InterruptedConnection(StreamingConnection):
+    """StreamingConnection whose COPY writes part of the output before it is cancelled"""
+    def __init__(self, schema_data=None):
+        super().__init__(schema_data=schema_data)
+        self.worker = None
+
+    def interrupt(self):
+        self.interrupted = True
+
+    def execute(self, query):
+        if query.lstrip().startswith("COPY"):
+            self.executed_queries.append(query)
+            with open(self.worker.output_file, "wb") as f:
+                f.write(b"PAR1 half written")
+            self.worker.kill()
+            raise duckdb.InterruptException("INTERRUPT Error: Interrupted!")
+        return super().execute(query)
+
+@patch("duckdb.connect")
+def test_worker_cancel_removes_partial_output(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """A cancelled job interrupts its connection, removes the half-written file and reports no error"""
+    mock_conn = InterruptedConnection(schema_data=schema_with_bbox)
+    mock_connect.return_value = mock_conn
+    output_file = os.path.join(tmp_path, "output.parquet")
+    errors = []
+    loaded = []
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        output_file,
+        mock_iface,
+        sample_validation_results
+    )
+    mock_conn.worker = worker
+    worker.error.connect(lambda msg: errors.append(msg))
+    worker.load_layer.connect(lambda path: loaded.append(path))
+    worker.run()
+
+    assert mock_conn.interrupted
+    assert not os.path.exists(output_file)
+    assert errors == []
+    assert loaded == []
+
+class CachingConnection(StreamingConnection):
+    """StreamingConnection whose tile cache fills write the fill file and split it into tiles"""
+    def execute(self, query):
+        if query.lstrip().startswith("COPY") and ".tmp'" in query:
+            self.executed_queries.append(query)
+            target = query.split("TO '")[-1].split("'")[0]
+            if "PARTITION_BY" in query:
+                keys = query.split("IN (")[-1].split(")")[0].replace("'", "").split(", ")
+                for key in keys:
+                    os.makedirs(os.path.join(target, f"__tile={key}"))
+                    with open(os.path.join(target, f"__tile={key}", "data_0.parquet"), "wb") as f:
+                        f.write(b"PAR1")
+            else:
+                with open(target, "wb") as f:
+                    f.write(b"PAR1")
+            return MockResult([(1,)])
+        return super().execute(query)
+
+@patch("duckdb.connect")
+def test_worker_serves_cached_tiles_and_fetches_missing(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """Only tiles missing from the cache are read remotely; the export reads the cached tiles"""
+    url = "s3://overturemaps-us-west-2/release/2025-01-22.0/theme=buildings/type=building/*"
+    cache = TileCache(str(tmp_path / "cache"), tile_degrees=1.0)
+    tiles = tiles_for_extent(1, 2, 3, 4, size=1.0)
+    for tile in tiles[:5]:
+        path = cache.tile_path(url, tile)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"PAR1")
+
+    mock_conn = CachingConnection(schema_data=schema_with_bbox, rows_written=42)
+    mock_connect.return_value = mock_conn
+    worker = Worker(url, sample_bbox, os.path.join(tmp_path, "output.parquet"), mock_iface, sample_validation_results)
+    worker.tile_cache = cache
+    worker.run()
+
+    assert worker.cache_report == {"tiles": 9, "hits": 5, "misses": 4}
+    remote_reads = [q for q in mock_conn.executed_queries if q.lstrip().startswith("COPY") and f"read_parquet('{url}'" in q]
+    # The four missing tiles come from one remote read, split locally
+    assert len(remote_reads) == 1
+    # Overture's theme=/type= directories are read as Hive partitions
+    assert f"read_parquet('{url}', hive_partitioning = true)" in remote_reads[0]
+    splits = [q for q in mock_conn.executed_queries if "PARTITION_BY" in q]
+    assert len(splits) == 1
+    assert all(f"'{tile['key']}'" in splits[0] for tile in tiles[5:])
+    assert all(os.path.exists(cache.tile_path(url, tile)) for tile in tiles)
+    export = [q for q in mock_conn.executed_queries if "output.parquet" in q]
+    assert len(export) == 1
+    assert f"read_parquet('{url}'" not in export[0]
+    assert "parse_filename(filename, true)" in export[0]
+
+class ColumnSizeConnection(TiledConnection):
+    """TiledConnection that also reports per column sizes from the footers"""
+    def __init__(self, schema_data=None, row_groups=None, column_sizes=None):
+        super().__init__(schema_data=schema_data, rows_written=5, row_groups=row_groups)
+        self.column_sizes = column_sizes or []
+
+    def execute(self, query):
+        if "split_part(path_in_schema" in query:
+            self.executed_queries.append(query)
+            return MockResult(self.column_sizes)
+        return super().execute(query)
+
+@patch("duckdb.connect")
+def test_worker_reads_only_selected_columns(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results):
+    """A column selection lists the chosen columns plus geometry and bbox, and reports bytes saved"""
+    schema = [
+        ("id", "INTEGER", "YES", None, None, None),
+        ("names", "STRUCT(primary VARCHAR)", "YES", None, None, None),
+        ("bbox", "STRUCT(xmin DOUBLE, ymin DOUBLE, xmax DOUBLE, ymax DOUBLE)", "YES", None, None, None),
+        ("geometry", "GEOMETRY", "YES", None, None, None),
+    ]
+    mock_conn = ColumnSizeConnection(
+        schema_data=schema,
+        row_groups=[[1000, 1.0, 2.0, 3.0, 4.0, 1000, 0]],
+        column_sizes=[("id", 100), ("names", 800), ("bbox", 50), ("geometry", 50)],
+    )
+    mock_connect.return_value = mock_conn
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        os.path.join(tmp_path, "output.parquet"),
+        mock_iface,
+        sample_validation_results
+    )
+    worker.columns = ["id"]
+    worker.run()
+
+    copy_queries = [q for q in mock_conn.executed_queries if q.lstrip().startswith("COPY")]
+    assert len(copy_queries) == 1
+    assert 'SELECT "id", "bbox", "geometry"' in copy_queries[0]
+    assert "names" not in copy_queries[0]
+    # 800 of 1000 footer bytes belong to the unselected column
+    assert worker.column_report == {"columns": 3, "total_columns": 4, "bytes_saved": 800}
+    assert worker.scan_summary["bytes"] == 200
+
+class FilterConnection(StreamingConnection):
+    """StreamingConnection that types the attribute filter probe as filter_type"""
+    def __init__(self, schema_data=None, filter_type="BOOLEAN"):
+        super().__init__(schema_data=schema_data, rows_written=3)
+        self.filter_type = filter_type
+
+    def execute(self, query):
+        if "typeof(" in query:
+            self.executed_queries.append(query)
+            return MockResult([(self.filter_type,)])
+        return super().execute(query)
+
+@patch("duckdb.connect")
+def test_worker_adds_attribute_filter_to_where(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """The attribute filter is ANDed with the bbox predicate in the same WHERE"""
+    mock_conn = FilterConnection(schema_data=schema_with_bbox)
+    mock_connect.return_value = mock_conn
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        os.path.join(tmp_path, "output.parquet"),
+        mock_iface,
+        sample_validation_results
+    )
+    worker.attribute_filter = "id > 10"
+    worker.run()
+
+    copy_queries = [q for q in mock_conn.executed_queries if q.lstrip().startswith("COPY")]
+    assert len(copy_queries) == 1
+    assert '"bbox"."xmin" <= 3' in copy_queries[0]
+    assert "AND (id > 10)" in copy_queries[0]
+
+@patch("duckdb.connect")
+def test_worker_rejects_invalid_attribute_filter(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """A filter that isn't a condition fails before anything is read"""
+    mock_conn = FilterConnection(schema_data=schema_with_bbox, filter_type="INTEGER")
+    mock_connect.return_value = mock_conn
+    errors = []
+
+    worker = Worker(
+        "https://example.com/test.parquet",
+        sample_bbox,
+        os.path.join(tmp_path, "output.parquet"),
+        mock_iface,
+        sample_validation_results
+    )
+    worker.attribute_filter = "id"
+    worker.error.connect(lambda message: errors.append(message))
+    worker.run()
+
+    assert len(errors) == 1
+    assert "Invalid attribute filter" in errors[0]
+    assert not any(q.lstrip().startswith("COPY") for q in mock_conn.executed_queries)
+
+@patch("duckdb.connect")
+def test_worker_reads_only_overlapping_partitions(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """A by_country glob is rewritten to the partitions whose statistics overlap the extent"""
+    prefix = "s3://bucket/by_country"
+    mock_conn = TiledConnection(
+        schema_data=schema_with_bbox, rows_written=7,
+        row_groups=[
+            [100, 1.5, 2.5, 2.0, 3.0, 1000, 0, f"{prefix}/country_iso=AAA/AAA.parquet"],
+            [100, 50.0, 50.0, 60.0, 60.0, 1000, 1, f"{prefix}/country_iso=BBB/BBB.parquet"],
+            [100, -60.0, -60.0, -50.0, -50.0, 1000, 2, f"{prefix}/country_iso=CCC/CCC.parquet"],
+        ],
+    )
+    mock_connect.return_value = mock_conn
+
+    worker = Worker(
+        f"{prefix}/*/*.parquet",
+        sample_bbox,
+        os.path.join(tmp_path, "output.parquet"),
+        mock_iface,
+        sample_validation_results
+    )
+    worker.run()
+
+    copy_queries = [q for q in mock_conn.executed_queries if q.lstrip().startswith("COPY")]
+    assert len(copy_queries) == 1
+    assert f"read_parquet(['{prefix}/country_iso=AAA/*.parquet'])" in copy_queries[0]
+    assert worker.partition_report == {"partitions": 3, "partitions_read": 1, "files": 3, "files_skipped": 2}
+
+@patch("duckdb.connect")
+def test_worker_reads_files_from_manifest(mock_connect, mock_iface, sample_bbox, tmp_path, sample_validation_results, schema_with_bbox):
+    """A stored manifest replaces footer reads, and only overlapping files are passed to read_parquet"""
+    url = "s3://bucket/data/*.parquet"
+    store = ManifestStore(str(tmp_path / "manifests"))
+    store.save(build_manifest(url, default_bbox_covering("bbox"), [
+        [100, 1.5, 2.5, 2.0, 3.0, 1000, 0, "s3://bucket/data/a.parquet"],
+        [100, 50.0, 50.0, 60.0, 60.0, 1000, 1, "s3://bucket/data/b.parquet"],
+    ]))
+    mock_conn = TiledConnection(schema_data=schema_with_bbox, rows_written=7)
+    mock_connect.return_value = mock_conn
+
+    worker = Worker(url, sample_bbox, os.path.join(tmp_path, "output.parquet"), mock_iface, sample_validation_results)
+    worker.manifest_store = store
+    worker.run()
+
+    assert not any("parquet_metadata" in q for q in mock_conn.executed_queries)
+    copy_queries = [q for q in mock_conn.executed_queries if q.lstrip().startswith("COPY")]
+    assert len(copy_queries) == 1
+    assert "read_parquet(['s3://bucket/data/a.parquet'])" in copy_queries[0]
+    assert worker.manifest_report == {"files": 2, "files_read": 1, "files_skipped": 1}
+    assert worker.scan_summary["rows"] > 0
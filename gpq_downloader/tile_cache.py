@@ -0,0 +1,256 @@
+import hashlib
+import math
+import glob
+import os
+import shutil
+import tempfile
+
+from . import logger
+from .metadata_cache import dataset_validator
+from .partitions import dataset_source
+from .query import bbox_overlap_predicate, column_path_expr, quote_identifier
+
+
+# Side of a cache tile in degrees, on a fixed grid so tiles line up across requests
+CACHE_TILE_DEGREES = 0.1
+# Extents needing more tiles than this bypass the cache (about 2 by 2 degrees)
+MAX_TILES_PER_JOB = 400
+DEFAULT_MAX_MB = 2048
+# Cache tiles are filled with a slightly larger box so edge rows are never lost to rounding
+TILE_MARGIN = 1e-9
+# Column naming the tile a row is split into when a fill is written out per tile
+TILE_PARTITION = "__tile"
+
+
+def tile_key(column, row):
+    return f"{column}_{row}"
+
+
+def tiles_for_extent(xmin, ymin, xmax, ymax, size=CACHE_TILE_DEGREES):
+    """Grid tiles overlapping an extent, as dicts for tiling.run_tiles"""
+    first_column, last_column = math.floor((xmin + 180) / size), math.floor((xmax + 180) / size)
+    first_row, last_row = math.floor((ymin + 90) / size), math.floor((ymax + 90) / size)
+    tiles = []
+    for row in range(first_row, last_row + 1):
+        for column in range(first_column, last_column + 1):
+            tiles.append({
+                "index": len(tiles),
+                "key": tile_key(column, row),
+                "xmin": column * size - 180,
+                "ymin": row * size - 90,
+                "xmax": (column + 1) * size - 180,
+                "ymax": (row + 1) * size - 90,
+            })
+    return tiles
+
+
+def cached_source(tile_files, covering, xmin, ymin, xmax, ymax, size=CACHE_TILE_DEGREES):
+    """
+    SQL source reading an extent from cache tiles, every row exactly once.
+
+    A cache tile holds every row whose bbox overlaps it, so rows crossing a
+    tile edge are in several tiles. Each row is only taken from the tile
+    holding the min corner of its bbox clamped to the extent (xmin, ymin);
+    that point lies inside the row's bbox and the extent, so the tile is
+    always among those read. The extent's overlap test comes first, so row
+    groups of edge tiles lying outside the extent are skipped.
+    """
+    x = f"GREATEST({column_path_expr(covering['xmin'])}, {xmin!r})"
+    y = f"GREATEST({column_path_expr(covering['ymin'])}, {ymin!r})"
+    owner = (
+        f"CAST(floor(({x} + 180) / {size!r}) AS BIGINT) || '_' || "
+        f"CAST(floor(({y} + 90) / {size!r}) AS BIGINT)"
+    )
+    files = ", ".join(f"'{path}'" for path in tile_files)
+    return (
+        f"(SELECT * EXCLUDE (filename) FROM read_parquet([{files}], filename = true) "
+        f"WHERE {bbox_overlap_predicate(covering, xmin, ymin, xmax, ymax)} "
+        f"AND parse_filename(filename, true) = {owner})"
+    )
+
+
+class TileCache:
+    """
+    Local GeoParquet tiles of remote datasets on a fixed lon/lat grid.
+
+    Tiles are keyed by dataset URL, release (or another validator of the data
+    behind the URL) and tile. A tile holds every row whose bbox overlaps it, so
+    later extents covering the same tiles are served from disk. Once the cache
+    is over max_bytes the least recently used tiles are evicted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, tile_degrees=CACHE_TILE_DEGREES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.tile_degrees = tile_degrees
+        self._validators = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def dataset_dir(self, url, columns=None):
+        """
+        Directory of a dataset's tiles, or None if its release can't be told apart.
+
+        Tiles holding only some columns are kept apart from full tiles.
+        """
+        if url not in self._validators:
+            self._validators[url] = dataset_validator(url)
+        validator = self._validators[url]
+        if validator is None:
+            return None
+        key = f"{url}|{validator}"
+        if columns:
+            key += "|" + ",".join(sorted(columns))
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest)
+
+    def tile_path(self, url, tile, columns=None):
+        return os.path.join(self.dataset_dir(url, columns), f"{tile['key']}.parquet")
+
+    def has(self, url, tile, columns=None):
+        path = self.tile_path(url, tile, columns)
+        if not os.path.exists(path):
+            return False
+        # Touch the tile so eviction sees it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return True
+
+    def temp_path(self, url, tile, columns=None):
+        """File to fill a tile into; commit() moves it into place"""
+        directory = self.dataset_dir(url, columns)
+        os.makedirs(directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=directory, prefix=f"{tile['key']}.", suffix=".tmp")
+        os.close(fd)
+        os.remove(path)
+        return path
+
+    def commit(self, temp_path, url, tile, columns=None):
+        os.replace(temp_path, self.tile_path(url, tile, columns))
+
+    def fill_query(self, url, covering, tiles, target, columns=None, source=None):
+        """
+        COPY reading every row of the dataset whose bbox overlaps any of tiles into target.
+
+        All missing tiles are fetched by this one read, so the files are
+        listed and their footers read once; split() then writes the tiles
+        from target. source overrides the read of url.
+        """
+        predicate = bbox_overlap_predicate(
+            covering,
+            min(tile["xmin"] for tile in tiles) - TILE_MARGIN, min(tile["ymin"] for tile in tiles) - TILE_MARGIN,
+            max(tile["xmax"] for tile in tiles) + TILE_MARGIN, max(tile["ymax"] for tile in tiles) + TILE_MARGIN,
+        )
+        select = ", ".join(quote_identifier(column) for column in columns) if columns else "*"
+        return (
+            f"COPY (SELECT {select} FROM {source or dataset_source(url)} WHERE {predicate}) "
+            f"TO '{target}' (FORMAT 'parquet', COMPRESSION 'ZSTD')"
+        )
+
+    def split_query(self, covering, tiles, fill_file, target_dir):
+        """
+        COPY writing the rows of a fill into one partition per tile under target_dir.
+
+        A row goes to every tile its bbox overlaps, on the same test a single
+        tile would be read with, so rows crossing tile edges are in each tile.
+        """
+        size = self.tile_degrees
+        xmin, ymin = column_path_expr(covering["xmin"]), column_path_expr(covering["ymin"])
+        xmax, ymax = column_path_expr(covering["xmax"]), column_path_expr(covering["ymax"])
+        column, row = quote_identifier("__tile_column"), quote_identifier("__tile_row")
+        # Candidate tiles reach one tile further each way, the overlap test below settles them
+        columns = (
+            f"range(CAST(floor(({xmin} + 180) / {size!r}) AS BIGINT) - 1, "
+            f"CAST(floor(({xmax} + 180) / {size!r}) AS BIGINT) + 2)"
+        )
+        rows = (
+            f"range(CAST(floor(({ymin} + 90) / {size!r}) AS BIGINT) - 1, "
+            f"CAST(floor(({ymax} + 90) / {size!r}) AS BIGINT) + 2)"
+        )
+        key = f"{column} || '_' || {row}"
+        keys = ", ".join(f"'{tile['key']}'" for tile in tiles)
+        return f"""
+            COPY (
+                SELECT * EXCLUDE ({column}, {row}), {key} AS {quote_identifier(TILE_PARTITION)}
+                FROM (
+                    SELECT *, unnest({rows}) AS {row}
+                    FROM (SELECT *, unnest({columns}) AS {column} FROM read_parquet('{fill_file}'))
+                )
+                WHERE {xmin} <= ({column} + 1) * {size!r} - 180 + {TILE_MARGIN!r}
+                AND {xmax} >= {column} * {size!r} - 180 - {TILE_MARGIN!r}
+                AND {ymin} <= ({row} + 1) * {size!r} - 90 + {TILE_MARGIN!r}
+                AND {ymax} >= {row} * {size!r} - 90 - {TILE_MARGIN!r}
+                AND {key} IN ({keys})
+            ) TO '{target_dir}' (FORMAT 'parquet', COMPRESSION 'ZSTD', PARTITION_BY ({quote_identifier(TILE_PARTITION)}))
+        """
+
+    def split(self, conn, covering, tiles, fill_file, url, columns=None):
+        """
+        Write each of tiles into the cache from a fill made by fill_query, reading it locally.
+
+        Tiles without rows still get a file, with the fill's columns and no
+        rows, so they count as cached.
+        """
+        target_dir = tempfile.mkdtemp(dir=self.dataset_dir(url, columns), prefix="split.", suffix=".tmp")
+        try:
+            conn.execute(self.split_query(covering, tiles, fill_file, target_dir))
+            for tile in tiles:
+                parts = sorted(glob.glob(os.path.join(target_dir, f"{TILE_PARTITION}={tile['key']}", "*.parquet")))
+                if len(parts) == 1:
+                    os.replace(parts[0], self.tile_path(url, tile, columns))
+                    continue
+                if parts:
+                    # Several parts when DuckDB had too many partitions open at once
+                    files = ", ".join(f"'{part}'" for part in parts)
+                    source = f"read_parquet([{files}])"
+                else:
+                    source = f"(SELECT * FROM read_parquet('{fill_file}') LIMIT 0)"
+                target = self.temp_path(url, tile, columns)
+                conn.execute(f"COPY (SELECT * FROM {source}) TO '{target}' (FORMAT 'parquet', COMPRESSION 'ZSTD')")
+                self.commit(target, url, tile, columns)
+        finally:
+            shutil.rmtree(target_dir, ignore_errors=True)
+
+    def tile_files(self):
+        """(path, size, last used) of every cached tile"""
+        files = []
+        for root, directories, names in os.walk(self.cache_dir):
+            # Fills being split into tiles aren't tiles yet
+            directories[:] = [name for name in directories if not name.endswith(".tmp")]
+            for name in names:
+                if not name.endswith(".parquet"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def size(self):
+        return sum(size for _, size, _ in self.tile_files())
+
+    def evict(self, keep=()):
+        """Drop the least recently used tiles until the cache fits max_bytes, sparing keep"""
+        files = self.tile_files()
+        total = sum(size for _, size, _ in files)
+        keep = set(keep)
+        for path, size, _ in sorted(files, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                logger.log(f"Could not evict cached tile {path}: {e}", 1)
+
+    def clear(self):
+        for path, _, _ in self.tile_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,172 @@
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import logger
+from .query import bbox_overlap_predicate, column_path_expr
+
+
+# Rows a single tile should hold, so one failure only costs a bounded re-read
+TARGET_ROWS_PER_TILE = 1_000_000
+# Cap on the grid: 2**4 = 16 tiles per side, 256 tiles in total
+MAX_TILE_LEVEL = 4
+# Extra attempts for a tile that fails before the whole job gives up
+TILE_RETRIES = 2
+
+
+def estimate_rows(row_groups, xmin, ymin, xmax, ymax):
+    """
+    Estimate the rows inside an extent from per row group bounds.
+
+    Each overlapping row group counts with the share of its bbox area that
+    falls inside the extent, assuming rows spread evenly over it. Row groups
+    without statistics count in full.
+    """
+    total = 0.0
+    for row_group in row_groups:
+        num_rows, rg_xmin, rg_ymin, rg_xmax, rg_ymax = row_group[:5]
+        if not num_rows:
+            continue
+        if None in (rg_xmin, rg_ymin, rg_xmax, rg_ymax):
+            total += num_rows
+            continue
+        if rg_xmin > xmax or rg_xmax < xmin or rg_ymin > ymax or rg_ymax < ymin:
+            continue
+        overlap_x = min(rg_xmax, xmax) - max(rg_xmin, xmin)
+        overlap_y = min(rg_ymax, ymax) - max(rg_ymin, ymin)
+        width = rg_xmax - rg_xmin
+        height = rg_ymax - rg_ymin
+        share_x = overlap_x / width if width > 0 else 1.0
+        share_y = overlap_y / height if height > 0 else 1.0
+        total += num_rows * share_x * share_y
+    return int(total)
+
+
+def candidate_row_groups(row_groups, xmin, ymin, xmax, ymax):
+    """Row groups whose statistics don't rule out rows inside the extent"""
+    candidates = []
+    for row_group in row_groups:
+        rg_xmin, rg_ymin, rg_xmax, rg_ymax = row_group[1:5]
+        if None not in (rg_xmin, rg_ymin, rg_xmax, rg_ymax) and (
+            rg_xmin > xmax or rg_xmax < xmin or rg_ymin > ymax or rg_ymax < ymin
+        ):
+            continue
+        candidates.append(row_group)
+    return candidates
+
+
+def summarize_scan(row_groups, xmin, ymin, xmax, ymax):
+    """
+    What a filtered read of the extent touches: files, row groups, rows and bytes.
+
+    Rows are the estimate inside the extent; bytes are the compressed size of
+    the candidate row groups, which is what has to be fetched.
+    """
+    candidates = candidate_row_groups(row_groups, xmin, ymin, xmax, ymax)
+    return {
+        "files": len({row_group[6] for row_group in candidates if len(row_group) > 6}),
+        "row_groups": len(candidates),
+        "rows": estimate_rows(candidates, xmin, ymin, xmax, ymax),
+        "bytes": sum(row_group[5] or 0 for row_group in candidates if len(row_group) > 5),
+    }
+
+
+def tile_level(estimated_rows, target_rows=TARGET_ROWS_PER_TILE, max_level=MAX_TILE_LEVEL):
+    """Quadtree level whose 4**level tiles hold about target_rows each"""
+    if estimated_rows <= target_rows:
+        return 0
+    level = math.ceil(math.log(estimated_rows / target_rows, 4))
+    return min(level, max_level)
+
+
+def plan_tiles(xmin, ymin, xmax, ymax, level):
+    """
+    Split an extent into a 2**level by 2**level grid.
+
+    Neighbouring tiles share their edge values exactly, which
+    tile_ownership_predicate relies on to give every row a single tile.
+    """
+    side = 2 ** level
+    x_edges = [xmin + (xmax - xmin) * i / side for i in range(side)] + [xmax]
+    y_edges = [ymin + (ymax - ymin) * i / side for i in range(side)] + [ymax]
+    tiles = []
+    for row in range(side):
+        for column in range(side):
+            tiles.append({
+                "index": len(tiles),
+                "xmin": x_edges[column],
+                "ymin": y_edges[row],
+                "xmax": x_edges[column + 1],
+                "ymax": y_edges[row + 1],
+                "last_column": column == side - 1,
+                "last_row": row == side - 1,
+            })
+    return tiles
+
+
+def tile_ownership_predicate(covering, tile, xmin, ymin):
+    """
+    SQL predicate selecting the rows a tile owns.
+
+    A row belongs to the tile holding the min corner of its bbox, clamped to
+    the download extent (xmin, ymin) so rows starting outside it still land in
+    a tile. Tiles are half open except along the far edges, so rows on a shared
+    edge are written once.
+
+    The ownership test compares GREATEST(...) expressions, which the Parquet
+    reader can't check against row group statistics. Every owned row also
+    overlaps the tile, so the tile's own overlap test goes first and lets each
+    tile skip the row groups outside it.
+    """
+    x = f"GREATEST({column_path_expr(covering['xmin'])}, {xmin!r})"
+    y = f"GREATEST({column_path_expr(covering['ymin'])}, {ymin!r})"
+    x_upper = "<=" if tile["last_column"] else "<"
+    y_upper = "<=" if tile["last_row"] else "<"
+    return (
+        f"{bbox_overlap_predicate(covering, tile['xmin'], tile['ymin'], tile['xmax'], tile['ymax'])} "
+        f"AND {x} >= {tile['xmin']!r} AND {x} {x_upper} {tile['xmax']!r} "
+        f"AND {y} >= {tile['ymin']!r} AND {y} {y_upper} {tile['ymax']!r}"
+    )
+
+
+def run_tiles(tiles, run_tile, max_workers=2, retries=TILE_RETRIES, should_stop=None, on_tile_done=None):
+    """
+    Call run_tile(tile) for every tile, at most max_workers at a time.
+
+    A failing tile is retried on its own; the other tiles keep their results.
+    Returns {tile index: result}. If a tile still fails after its retries the
+    remaining tiles are cancelled and the error is raised.
+    """
+    should_stop = should_stop or (lambda: False)
+    failed = []
+
+    def attempt(tile):
+        for number in range(retries + 1):
+            if failed or should_stop():
+                return None
+            try:
+                return run_tile(tile)
+            except Exception as e:
+                if number == retries:
+                    raise
+                logger.log(f"Tile {tile['index']} failed, retrying: {e}", 1)
+
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)))
+    futures = {}
+    try:
+        for tile in tiles:
+            futures[executor.submit(attempt, tile)] = tile
+        for future in as_completed(futures):
+            try:
+                results[futures[future]["index"]] = future.result()
+            except Exception:
+                failed.append(futures[future])
+                raise
+            if on_tile_done:
+                on_tile_done(len(results), len(tiles))
+    finally:
+        # shutdown(cancel_futures=True) needs Python 3.9
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+    return results
@@ -6,6 +6,11 @@ import os
 import duckdb
 
 from . import logger
+from .duckdb_session import DuckDBSession
+from .engine import DownloadEngine, find_preset, load_output_formats, load_presets
+from .estimate import combine_estimates, estimate_download, find_bbox_covering
+from .metadata_cache import get_geo_metadata, get_schema
+from .query import parse_bbox_covering
 
 
 def transform_bbox_to_4326(extent, source_crs):
@@ -31,7 +36,8 @@ def transform_bbox_to_4326(extent, source_crs):
     return extent
 
 
-class Worker(QObject):
+class Worker(DownloadEngine, QObject):
+    """DownloadEngine on a QThread: takes the map extent and AOI in their CRS and reports through signals"""
     finished = pyqtSignal()
     error = pyqtSignal(str)
     load_layer = pyqtSignal(str)
@@ -40,487 +46,173 @@ class Worker(QObject):
     percent = pyqtSignal(int)
     file_size_warning = pyqtSignal(float)  # Signal for file size warnings (in MB)
 
-    def __init__(self, dataset_url, extent, output_file, iface, validation_results, layer_name=None, aoi_geometry=None):
-        super().__init__()
-        self.dataset_url = dataset_url
+    def __init__(self, dataset_url, extent, output_file, iface, validation_results, layer_name=None, aoi_geometry=None, session=None, metadata_cache=None, extra_outputs=None):
+        QObject.__init__(self)
+        DownloadEngine.__init__(
+            self, dataset_url, None, output_file, validation_results, layer_name,
+            session=session, metadata_cache=metadata_cache, extra_outputs=extra_outputs,
+        )
         self.extent = extent
-        self.output_file = output_file
         self.iface = iface
-        self.validation_results = validation_results
-        self.killed = False
-        self.layer_name = layer_name
-        self.size_warning_accepted = False
         self.aoi_geometry = aoi_geometry
-
-    def get_bbox_info_from_metadata(self, conn):
-        """Read GeoParquet metadata to find bbox column info"""
-        self.progress.emit("Checking for bbox metadata...")
-        metadata_query = (
-            f"SELECT key, value FROM parquet_kv_metadata('{self.dataset_url}')"
-        )
-        metadata_results = conn.execute(metadata_query).fetchall()
-
-        for key, value in metadata_results:
-            if key == b"geo":
-                try:
-                    decoded_value = value.decode()
-                    #logger.log("\nRaw metadata value:")
-                    #logger.log(decoded_value)
-
-                    # Parse JSON using DuckDB's JSON functions
-                    json_query = (
-                        f"SELECT json_parse('{decoded_value}'::VARCHAR) as json"
-                    )
-                    #logger.log("\nExecuting JSON query:")
-                    #logger.log(json_query)
-
-                    geo_metadata = conn.execute(json_query).fetchone()[0]
-                    #logger.log("\nParsed metadata:")
-                    #logger.log(geo_metadata)
-
-                    if geo_metadata and "covering" in geo_metadata:
-                        #logger.log("\nFound covering:")
-                        #logger.log(geo_metadata["covering"])
-                        if "bbox" in geo_metadata["covering"]:
-                            bbox_info = geo_metadata["covering"]["bbox"]
-                            #logger.log("\nExtracted bbox info:")
-                            #logger.log(bbox_info)
-                            return bbox_info
-                except Exception as e:
-                    logger.log(f"\nError parsing geo metadata: {str(e)}", 2)
-                    logger.log(f"Exception type: {type(e)}", 2)
-                    import traceback
-
-                    logger.log(traceback.format_exc(), 2)
-                    continue
-        return None
+        # CRS of extent and aoi_geometry; None means the map canvas CRS
+        self.extent_crs = None
 
     def run(self):
         try:
-            layer_info = f" for {self.layer_name}" if self.layer_name else ""
-            self.progress.emit(f"Connecting to database{layer_info}...")
-            source_crs = self.iface.mapCanvas().mapSettings().destinationCrs()
-            bbox = transform_bbox_to_4326(self.extent, source_crs)
-
-            # Log the dataset URL and aoi_geometry for debugging
-            logger.log(f"Processing dataset: {self.dataset_url}")
-            if self.aoi_geometry:
-                logger.log(f"Using AOI geometry: {self.aoi_geometry.asWkt()}")
-            else:
-                logger.log("No AOI geometry provided.")
+            source_crs = self.extent_crs or self.iface.mapCanvas().mapSettings().destinationCrs()
+            self.bbox = transform_bbox_to_4326(self.extent, source_crs)
+            self.aoi_wkt = None
+            if self.aoi_geometry is not None:
+                # Transform a clone to WGS 1984 (EPSG:4326) for the SQL query only
+                dest_crs = QgsCoordinateReferenceSystem("EPSG:4326")
+                logger.log(f"Source CRS: {source_crs.authid()}, Destination CRS: {dest_crs.authid()}")
+                transformed_geom = QgsGeometry(self.aoi_geometry)
+                transform = QgsCoordinateTransform(source_crs, dest_crs, QgsProject.instance())
+                transformed_geom.transform(transform)
+                self.aoi_wkt = transformed_geom.asWkt()
+        except Exception as e:
+            self.report_error(str(e))
+            return
+        DownloadEngine.run(self)
 
-            #logger.log(f"Full validation_results at start of run: {self.validation_results}")
+    def report_progress(self, message):
+        self.progress.emit(message)
 
-            conn = None
-            try:
-                # Install and load the spatial extension
-                self.progress.emit(f"Loading spatial extension{layer_info}...")
+    def report_percent(self, percent):
+        self.percent.emit(percent)
 
-                if self.output_file.lower().endswith('.duckdb'):
-                    conn = duckdb.connect(self.output_file)  # Connect directly to output file
-                else:
-                    conn = duckdb.connect() 
-
-                conn.execute("INSTALL httpfs;")
-                conn.execute("INSTALL spatial;")
-                conn.execute("LOAD httpfs;")
-                conn.execute("LOAD spatial;")
-                
-                # Verify spatial extension is loaded by testing a spatial function
-                try:
-                    conn.execute("SELECT ST_AsText(ST_GeomFromText('POINT(0 0)'))").fetchone()
-                except Exception as e:
-                    logger.log(f"Failed to verify spatial extension: {e}")
-                    # Force reload
-                    conn.execute("LOAD spatial;")
-
-                # Get schema early as we need it for both column names and bbox check
-                schema_query = f"DESCRIBE SELECT * FROM read_parquet('{self.dataset_url}')"
-                schema_result = conn.execute(schema_query).fetchall()
-                self.validation_results['schema'] = schema_result
-                
-                # Log the schema for debugging
-                #logger.log("Schema in Worker:")
-                #for row in schema_result:
-                    #logger.log(f"Column: {row[0]}, Type: {row[1]}")
-
-                # If geometry_column is not in validation_results, detect it now
-                if 'geometry_column' not in self.validation_results:
-                    #logger.log("No geometry_column in validation_results, detecting now")
-                    self.validation_results['geometry_column'] = 'geometry'  # Default
-                    geometry_found = False
-                    
-                    for row in schema_result:
-                        col_name = row[0]
-                        col_type = row[1].upper()
-                        #logger.log(f"Checking column {col_name} with type {col_type} for geometry")
-                        if 'GEOMETRY' in col_type or 'GEOGRAPHY' in col_type:
-                            self.validation_results['geometry_column'] = col_name
-                            logger.log(f"Found geometry column by type: {col_name}")
-                            geometry_found = True
-                            break
-                    
-                    if not geometry_found:
-                        # Try a different approach - look for columns
-                        #logger.log("No standard geometry column found, trying alternative detection")
-                        for row in schema_result:
-                            col_name = row[0].lower()
-                            col_name_orig = row[0]  # Keep original case
-                            col_type = row[1].upper()
-                            
-                            # Check for common geometry column names
-                            if col_name in ['geometry', 'geom', 'the_geom', 'wkb_geometry']:
-                                self.validation_results['geometry_column'] = col_name_orig
-                                #logger.log(f"Found likely geometry column by name: {col_name_orig}")
-                                geometry_found = True
-                                break
-                            # Also check for BLOB columns with geometry-like names
-                            elif 'BLOB' in col_type and col_name in ['geometry', 'geom', 'the_geom', 'wkb_geometry']:
-                                self.validation_results['geometry_column'] = col_name_orig
-                                logger.log(f"Found WKB BLOB geometry column: {col_name_orig}")
-                                geometry_found = True
-                                break
-                
-               #logger.log(f"Final geometry column detection result: {self.validation_results['geometry_column']}")
-
-                table_name = "download_data"
-
-                self.progress.emit(f"Preparing query{layer_info}...")
-                select_query = "SELECT *"
-                if not self.output_file.endswith(".parquet"):
-                    # Construct the SELECT clause with array conversion to strings
-                    columns = []
-                    for row in schema_result:
-                        col_name = row[0]
-                        col_type = row[1]
-                        
-                        # Quote the column name to handle special characters
-                        quoted_col_name = f'"{col_name}"'
-                        
-                        if 'STRUCT' in col_type.upper() or 'MAP' in col_type.upper():
-                            columns.append(f"TO_JSON({quoted_col_name}) AS {quoted_col_name}")
-                        elif '[]' in col_type:  # Check for array types like VARCHAR[]
-                            columns.append(f"array_to_string({quoted_col_name}, ', ') AS {quoted_col_name}")
-                        elif col_type.upper() == 'UTINYINT':
-                            columns.append(f"CAST({quoted_col_name} AS INTEGER) AS {quoted_col_name}")
-                        elif 'BLOB' in col_type.upper() and col_name == geometry_column:
-                            # For BLOB geometry columns, we'll handle conversion differently
-                            # to avoid spatial function validation issues
-                            columns.append(quoted_col_name)
-                        else:
-                            columns.append(quoted_col_name)
-
-                    # Check if this is Overture data and has a names column
-                    has_names_column = any('names' in row[0] for row in schema_result)
-                    if 'overture' in self.dataset_url and has_names_column:
-                        select_query = f'SELECT "names"."primary" as name,{", ".join(columns)}'
-                    else:
-                        select_query = f'SELECT {", ".join(columns)}'
-
-                # First check: Does the schema actually have a bbox column?
-                has_bbox_in_schema = False
-                if 'schema' in self.validation_results and self.validation_results['schema']:
-                    for row in self.validation_results['schema']:
-                        if row[0].lower() == 'bbox' and 'struct' in row[1].lower():
-                            has_bbox_in_schema = True
-                            #logger.log("Found actual bbox column in schema")
-                            break
-                    
-                    if not has_bbox_in_schema:
-                        #logger.log("No bbox column found in schema, overriding validation_results")
-                        # Force override incorrect bbox settings if schema doesn't have bbox
-                        self.validation_results['has_bbox'] = False
-                        self.validation_results['bbox_column'] = None
-
-                # Now use the corrected validation_results
-                bbox_column = self.validation_results.get('bbox_column')
-                geometry_column = self.validation_results.get('geometry_column', 'geometry')
-                #logger.log(f"Final bbox_column value: {bbox_column}")
-                #logger.log(f"Using geometry column: {geometry_column}")
-
-                # Check if geometry column is a BLOB that needs conversion
-                geometry_col_type = None
-                for row in schema_result:
-                    if row[0] == geometry_column:
-                        geometry_col_type = row[1].upper()
-                        break
-                
-                if bbox_column is not None:
-                    #logger.log(f"Using bbox column for query: {bbox_column}")
-                    where_clause = f"""
-                    WHERE "{bbox_column}".xmin BETWEEN {bbox.xMinimum()} AND {bbox.xMaximum()}
-                    AND "{bbox_column}".ymin BETWEEN {bbox.yMinimum()} AND {bbox.yMaximum()}
-                    """
-                else:
-                    #logger.log("Using spatial filter instead of bbox")
-                    # If it's a BLOB column, we can't use spatial functions in the initial query
-                    # We'll apply the filter after converting the geometry
-                    if geometry_col_type and 'BLOB' in geometry_col_type:
-                        where_clause = ""  # No spatial filter initially for BLOB columns
-                    else:
-                        # For proper geometry columns, we can use spatial filter directly
-                        geometry_expr = f'"{geometry_column}"'
-                        where_clause = f"""
-                        WHERE ST_Intersects(
-                            {geometry_expr},
-                            ST_GeomFromText('POLYGON(({bbox.xMinimum()} {bbox.yMinimum()},
-                                                {bbox.xMaximum()} {bbox.yMinimum()},
-                                                {bbox.xMaximum()} {bbox.yMaximum()},
-                                                {bbox.xMinimum()} {bbox.yMaximum()},
-                                                {bbox.xMinimum()} {bbox.yMinimum()}))')
-                        )
-                        """
-
-                # Additional filtering with aoi_geometry if available
-                if self.aoi_geometry is not None:
-                    # Create a temporary clone for transformation to WGS 1984 (EPSG:4326)
-                    dest_crs = QgsCoordinateReferenceSystem("EPSG:4326")
-                    source_crs = self.iface.mapCanvas().mapSettings().destinationCrs()
-                    
-                    # Log the source and destination CRS for debugging
-                    logger.log(f"Source CRS: {source_crs.authid()}, Destination CRS: {dest_crs.authid()}")
-                    
-                    # Clone and transform only for the SQL query
-                    transformed_geom = QgsGeometry(self.aoi_geometry)
-                    transform = QgsCoordinateTransform(source_crs, dest_crs, QgsProject.instance())
-                    transformed_geom.transform(transform)
-                    
-                    # Use the transformed geometry for the SQL query
-                    aoi_wkt = transformed_geom.asWkt()
-                    where_clause += f" AND ST_Intersects(\"{geometry_column}\", ST_GeomFromText('{aoi_wkt}'))"
-                    
-                    # Log the updated where_clause for debugging
-                    logger.log(f"Applying AOI geometry filter: {aoi_wkt}")
-
-                # Base query
-                base_query = f"""
-                CREATE TABLE {table_name} AS (
-                    {select_query} FROM read_parquet('{self.dataset_url}')
-                    {where_clause}
-                ) 
-                """
-                self.progress.emit(f"Downloading{layer_info} data...")
-                logger.log("Executing SQL query:")
-                logger.log(base_query)
-                
-                conn.execute(base_query)
-                
-                # If we have a BLOB geometry column, we need to convert it after table creation
-                # and apply spatial filter if needed
-                if (geometry_column and geometry_col_type and 'BLOB' in geometry_col_type):
-                    # Create a new table with converted geometry
-                    temp_table = f"{table_name}_converted"
-                    
-                    # Build column list for conversion
-                    convert_columns = []
-                    for col_name, col_type, _, _, _, _ in schema_result:
-                        quoted_col_name = f'"{col_name}"'
-                        if col_name == geometry_column:
-                            convert_columns.append(f"ST_GeomFromWKB({quoted_col_name}) AS {quoted_col_name}")
-                        else:
-                            convert_columns.append(quoted_col_name)
-                    
-                    # Add spatial filter if bbox is available and we didn't filter earlier
-                    spatial_filter = ""
-                    if bbox and not bbox_column:  # Only if we didn't filter with bbox column
-                        spatial_filter = f"""
-                        WHERE ST_Intersects(
-                            ST_GeomFromWKB("{geometry_column}"),
-                            ST_GeomFromText('POLYGON(({bbox.xMinimum()} {bbox.yMinimum()},
-                                                {bbox.xMaximum()} {bbox.yMinimum()},
-                                                {bbox.xMaximum()} {bbox.yMaximum()},
-                                                {bbox.xMinimum()} {bbox.yMaximum()},
-                                                {bbox.xMinimum()} {bbox.yMinimum()}))')
-                        )
-                        """
-                    
-                    convert_query = f"""
-                    CREATE TABLE {temp_table} AS
-                    SELECT {', '.join(convert_columns)}
-                    FROM {table_name}
-                    {spatial_filter}
-                    """
-                    
-                    conn.execute(convert_query)
-                    
-                    # Drop original and rename
-                    conn.execute(f"DROP TABLE {table_name}")
-                    conn.execute(f"ALTER TABLE {temp_table} RENAME TO {table_name}")
-                
-                # Add check for empty results
-                row_count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-                if row_count == 0:
-                    self.info.emit(f"No data found{layer_info} in the requested area. Check that your map extent overlaps with the data and/or expand your map extent. Skipping to next dataset if available.")
-                    self.finished.emit()  # Ensure finished signal is emitted
-                    return
+    def report_info(self, message):
+        self.info.emit(message)
 
-                self.progress.emit(f"Processing{layer_info} data to requested format...")
+    def report_error(self, message):
+        self.error_message = message
+        self.error.emit(message)
 
-                file_extension = self.output_file.lower().split('.')[-1]
+    def report_finished(self):
+        self.finished.emit()
 
-                if file_extension == 'duckdb':
-                    # Commit the transaction to ensure the data is saved
-                    conn.commit()
-                    if not self.killed:
-                        self.info.emit(
-                            "Data has been successfully saved to DuckDB database.\n\n"
-                            "Note: QGIS does not currently support loading DuckDB files directly."
-                        )
-                else:
-                    # Check size if exporting to GeoJSON
-                    if self.output_file.lower().endswith('.geojson'):
-                        estimated_size = self.estimate_file_size(conn, table_name)
-                        if estimated_size > 4096 and not self.size_warning_accepted:  # 4GB warning threshold
-                            self.file_size_warning.emit(estimated_size)
-                            return
-
-                    # Use the geometry column from validation results for the Hilbert sorting
-                    # At this point, if we converted BLOB to geometry, it's already a GEOMETRY type
-                    # So we don't need ST_GeomFromWKB anymore
-                    geometry_expr = f'"{geometry_column}"'
-                    extent_expr = f'"{geometry_column}"'
-                    
-                    copy_query = f"""
-                    COPY (
-                        WITH bbox AS (
-                            SELECT ST_Extent(ST_Extent_Agg({extent_expr}))::BOX_2D AS b
-                            FROM   {table_name}
-                        )
-                        SELECT   t.*
-                        FROM     {table_name} AS t
-                                CROSS JOIN bbox
-                        ORDER BY ST_Hilbert(t.{geometry_expr}, bbox.b)
-                    ) TO '{self.output_file}' 
-                    """
-
-                    if file_extension == "parquet":
-                        format_options = "(FORMAT 'parquet', COMPRESSION 'ZSTD', COMPRESSION_LEVEL 22);"
-                    elif self.output_file.endswith(".gpkg"):
-                        format_options = "(FORMAT GDAL, DRIVER 'GPKG');"
-                    elif self.output_file.endswith(".fgb"):
-                        format_options = "(FORMAT GDAL, DRIVER 'FlatGeobuf', SRS 'EPSG:4326');"
-                    elif self.output_file.endswith(".geojson"):
-                        format_options = "(FORMAT GDAL, DRIVER 'GeoJSON', SRS 'EPSG:4326');"
-                    else:
-                        self.error.emit("Unsupported file format.")
-                    
-                    logger.log("Executing SQL query:")
-                    logger.log(copy_query + format_options)
-                    conn.execute(copy_query + format_options)
-
-                
-                if self.killed:
-                    return
+    def report_output(self, path):
+        self.load_layer.emit(path)
+
+    def report_size_warning(self, estimated_size):
+        self.file_size_warning.emit(estimated_size)
+
+
+class SchemaWorker(QObject):
+    """Reads a dataset's columns for the column picker, through the metadata cache"""
+    finished = pyqtSignal(list)
+    error = pyqtSignal(str)
 
-                if not self.killed:
-                    if self.output_file.lower().endswith('.duckdb'):
-                        self.info.emit(
-                            "Data has been successfully saved to DuckDB database.\n\n"
-                            "Note: QGIS does not currently support loading DuckDB files directly."
-                        )
-                    else:
-                        self.load_layer.emit(self.output_file)
-                    self.finished.emit()
+    def __init__(self, dataset_url, session=None, metadata_cache=None):
+        super().__init__()
+        self.dataset_url = dataset_url
+        self.session = session
+        self.metadata_cache = metadata_cache
+        self.killed = False
+        self.conn = None
 
+    def kill(self):
+        """Stop reading the schema, interrupting the remote read it is waiting on"""
+        self.killed = True
+        conn = self.conn
+        if conn is not None:
+            try:
+                conn.interrupt()
             except Exception as e:
-                if not self.killed:
-                    # Change error to info if it's a "no data" error
-                    error_str = str(e)
-                    if "No data found" in error_str:
-                        self.info.emit(f"No data found{layer_info} in the requested area for {self.dataset_url}. Skipping to next dataset if available.")
-                        self.finished.emit()  # Ensure finished signal is emitted
-                    else:
-                        self.error.emit(error_str)
-            finally:
-                if conn:
-                    if not self.output_file.lower().endswith('.duckdb'): # Clean up temporary table
-                        try:
-                            conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-                        except:
-                            pass
-                    conn.close()
+                logger.log(f"Could not interrupt the column read: {e}", 1)
 
+    def run(self):
+        conn = None
+        owns_session = self.session is None
+        session = self.session or DuckDBSession()
+        try:
+            conn = self.conn = session.cursor()
+            schema = get_schema(conn, self.dataset_url, self.metadata_cache)
+            if not self.killed:
+                self.finished.emit([(row[0], row[1]) for row in schema])
         except Exception as e:
             if not self.killed:
+                logger.log(f"Could not read columns of {self.dataset_url}: {str(e)}", 1)
                 self.error.emit(str(e))
+        finally:
+            self.conn = None
+            if conn:
+                conn.close()
+            if owns_session:
+                session.close()
+
+
+class EstimateWorker(QObject):
+    """Estimates what downloading the extent reads, from Parquet footer statistics only"""
+    finished = pyqtSignal(object)
+    progress = pyqtSignal(str)
+
+    def __init__(self, dataset_urls, extent, extent_crs, validation_results=None, session=None, metadata_cache=None):
+        super().__init__()
+        self.dataset_urls = dataset_urls
+        self.extent = extent
+        self.extent_crs = extent_crs
+        self.validation_results = validation_results or {}
+        self.session = session
+        self.metadata_cache = metadata_cache
+        self.killed = False
+        self.conn = None
 
     def kill(self):
+        """Stop the estimate, interrupting the footer read it is waiting on"""
         self.killed = True
+        conn = self.conn
+        if conn is not None:
+            try:
+                conn.interrupt()
+            except Exception as e:
+                logger.log(f"Could not interrupt the estimate: {e}", 1)
 
-    def estimate_file_size(self, conn, table_name):
-        """Estimate the output file size in MB using GeoJSON feature collection structure"""
-        try:
-            # Get total row count
-            row_count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-
-            # Use a smaller sample size for large datasets
-            sample_size = min(100, row_count)
-
-            if sample_size > 0:
-                # Create a proper GeoJSON FeatureCollection sample with all properties
-                sample_query = f"""
-                    WITH sample AS (
-                        SELECT * FROM {table_name} LIMIT {sample_size}
-                    )
-                    SELECT AVG(LENGTH(
-                        json_object(
-                            'type', 'Feature',
-                            'geometry', ST_AsGeoJSON(geometry),
-                            'properties', json_object(
-                                {', '.join([
-                    f"'{col[0]}', COALESCE(CAST({col[0]} AS VARCHAR), 'null')"
-                    for col in conn.execute(f"DESCRIBE {table_name}").fetchall()
-                    if col[0] != 'geometry'
-                ])}
-                            )
-                        )::VARCHAR
-                    )) as avg_feature_size
-                    FROM sample;
-                """
-
-                # Get average feature size
-                avg_feature_size = conn.execute(sample_query).fetchone()[0]
-
-                if avg_feature_size:
-                    # Account for GeoJSON overhead
-                    collection_overhead = (
-                        50  # {"type":"FeatureCollection","features":[]}
-                    )
-                    comma_overhead = row_count - 1  # Commas between features
-
-                    total_estimated_bytes = (
-                        (row_count * avg_feature_size)
-                        + collection_overhead
-                        + comma_overhead
-                    )
-                    return total_estimated_bytes / (1024 * 1024)  # Convert to MB
-            return 0
+    def get_covering(self, conn, url):
+        if self.validation_results.get("bbox_covering"):
+            return self.validation_results["bbox_covering"]
+        return find_bbox_covering(conn, url, self.metadata_cache)
 
+    def run(self):
+        """Emits the combined estimate, or None if it could not be made"""
+        bbox = transform_bbox_to_4326(self.extent, self.extent_crs)
+        if bbox is None:
+            self.finished.emit(None)
+            return
+
+        conn = None
+        owns_session = self.session is None
+        session = self.session or DuckDBSession()
+        try:
+            conn = self.conn = session.cursor()
+            estimates = []
+            for number, url in enumerate(self.dataset_urls, 1):
+                if self.killed:
+                    return
+                self.progress.emit(f"Estimating download size ({number} of {len(self.dataset_urls)})...")
+                covering = self.get_covering(conn, url)
+                if covering is None:
+                    estimates.append(None)
+                    continue
+                estimates.append(estimate_download(
+                    conn, url, covering,
+                    bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum(),
+                    self.metadata_cache,
+                ))
+            if not self.killed:
+                self.finished.emit(combine_estimates(estimates))
         except Exception as e:
-            logger.log(f"Error estimating file size: {str(e)}", 2)
-            return 0
-
-    def process_schema_columns(self, schema_result):
-        """Process schema columns and return formatted SELECT clause"""
-        columns = []
-        for row in schema_result:
-            col_name = row[0]
-            col_type = row[1]
-            quoted_col_name = f'"{col_name}"'
-
-            if "STRUCT" in col_type.upper() or "MAP" in col_type.upper():
-                columns.append(f"TO_JSON({quoted_col_name}) AS {quoted_col_name}")
-            elif "[]" in col_type:
-                columns.append(
-                    f"array_to_string({quoted_col_name}, ', ') AS {quoted_col_name}"
-                )
-            elif col_type.upper() == "UTINYINT":
-                columns.append(
-                    f"CAST({quoted_col_name} AS INTEGER) AS {quoted_col_name}"
-                )
-            else:
-                columns.append(quoted_col_name)
-        return columns
+            if self.killed:
+                return
+            logger.log(f"Could not estimate download size: {str(e)}", 1)
+            self.finished.emit(None)
+        finally:
+            self.conn = None
+            if conn:
+                conn.close()
+            if owns_session:
+                session.close()
 
 
 class ValidationWorker(QObject):
@@ -528,12 +220,15 @@ class ValidationWorker(QObject):
     progress = pyqtSignal(str)
     needs_bbox_warning = pyqtSignal()
 
-    def __init__(self, dataset_url, iface, extent):
+    def __init__(self, dataset_url, iface, extent, session=None, metadata_cache=None):
         super().__init__()
         self.dataset_url = dataset_url
         self.iface = iface
         self.extent = extent
         self.killed = False
+        self.session = session
+        self.metadata_cache = metadata_cache
+        self.bbox_covering = None
 
         base_path = os.path.dirname(os.path.abspath(__file__))
         presets_path = os.path.join(base_path, "data", "presets.json")
@@ -542,51 +237,22 @@ class ValidationWorker(QObject):
 
     def check_bbox_metadata(self, conn):
         """Check for bbox information in GeoParquet metadata"""
-        metadata_query = (
-            f"SELECT key, value FROM parquet_kv_metadata('{self.dataset_url}')"
-        )
-        metadata_results = conn.execute(metadata_query).fetchall()
-
-        for key, value in metadata_results:
-            if key == b"geo":
-                try:
-                    decoded_value = value.decode()
-                    #logger.log("\nRaw metadata value:")
-                    #logger.log(decoded_value)
-
-                    # Install and load JSON extension
-                    conn.execute("INSTALL json;")
-                    conn.execute("LOAD json;")
-
-                    # Create a table with the JSON string
-                    conn.execute(
-                        f"CREATE TEMP TABLE temp_json AS SELECT '{decoded_value}' as json_str"
-                    )
-
-                    # Extract the bbox column name using JSON path
-                    # First get the geometry column info which contains the covering
-                    result = conn.execute("""
-                        SELECT json_str->'$.columns.geometry.covering.bbox.xmin[0]' as bbox_column
-                        FROM temp_json
-                    """).fetchone()
-
-                    #logger.log("\nExtracted bbox column name:")
-                    #logger.log(result[0] if result else None)
-
-                    if result and result[0]:
-                        # Remove quotes from the result if present
-                        bbox_col = result[0].strip('"')
-                        return bbox_col
-
-                except Exception as e:
-                    logger.log(f"\nError parsing geo metadata: {str(e)}", 2)
-                    logger.log(f"Exception type: {type(e)}", 2)
-                    import traceback
-
-                    logger.log(traceback.format_exc())
-                finally:
-                    # Clean up temporary table
-                    conn.execute("DROP TABLE IF EXISTS temp_json")
+        try:
+            covering = parse_bbox_covering(
+                get_geo_metadata(conn, self.dataset_url, self.metadata_cache)
+            )
+        except Exception as e:
+            logger.log(f"\nError parsing geo metadata: {str(e)}", 2)
+            logger.log(f"Exception type: {type(e)}", 2)
+            import traceback
+
+            logger.log(traceback.format_exc())
+            return None
+
+        if covering:
+            # Keep the full covering so the Worker can filter on all four fields
+            self.bbox_covering = covering
+            return covering["xmin"][0]
         return None
 
     def run(self):
@@ -598,13 +264,12 @@ class ValidationWorker(QObject):
             "geometry_column": "geometry"  # Default fallback
         }
         
+        conn = None
+        owns_session = self.session is None
+        session = self.session or DuckDBSession()
         try:
             self.progress.emit("Connecting to data source...")
-            conn = duckdb.connect()
-            conn.execute("INSTALL spatial;")
-            conn.execute("LOAD spatial;")
-            conn.execute("INSTALL httpfs;")
-            conn.execute("LOAD httpfs;")
+            conn = session.cursor()
 
             if not self.needs_validation():
                 validation_results.update({
@@ -615,8 +280,7 @@ class ValidationWorker(QObject):
                 return
 
             self.progress.emit("Checking data format...")
-            schema_query = f"DESCRIBE SELECT * FROM read_parquet('{self.dataset_url}')"
-            schema_result = conn.execute(schema_query).fetchall()
+            schema_result = get_schema(conn, self.dataset_url, self.metadata_cache)
 
             # Update validation results with schema
             validation_results["schema"] = schema_result
@@ -637,6 +301,7 @@ class ValidationWorker(QObject):
                 if bbox_column:
                     validation_results["has_bbox"] = True
                     validation_results["bbox_column"] = bbox_column
+                    validation_results["bbox_covering"] = self.bbox_covering
                     self.finished.emit(True, "Validation successful", validation_results)
                 else:
                     # No bbox column found - emit warning signal first
@@ -652,7 +317,10 @@ class ValidationWorker(QObject):
             # Still emit validation results with default values in case of error
             self.finished.emit(False, f"Error validating source: {str(e)}", validation_results)
         finally:
-            conn.close()
+            if conn:
+                conn.close()
+            if owns_session:
+                session.close()
 
     def needs_validation(self):
         """Determine if the dataset needs any validation"""